@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+⏱️ Benchmark suite for the Commit Push Assistant
+Generates synthetic local repositories at several scales, times the
+end-to-end commit/push flow and individual GitOperations methods against a
+local bare remote with a stub LLM, and compares results against a stored
+baseline so regressions fail loudly. Start-up is measured too: a fresh
+interpreter importing the assistant must stay within an import-time budget
+without loading the modules only some features need.
+
+Usage:
+    python benchmark.py --scale small,medium --repeat 5 --output bench.json
+    python benchmark.py --baseline bench_baseline.json
+    python benchmark.py --update-baseline bench_baseline.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import commit_push as cp  # noqa: E402
+
+@dataclass
+class Scale:
+    """Shape of one synthetic repository."""
+    name: str
+    files: int
+    dirty: int
+    untracked: int
+    binaries: int
+    binary_size: int
+    commits: int
+
+SCALES: Dict[str, Scale] = {
+    'small': Scale('small', files=200, dirty=10, untracked=20, binaries=2, binary_size=64 * 1024, commits=50),
+    'medium': Scale('medium', files=5000, dirty=200, untracked=2000, binaries=10, binary_size=1024 * 1024,
+                    commits=1000),
+    'large': Scale('large', files=50000, dirty=2000, untracked=50000, binaries=20, binary_size=4 * 1024 * 1024,
+                   commits=10000),
+}
+
+# Regressions smaller than this are treated as noise regardless of tolerance
+NOISE_FLOOR_MS = 5.0
+
+# Fastest import of commit_push allowed, whatever the baseline says; leaves room for slow CI machines
+IMPORT_BUDGET_MS = 75.0
+# Loaded only by the features that need them (model, history index, inotify, process pool...)
+LAZY_MODULES = ('http.client', 'socket', 'sqlite3', 'ctypes', 'multiprocessing', 'concurrent.futures', 'hashlib')
+IMPORT_PROBE = (
+    "import sys, time; sys.path.insert(0, sys.argv[1]); started = time.perf_counter(); import commit_push; "
+    "print((time.perf_counter() - started) * 1000); print(' '.join(sys.modules))"
+)
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """Minimal /api/generate endpoint that streams a fixed reply after a delay."""
+
+    protocol_version = 'HTTP/1.1'
+    latency = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        time.sleep(self.latency)
+        if 'prompt' not in body:
+            self._send_json({'model': body.get('model'), 'done': True})
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for token in ("feat(bench): update synthetic sources", "\n"):
+                self._send_chunk({'response': token, 'done': False})
+            self._send_chunk({'response': '', 'done': True})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send_chunk(self, payload: Dict) -> None:
+        data = (json.dumps(payload) + "\n").encode()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _send_json(self, payload: Dict) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+@contextlib.contextmanager
+def stub_llm(latency: float):
+    """Serve the stub model on a free local port and point the tool at it."""
+    handler = type('Handler', (StubOllamaHandler,), {'latency': latency})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    previous_host = cp.config.ollama_host
+    cp.config.ollama_host = f"http://127.0.0.1:{server.server_address[1]}"
+    cp.OllamaClient._shared = None
+    try:
+        yield
+    finally:
+        cp.config.ollama_host = previous_host
+        cp.OllamaClient._shared = None
+        server.shutdown()
+        server.server_close()
+
+@contextlib.contextmanager
+def quiet():
+    """Silence both Python output and output written by child git processes."""
+    sys.stdout.flush()
+    saved_fd = os.dup(1)
+    with open(os.devnull, 'w') as devnull:
+        os.dup2(devnull.fileno(), 1)
+        try:
+            with contextlib.redirect_stdout(devnull):
+                yield
+        finally:
+            os.dup2(saved_fd, 1)
+            os.close(saved_fd)
+
+def git(repo: Path, *args: str, stdin: Optional[bytes] = None) -> None:
+    subprocess.run(["git", *args], cwd=repo, input=stdin, check=True, stdout=subprocess.DEVNULL)
+
+class SyntheticRepo:
+    """A generated repository with a local bare remote."""
+
+    def __init__(self, root: Path, scale: Scale, seed: int = 1234):
+        self.scale = scale
+        self.repo = root / f"{scale.name}-repo"
+        self.remote = root / f"{scale.name}-remote.git"
+        self.random = random.Random(seed)
+        self.base = "main"
+
+    def create(self) -> None:
+        """Build the history with fast-import, check it out and publish it."""
+        git(self.repo.parent, "init", "-q", "--bare", str(self.remote))
+        git(self.repo.parent, "init", "-q", "-b", "main", str(self.repo))
+        git(self.repo, "config", "user.name", "Benchmark")
+        git(self.repo, "config", "user.email", "bench@example.invalid")
+        git(self.repo, "config", "gc.auto", "0")
+        git(self.repo, "remote", "add", "origin", str(self.remote))
+        git(self.repo, "fast-import", "--quiet", stdin=self._history_stream())
+        git(self.repo, "checkout", "-q", "-f", "main")
+        git(self.repo, "push", "-q", "origin", "main")
+        git(self.repo, "tag", "bench-base")
+
+    def _history_stream(self) -> bytes:
+        """fast-import stream: one commit adding every file, then small edits."""
+        scale = self.scale
+        out: List[bytes] = []
+        stamp = 1_700_000_000
+
+        def commit(message: str, changes: List[bytes], index: int) -> None:
+            msg = message.encode()
+            out.append(b"commit refs/heads/main\n")
+            out.append(b"committer Benchmark <bench@example.invalid> %d +0000\n" % (stamp + index))
+            out.append(b"data %d\n%s\n" % (len(msg), msg))
+            out.extend(changes)
+
+        def inline(path: str, content: bytes) -> bytes:
+            return b"M 100644 inline %s\ndata %d\n%s\n" % (path.encode(), len(content), content)
+
+        initial = [inline(self.source_path(i), self.source_content(i, 0)) for i in range(scale.files)]
+        for i in range(scale.binaries):
+            initial.append(inline(f"assets/blob{i}.bin", self.random.randbytes(scale.binary_size)))
+        commit("feat: initial synthetic tree", initial, 0)
+
+        kinds = ["feat", "fix", "docs", "refactor", "test", "chore"]
+        for n in range(1, scale.commits):
+            target = self.random.randrange(scale.files)
+            kind = kinds[n % len(kinds)]
+            commit(f"{kind}(mod{target % 50}): revise module {target}",
+                   [inline(self.source_path(target), self.source_content(target, n))], n)
+        return b"".join(out)
+
+    @staticmethod
+    def source_path(index: int) -> str:
+        suffix = ('.py', '.js', '.md', '.json', '_test.py')[index % 5]
+        return f"src/pkg{index % 50}/mod{index}{suffix}"
+
+    @staticmethod
+    def source_content(index: int, revision: int) -> bytes:
+        lines = [f"# module {index} revision {revision}"]
+        lines += [f"value_{j} = {index * j + revision}" for j in range(20)]
+        return ("\n".join(lines) + "\n").encode()
+
+    def reset(self) -> None:
+        """Return worktree, index and remote to the generated base state."""
+        git(self.repo, "reset", "-q", "--hard", "bench-base")
+        git(self.repo, "clean", "-q", "-fdx")
+        git(self.repo, "push", "-q", "-f", "origin", "bench-base:main")
+
+    def make_dirty(self, round_number: int) -> None:
+        """Edit tracked files and drop untracked artifacts and binaries."""
+        scale = self.scale
+        for index in self.random.sample(range(scale.files), min(scale.dirty, scale.files)):
+            with open(self.repo / self.source_path(index), 'a', encoding='utf-8') as f:
+                f.write(f"extra_{round_number} = {index}\n")
+        build = self.repo / "build"
+        for i in range(scale.untracked):
+            artifact = build / f"part{i % 100}" / f"artifact{i}.o"
+            artifact.parent.mkdir(parents=True, exist_ok=True)
+            artifact.write_bytes(b"obj %d %d\n" % (round_number, i))
+        for i in range(max(1, scale.binaries // 4)):
+            (self.repo / "assets" / f"new{round_number}_{i}.bin").write_bytes(
+                self.random.randbytes(min(scale.binary_size, 256 * 1024)))
+
+def measure(fn: Callable[[], object], runs: int, setup: Optional[Callable[[], None]] = None) -> Dict:
+    """Time ``fn`` over several runs, calling ``setup`` untimed before each."""
+    timings: List[float] = []
+    for _ in range(runs):
+        if setup:
+            setup()
+        with quiet():
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'median_ms': round(statistics.median(timings), 2),
+        'min_ms': round(min(timings), 2),
+        'runs_ms': [round(t, 2) for t in timings],
+    }
+
+def bench_scale(root: Path, scale: Scale, runs: int) -> Dict[str, Dict]:
+    """Run every benchmark for one repository scale."""
+    synthetic = SyntheticRepo(root, scale)
+    started = time.perf_counter()
+    synthetic.create()
+    print(f"🏗️ {scale.name}: generated {scale.files} files, {scale.commits} commits "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    results: Dict[str, Dict] = {}
+    counter = {'round': 0}
+
+    def dirty():
+        synthetic.reset()
+        counter['round'] += 1
+        synthetic.make_dirty(counter['round'])
+
+    def staged():
+        dirty()
+        git(synthetic.repo, "add", ".")
+        syntax_cache = synthetic.repo / ".git" / "commit-push-syntax.json"
+        if syntax_cache.exists():
+            syntax_cache.unlink()
+
+    def e2e_args(pipeline: bool) -> argparse.Namespace:
+        return argparse.Namespace(dry_run=False, message=None, no_ai=False, no_cache=True, pipeline=pipeline)
+
+    settings = cp.RepoSettings(path=synthetic.repo, remote_url=str(synthetic.remote), branch="main")
+    with cp.GitOperations.use_repo(synthetic.repo):
+        results['snapshot'] = measure(cp.RepoSnapshot.capture, runs, dirty)
+        results['recent_commits'] = measure(cp.GitOperations.get_recent_commits, runs)
+        results['diff_context'] = measure(
+            lambda: cp.DiffContextBuilder(cp.config.prompt_token_budget).build(["HEAD"]), runs, dirty)
+        results['stage_all'] = measure(lambda: cp.GitOperations.run_command(["git", "add", "."], capture_output=False),
+                                       runs, dirty)
+        results['staged_blob_sizes'] = measure(
+            lambda: cp.GitOperations.read_blob_sizes([sha for _, sha in cp.GitOperations.get_staged_blobs()]),
+            runs, staged)
+        results['secret_scan'] = measure(cp.PreCommitScanner.find_secrets, runs, staged)
+        results['syntax_check'] = measure(cp.PreCommitHooks.check_code_quality, runs, staged)
+        results['e2e_sequential'] = measure(lambda: cp.run_repository(e2e_args(False), settings), runs, dirty)
+        results['e2e_pipeline'] = measure(lambda: cp.run_repository(e2e_args(True), settings), runs, dirty)
+    return results
+
+def bench_startup(root: Path, runs: int) -> Tuple[Dict[str, Dict], List[str]]:
+    """Time fresh interpreters importing commit_push and doing a ``--dry-run --no-ai`` run.
+
+    Returns the timings and the lazily loaded modules that the import pulled
+    in anyway.
+    """
+    package_dir = str(Path(__file__).resolve().parent)
+    # Bytecode must be cached, as it is for every run after the first
+    subprocess.run([sys.executable, "-m", "compileall", "-q", str(Path(package_dir) / "commit_push.py")], check=True)
+    repo = root / "startup"
+    repo.mkdir()
+    git(repo, "init", "-q", "-b", "main")
+    (repo / "notes.txt").write_text("startup\n", encoding='utf-8')
+
+    imports: List[float] = []
+    loaded: set = set()
+    for _ in range(runs):
+        probe = subprocess.run([sys.executable, "-c", IMPORT_PROBE, package_dir],
+                               capture_output=True, text=True, check=True)
+        elapsed, modules = probe.stdout.splitlines()
+        imports.append(float(elapsed))
+        loaded.update(modules.split())
+
+    environment = dict(os.environ, PYTHONPATH=package_dir)
+    results = {
+        'import': {
+            'median_ms': round(statistics.median(imports), 2),
+            'min_ms': round(min(imports), 2),
+            'runs_ms': [round(t, 2) for t in imports],
+        },
+        'dry_run_no_ai': measure(lambda: subprocess.run(
+            [sys.executable, "-m", "commit_push", "--dry-run", "--no-ai"],
+            cwd=repo, env=environment, stdout=subprocess.DEVNULL, check=True), runs),
+    }
+    return results, sorted(name for name in LAZY_MODULES if name in loaded)
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Print a comparison table and return the regressed metrics."""
+    regressions: List[str] = []
+    print(f"\n{'Scale':<8} {'Metric':<20} {'Baseline':>10} {'Current':>10} {'Change':>8}")
+    for scale_name, metrics in current['results'].items():
+        for metric, values in metrics.items():
+            reference = baseline.get('results', {}).get(scale_name, {}).get(metric)
+            if not reference:
+                continue
+            before, after = reference['median_ms'], values['median_ms']
+            change = (after - before) / before if before else 0.0
+            regressed = after > before * (1 + tolerance) and after - before > NOISE_FLOOR_MS
+            flag = " ❌" if regressed else ""
+            print(f"{scale_name:<8} {metric:<20} {before:>9.1f}ms {after:>9.1f}ms {change:>+7.0%}{flag}")
+            if regressed:
+                regressions.append(f"{scale_name}/{metric}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Commit Push Assistant")
+    parser.add_argument("--scale", default="small", help=f"Comma-separated scales: {', '.join(SCALES)}")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Stub model latency in seconds")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the results")
+    parser.add_argument("--baseline", help="Baseline results to compare against")
+    parser.add_argument("--update-baseline", metavar="PATH", help="Also store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated repositories")
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET_MS, metavar="MS",
+                        help="Fail when importing commit_push takes longer than this")
+    args = parser.parse_args()
+
+    scales = [name.strip() for name in args.scale.split(',') if name.strip()]
+    unknown = [name for name in scales if name not in SCALES]
+    if unknown:
+        print(f"❌ Unknown scale(s): {', '.join(unknown)}")
+        sys.exit(2)
+
+    git_version = subprocess.run(["git", "--version"], capture_output=True, text=True).stdout.strip()
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'git': git_version,
+            'repeat': args.repeat,
+            'llm_latency_s': args.llm_latency,
+            'scales': {name: asdict(SCALES[name]) for name in scales},
+        },
+        'results': {},
+    }
+
+    root = Path(tempfile.mkdtemp(prefix="commit-push-bench-"))
+    try:
+        report['results']['startup'], eager = bench_startup(root, max(args.repeat, 5))
+        for metric, values in report['results']['startup'].items():
+            print(f"   {metric:<20} {values['median_ms']:>10.1f}ms (min {values['min_ms']:.1f}ms)")
+        with stub_llm(args.llm_latency):
+            for name in scales:
+                report['results'][name] = bench_scale(root, SCALES[name], args.repeat)
+                for metric, values in report['results'][name].items():
+                    print(f"   {metric:<20} {values['median_ms']:>10.1f}ms (min {values['min_ms']:.1f}ms)")
+    finally:
+        if args.keep:
+            print(f"📁 Repositories kept in {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+    Path(args.output).write_text(json.dumps(report, indent=2), encoding='utf-8')
+    print(f"💾 Results written to {args.output}")
+    if args.update_baseline:
+        Path(args.update_baseline).write_text(json.dumps(report, indent=2), encoding='utf-8')
+        print(f"📌 Baseline updated: {args.update_baseline}")
+
+    import_ms = report['results']['startup']['import']['min_ms']
+    if eager or import_ms > args.import_budget:
+        if eager:
+            print(f"\n❌ Importing commit_push loads {', '.join(eager)}; import them where they are used")
+        if import_ms > args.import_budget:
+            print(f"\n❌ Importing commit_push took {import_ms:.1f}ms (budget {args.import_budget:g}ms)")
+        sys.exit(1)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ Performance regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
@@ -14,39 +14,488 @@ import subprocess
 import sys
 import os
 import json
+import math
 import argparse
+import atexit
+import errno
+import glob
+import bisect
+import heapq
+import fnmatch
+import re
+import select
+import struct
+import threading
+import time
 from pathlib import Path
-from typing import Optional, Dict, List, Tuple
-from dataclasses import dataclass
+from typing import Optional, Dict, List, Tuple, Iterable, Iterator, Any, Callable, ClassVar, Union, get_args, get_origin
+from dataclasses import dataclass, field
+from collections import OrderedDict
+from contextlib import closing, contextmanager
 from datetime import datetime
 
+try:
+    import fcntl
+except ImportError:  # Windows: the queue falls back to in-process locking
+    fcntl = None
+
+class ConfigError(ValueError):
+    """Raised when a configuration value has the wrong type or is out of range."""
+
 # Configuration
 @dataclass
 class Config:
+    """Settings merged from defaults, .commit-push.json, environment and CLI flags.
+
+    Later layers win. Every layer is validated against the field types
+    below, so a bad value fails with its source instead of deep in a run.
+    """
     repo_name: str = "auto-commit-push"
     username: str = "khafidmedheb"
     default_branch: str = "main"
     max_commit_length: int = 72
     use_conventional_commits: bool = True
     ollama_model: str = "mistral"
+    max_status_records: Optional[int] = None
+    message_cache_size: int = 256
+    syntax_cache_size: int = 20000
+    syntax_pool_threshold: int = 16
+    large_file_threshold_mb: float = 10.0
+    large_file_allowlist: List[str] = field(default_factory=list)
+    secret_allowlist: List[str] = field(default_factory=list)
+    prompt_token_budget: int = 1500
+    heuristic_confidence: float = 0.85
+    commit_candidates: int = 1
+    split_max_groups: int = 6
+    history_index_max_commits: int = 20000
+    llm_backend: str = "http"
+    ollama_host: str = field(default_factory=lambda: os.environ.get("OLLAMA_HOST", "http://127.0.0.1:11434"))
+    ollama_keep_alive: str = "10m"
+    ollama_connect_timeout: float = 2.0
+    ollama_first_token_timeout: float = 45.0
+    ollama_total_timeout: float = 90.0
+    batch_workers: int = field(default_factory=lambda: min(8, os.cpu_count() or 1))
+    batch_push_concurrency: int = 4
+    stage_include: List[str] = field(default_factory=list)
+    stage_exclude: List[str] = field(default_factory=list)
+    push_queue_path: Optional[str] = field(default_factory=lambda: os.environ.get("COMMIT_PUSH_QUEUE"))
+    push_retry_base_seconds: float = 30.0
+    push_retry_max_seconds: float = 3600.0
+    push_defer_seconds: float = 60.0
+    ssh_control_master: bool = False
+    ssh_control_persist: str = "10m"
+    watch_quiet_seconds: float = 3.0
+    watch_max_delay_seconds: float = 120.0
+    watch_poll_interval: float = 2.0
+    watch_max_paths: int = 1000
+    preflight: bool = False
+    non_interactive: bool = False
+    diagnostics_ttl_seconds: float = 600.0
+    diagnostics_timeout_seconds: float = 5.0
+    journal: bool = True
+    journal_max_bytes: int = 1024 * 1024
+    journal_files: int = 5
+    rename_similarity: int = 50
+    rename_limit: int = 1000
+    rename_max_files: int = 20000
+    git_remote_url: Optional[str] = None
+
+    FILE_NAME: ClassVar[str] = ".commit-push.json"
+    # .commit-push.json keys whose field has a different name; sections also accept field names
+    FILE_KEYS: ClassVar[Dict[Tuple[str, str], str]] = {
+        ('git', 'branch'): 'default_branch',
+        ('git', 'remote_url'): 'git_remote_url',
+        ('ai', 'model'): 'ollama_model',
+        ('ai', 'backend'): 'llm_backend',
+        ('ai', 'host'): 'ollama_host',
+        ('ai', 'candidates'): 'commit_candidates',
+        ('staging', 'include'): 'stage_include',
+        ('staging', 'exclude'): 'stage_exclude',
+    }
+    # Environment variables predating the COMMIT_PUSH_<FIELD> scheme
+    ENV_ALIASES: ClassVar[Dict[str, str]] = {
+        'OLLAMA_HOST': 'ollama_host',
+        'COMMIT_PUSH_QUEUE': 'push_queue_path',
+    }
+    MINIMUMS: ClassVar[Dict[str, float]] = {
+        'max_commit_length': 10, 'commit_candidates': 1, 'split_max_groups': 1, 'message_cache_size': 1,
+        'syntax_cache_size': 1, 'max_status_records': 1, 'prompt_token_budget': 100, 'batch_workers': 1,
+        'batch_push_concurrency': 1, 'watch_max_paths': 1, 'history_index_max_commits': 1,
+        'diagnostics_timeout_seconds': 0.5, 'journal_max_bytes': 4096, 'journal_files': 1,
+        'rename_similarity': 1, 'rename_limit': 1,
+    }
+    MAXIMUMS: ClassVar[Dict[str, float]] = {'rename_similarity': 100}
+    CHOICES: ClassVar[Dict[str, Tuple[str, ...]]] = {'llm_backend': ('http', 'langchain')}
+    # Command-line flags, applied over every repository's file in --repos mode too
+    overrides: ClassVar[Dict[str, Any]] = {}
+    _file_cache: ClassVar[Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]]] = {}
+    _file_cache_lock: ClassVar[threading.Lock] = threading.Lock()
     
     @property
     def remote_url(self) -> str:
-        return f"git@github.com:{self.username}/{self.repo_name}.git"
+        return self.git_remote_url or f"git@github.com:{self.username}/{self.repo_name}.git"
+
+    @classmethod
+    def load(cls, root: Path, overrides: Optional[Dict[str, Any]] = None,
+             default_repo_name: Optional[str] = None) -> 'Config':
+        """Build the configuration for the repository at ``root``."""
+        values: Dict[str, Any] = {}
+        if default_repo_name:
+            values['repo_name'] = default_repo_name
+        values.update(cls.read_file(root / cls.FILE_NAME))
+        values.update(cls.environment_values())
+        values.update(cls.validate(cls.overrides if overrides is None else overrides, "command line"))
+        return cls(**values)
+
+    @classmethod
+    def read_file(cls, path: Path) -> Dict[str, Any]:
+        """Validated field values from a .commit-push.json, cached on its mtime and size."""
+        try:
+            stat = path.stat()
+        except OSError:
+            return {}
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with cls._file_cache_lock:
+            cached = cls._file_cache.get(str(path))
+        if cached and cached[0] == stamp:
+            return dict(cached[1])
+        try:
+            data = json.loads(path.read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            raise ConfigError(f"{path}: not valid JSON ({e})") from None
+        if not isinstance(data, dict):
+            raise ConfigError(f"{path}: expected a JSON object")
+        # Keys that are not settings of this tool (log_level, quality_checks...) are left alone
+        raw: Dict[str, Any] = {}
+        for key, value in data.items():
+            if isinstance(value, dict):
+                for inner, inner_value in value.items():
+                    name = cls.FILE_KEYS.get((key, inner), inner)
+                    if name in cls.__dataclass_fields__:
+                        raw[name] = inner_value
+            elif key in cls.__dataclass_fields__:
+                raw[key] = value
+        values = cls.validate(raw, str(path))
+        with cls._file_cache_lock:
+            cls._file_cache[str(path)] = (stamp, values)
+        return dict(values)
+
+    @classmethod
+    def environment_values(cls, environ: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Field values from ``COMMIT_PUSH_<FIELD>`` variables and the older aliases."""
+        environ = os.environ if environ is None else environ
+        raw = {name: environ[variable] for variable, name in cls.ENV_ALIASES.items() if variable in environ}
+        for name in cls.__dataclass_fields__:
+            variable = f"COMMIT_PUSH_{name.upper()}"
+            if variable in environ:
+                raw[name] = environ[variable]
+        return cls.validate(raw, "environment")
+
+    @classmethod
+    def validate(cls, raw: Dict[str, Any], source: str) -> Dict[str, Any]:
+        """Coerce raw values to their field types; strings from the environment are parsed."""
+        return {name: cls._coerce(name, value, source) for name, value in raw.items()}
+
+    @classmethod
+    def _coerce(cls, name: str, value: Any, source: str) -> Any:
+        if name not in cls.__dataclass_fields__:
+            raise ConfigError(f"{source}: unknown setting '{name}'")
+        expected = cls.__dataclass_fields__[name].type
+        if get_origin(expected) is Union:
+            if value is None or value == '':
+                return None
+            expected = next(arg for arg in get_args(expected) if arg is not type(None))
+
+        def invalid(kind: str) -> ConfigError:
+            return ConfigError(f"{source}: {name} must be {kind}, got {value!r}")
+
+        if get_origin(expected) is list:
+            if isinstance(value, str):
+                value = [item.strip() for item in value.split(',') if item.strip()]
+            if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+                raise invalid("a list of strings")
+            return list(value)
+        if expected is bool:
+            if isinstance(value, str) and value.lower() in ('1', 'true', 'yes', 'on', '0', 'false', 'no', 'off'):
+                return value.lower() in ('1', 'true', 'yes', 'on')
+            if not isinstance(value, bool):
+                raise invalid("true or false")
+            return value
+        if expected in (int, float):
+            try:
+                if isinstance(value, bool) or (expected is int and isinstance(value, float)):
+                    raise ValueError
+                number = expected(value)
+            except (TypeError, ValueError):
+                raise invalid("an integer" if expected is int else "a number") from None
+            minimum = cls.MINIMUMS.get(name, 0)
+            if number < minimum:
+                raise invalid(f"at least {minimum:g}")
+            if name in cls.MAXIMUMS and number > cls.MAXIMUMS[name]:
+                raise invalid(f"at most {cls.MAXIMUMS[name]:g}")
+            return number
+        if not isinstance(value, str) or not value:
+            raise invalid("a non-empty string")
+        if name in cls.CHOICES and value not in cls.CHOICES[name]:
+            raise invalid("one of " + ", ".join(cls.CHOICES[name]))
+        return value
 
 # Global config instance
 config = Config()
 
+# Repository a thread is working on; unset means the process working directory
+_repo_context = threading.local()
+
+class CommandTrace:
+    """Timing of one subprocess, completed with ``finish``."""
+
+    def __init__(self, owner: 'Tracer', command):
+        self.owner = owner
+        self.command = command if isinstance(command, str) else ' '.join(str(part) for part in command)
+        self.started = time.perf_counter()
+
+    def finish(self, returncode: Optional[int], output: Any = None) -> None:
+        if not self.owner.enabled:
+            return
+        size = output if isinstance(output, int) else len(output or b'')
+        words = self.command.split()
+        if words[:1] == ['git']:
+            # Skip global options such as "-c key=value" to name the subcommand
+            rest = words[1:]
+            while rest and rest[0].startswith('-'):
+                rest = rest[2:] if rest[0] in ('-c', '-C') else rest[1:]
+            name = f"git {rest[0]}" if rest else 'git'
+        else:
+            name = words[0] if words else 'command'
+        self.owner.record(name, 'subprocess', self.started, time.perf_counter() - self.started,
+                          command=self.command, exit_code=returncode, output_bytes=size)
+
+class Tracer:
+    """Collects phase and subprocess timings for ``--profile``.
+
+    Spans are only recorded while ``enabled`` is set, so the default run
+    pays for little more than a flag check.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.events: List[Dict[str, Any]] = []
+        self.origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **fields):
+        """Time a phase of the run, for the profile and the run journal."""
+        journal_record = getattr(_repo_context, 'record', None)
+        if not self.enabled and journal_record is None:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            if journal_record is not None:
+                journal_record.add_phase(name, elapsed)
+            if self.enabled:
+                self.record(name, 'phase', started, elapsed, **fields)
+
+    def command(self, command) -> CommandTrace:
+        return CommandTrace(self, command)
+
+    def record(self, name: str, category: str, started: float, duration: float, **fields) -> None:
+        label = getattr(_repo_context, 'label', None)
+        if label:
+            fields['repo'] = label
+        event = {
+            'name': name, 'cat': category, 'ph': 'X', 'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'ts': round((started - self.origin) * 1e6), 'dur': round(duration * 1e6),
+            'args': fields,
+        }
+        with self._lock:
+            self.events.append(event)
+
+    def write_chrome_trace(self, path: Path) -> None:
+        """Write the events in Chrome trace format (chrome://tracing, Perfetto)."""
+        with self._lock:
+            events = list(self.events)
+        path.write_text(json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'}), encoding='utf-8')
+
+    def print_summary(self) -> None:
+        """Print per-phase and per-command totals."""
+        with self._lock:
+            events = list(self.events)
+        for category, title in (('phase', 'Phase'), ('subprocess', 'Command')):
+            totals: Dict[str, List[float]] = {}
+            for event in events:
+                if event['cat'] != category:
+                    continue
+                entry = totals.setdefault(event['name'], [0, 0.0, 0.0, 0])
+                entry[0] += 1
+                entry[1] += event['dur'] / 1000
+                entry[2] = max(entry[2], event['dur'] / 1000)
+                entry[3] += event['args'].get('output_bytes', 0)
+            if not totals:
+                continue
+            width = max(len(name) for name in totals) + 2
+            size_header = f" {'Bytes':>10}" if category == 'subprocess' else ''
+            print(f"\n⏱️ {title:<{width - 3}} {'Count':>6} {'Total ms':>10} {'Max ms':>9}{size_header}")
+            for name, (count, total, longest, size) in sorted(totals.items(), key=lambda item: -item[1][1]):
+                size_column = f" {size:>10}" if category == 'subprocess' else ''
+                print(f"{name:<{width}} {count:>6} {total:>10.1f} {longest:>9.1f}{size_column}")
+
+# Global tracer instance
+tracer = Tracer()
+
+class CatFileSession:
+    """A long-lived ``git cat-file --batch`` (or ``--batch-check``) process.
+
+    Requests go out in chunks small enough to sit in the pipe buffer, and
+    their replies are read back before the next chunk, so thousands of
+    lookups share one process without either side blocking on a full
+    pipe. ``GitOperations.cat_file`` keeps one session per repository and
+    mode, and closes them at exit.
+    """
+
+    CHUNK = 256
+
+    def __init__(self, repo: Optional[str], contents: bool):
+        self.repo = repo
+        self.mode = "--batch" if contents else "--batch-check"
+        self.lock = threading.Lock()
+        self.process: Optional[subprocess.Popen] = None
+
+    def _start(self) -> subprocess.Popen:
+        if self.process is None or self.process.poll() is not None:
+            self.process = subprocess.Popen(["git", "cat-file", self.mode], cwd=self.repo, stdin=subprocess.PIPE,
+                                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        return self.process
+
+    def query(self, names: List[str]) -> Dict[str, Tuple[str, int, Optional[bytes]]]:
+        """Type, size and (for ``--batch``) content of each object found, keyed by the name asked.
+
+        Names are anything ``git rev-parse`` accepts, such as a blob SHA or
+        ``HEAD:path``; missing objects are left out.
+        """
+        found: Dict[str, Tuple[str, int, Optional[bytes]]] = {}
+        if not names:
+            return found
+        with self.lock:
+            trace = tracer.command(["git", "cat-file", self.mode])
+            received = 0
+            try:
+                process = self._start()
+                for start in range(0, len(names), self.CHUNK):
+                    chunk = names[start:start + self.CHUNK]
+                    process.stdin.write(''.join(f"{name}\n" for name in chunk).encode())
+                    process.stdin.flush()
+                    for name in chunk:
+                        header = process.stdout.readline()
+                        if not header.endswith(b'\n'):
+                            raise OSError("git cat-file exited")
+                        received += len(header)
+                        parts = header.split()
+                        if len(parts) != 3 or not parts[2].isdigit():
+                            continue  # "<name> missing" or "<name> ambiguous"
+                        size, data = int(parts[2]), None
+                        if self.mode == "--batch":
+                            data = process.stdout.read(size + 1)
+                            if len(data) != size + 1:
+                                raise OSError("git cat-file exited")
+                            received += size + 1
+                            data = data[:size]
+                        found[name] = (parts[1].decode(), size, data)
+            except FileNotFoundError:
+                print("❌ Git executable not found")
+            except OSError as e:
+                print(f"⚠️ git cat-file session failed: {e}")
+                self.close()
+            trace.finish(0, received)
+        return found
+
+    def close(self) -> None:
+        process, self.process = self.process, None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+            process.wait(timeout=1)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+            process.wait()
+        process.stdout.close()
+
 class GitOperations:
     """Handles all Git operations with enhanced error handling."""
     
+    _sessions: Dict[Tuple[Optional[str], bool], CatFileSession] = {}
+    _sessions_lock = threading.Lock()
+
+    @staticmethod
+    def current_repo() -> Optional[str]:
+        """Repository bound to the calling thread, if any."""
+        return getattr(_repo_context, 'path', None)
+
+    @staticmethod
+    @contextmanager
+    def use_repo(path: Path, label: Optional[str] = None):
+        """Run git commands from this thread inside ``path``."""
+        previous = (GitOperations.current_repo(), getattr(_repo_context, 'label', None))
+        _repo_context.path, _repo_context.label = str(path), label
+        try:
+            yield
+        finally:
+            _repo_context.path, _repo_context.label = previous
+
+    @staticmethod
+    def bind_repo(fn: Callable) -> Callable:
+        """Wrap ``fn`` so it runs in the caller's repository (and run record) on any thread."""
+        path, label = GitOperations.current_repo(), getattr(_repo_context, 'label', None)
+        record = getattr(_repo_context, 'record', None)
+        if path is None and record is None:
+            return fn
+
+        def bound(*args, **kwargs):
+            previous = getattr(_repo_context, 'record', None)
+            _repo_context.record = record
+            try:
+                if path is None:
+                    return fn(*args, **kwargs)
+                with GitOperations.use_repo(Path(path), label):
+                    return fn(*args, **kwargs)
+            finally:
+                _repo_context.record = previous
+        return bound
+
+    @staticmethod
+    def worktree_path(path: str) -> Path:
+        """Resolve a repository-relative path for the bound repository."""
+        repo = GitOperations.current_repo()
+        return Path(repo) / path if repo else Path(path)
+
+    @staticmethod
+    def _run(command, **kwargs) -> subprocess.CompletedProcess:
+        """``subprocess.run`` inside the bound repository, recorded by the tracer."""
+        trace = tracer.command(command)
+        try:
+            result = subprocess.run(command, cwd=GitOperations.current_repo(), **kwargs)
+        except subprocess.CalledProcessError as e:
+            trace.finish(e.returncode, e.output)
+            raise
+        trace.finish(result.returncode, result.stdout)
+        return result
+
     @staticmethod
-    def run_command(command: str, capture_output: bool = True, check: bool = True) -> Optional[str]:
-        """Execute system command with enhanced error handling."""
+    def run_command(command: List[str], capture_output: bool = True, check: bool = True) -> Optional[str]:
+        """Execute system command with enhanced error handling.
+
+        Arguments go to the program as they are, without a shell, so a
+        commit message needs no quoting.
+        """
         try:
-            result = subprocess.run(
+            result = GitOperations._run(
                 command, 
-                shell=True, 
                 capture_output=capture_output, 
                 text=True, 
                 check=check,
@@ -55,128 +504,829 @@ class GitOperations:
             return result.stdout.strip() if capture_output else None
         except subprocess.CalledProcessError as e:
             if capture_output:
-                print(f"❌ Command failed: {command}")
+                print(f"❌ Command failed: {' '.join(command)}")
                 print(f"   Exit code: {e.returncode}")
                 if e.stderr:
                     print(f"   Error: {e.stderr}")
             return None
+        except FileNotFoundError:
+            print(f"❌ Command not found: {command[0]}")
+            return None
         except UnicodeDecodeError:
-            print(f"⚠️ Encoding issue with command: {command}")
+            print(f"⚠️ Encoding issue with command: {' '.join(command)}")
             return None
 
     @staticmethod
     def is_git_repo() -> bool:
         """Check if current directory is a Git repository."""
-        return Path(".git").exists()
+        return GitOperations.worktree_path(".git").exists()
+
+    @staticmethod
+    def run_git(args: List[str], check: bool = True) -> Optional[bytes]:
+        """Execute a git command without a shell and return its raw stdout."""
+        try:
+            result = GitOperations._run(["git"] + args, capture_output=True, check=check)
+            return result.stdout
+        except subprocess.CalledProcessError as e:
+            print(f"❌ Command failed: git {' '.join(args)}")
+            print(f"   Exit code: {e.returncode}")
+            if e.stderr:
+                print(f"   Error: {os.fsdecode(e.stderr).strip()}")
+            return None
+        except FileNotFoundError:
+            print("❌ Git executable not found")
+            return None
+
+    @staticmethod
+    def stream_git(args: List[str], separator: bytes = b'\0', max_records: Optional[int] = None,
+                   chunk_size: int = 64 * 1024, env: Optional[Dict[str, str]] = None) -> Iterator[bytes]:
+        """Yield separator-delimited records from a git command as they arrive.
+
+        Output is read from the pipe in fixed-size chunks, so memory stays
+        bounded by the chunk size plus the longest record. Closing the
+        generator or reaching ``max_records`` terminates the git process early.
+        """
+        blocks = GitOperations.stream_git_blocks(args, separator, chunk_size, env)
+        emitted = 0
+        try:
+            for block in blocks:
+                records = block.split(separator)
+                if records[-1] == b'':
+                    records.pop()
+                for record in records:
+                    yield record
+                    emitted += 1
+                    if max_records is not None and emitted >= max_records:
+                        return
+        finally:
+            blocks.close()
+
+    @staticmethod
+    def stream_git_blocks(args: List[str], separator: bytes = b'\n',
+                          chunk_size: int = 1024 * 1024, env: Optional[Dict[str, str]] = None) -> Iterator[bytes]:
+        """Yield git output in blocks that always end on a separator.
+
+        Lets callers run a regex over large slices of output in one pass
+        instead of handling each record in Python.
+        """
+        try:
+            process = subprocess.Popen(["git"] + args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                       cwd=GitOperations.current_repo(), env=env)
+        except FileNotFoundError:
+            print("❌ Git executable not found")
+            return
+
+        trace = tracer.command(["git"] + args)
+        received = 0
+        pending = b''
+        finished = False
+        try:
+            while True:
+                chunk = process.stdout.read1(chunk_size)
+                if not chunk:
+                    break
+                received += len(chunk)
+                pending += chunk
+                cut = pending.rfind(separator)
+                if cut < 0:
+                    continue
+                block, pending = pending[:cut + len(separator)], pending[cut + len(separator):]
+                yield block
+            if pending:
+                yield pending
+            finished = True
+        finally:
+            if process.poll() is None:
+                process.kill()
+            process.stdout.close()
+            process.wait()
+            trace.finish(process.returncode, received)
+            if finished and process.returncode != 0:
+                print(f"❌ Command failed: git {' '.join(args)}")
+                print(f"   Exit code: {process.returncode}")
 
     @staticmethod
     def get_repo_status() -> Dict[str, List[str]]:
         """Get comprehensive repository status."""
-        status = {
-            'untracked': [],
-            'modified': [],
-            'staged': [],
-            'deleted': [],
-            'renamed': []
-        }
-        
-        # Get untracked files
-        untracked = GitOperations.run_command("git ls-files --others --exclude-standard")
-        if untracked:
-            status['untracked'] = untracked.split('\n')
-        
-        # Get modified files
-        modified = GitOperations.run_command("git diff --name-only")
-        if modified:
-            status['modified'] = modified.split('\n')
-        
-        # Get staged files
-        staged = GitOperations.run_command("git diff --cached --name-only")
-        if staged:
-            status['staged'] = staged.split('\n')
-            
-        # Get deleted files
-        deleted = GitOperations.run_command("git ls-files --deleted")
-        if deleted:
-            status['deleted'] = deleted.split('\n')
-            
-        return status
+        return RepoSnapshot.capture().status
 
     @staticmethod
     def get_file_changes() -> Dict[str, int]:
         """Get detailed file change statistics."""
-        stats = GitOperations.run_command("git diff --numstat")
-        if not stats:
-            stats = GitOperations.run_command("git diff --cached --numstat")
-        
-        changes = {'additions': 0, 'deletions': 0, 'files': 0}
-        if stats:
-            for line in stats.split('\n'):
-                parts = line.split('\t')
-                if len(parts) >= 2:
-                    try:
-                        changes['additions'] += int(parts[0]) if parts[0] != '-' else 0
-                        changes['deletions'] += int(parts[1]) if parts[1] != '-' else 0
-                        changes['files'] += 1
-                    except ValueError:
-                        continue
-                        
-        return changes
+        return RepoSnapshot.capture().stats
+
+    @staticmethod
+    def get_git_dir() -> Optional[Path]:
+        """Locate the repository's .git directory."""
+        git_dir = GitOperations.run_git(["rev-parse", "--absolute-git-dir"], check=False)
+        return Path(os.fsdecode(git_dir.strip())) if git_dir else None
+
+    @staticmethod
+    def get_staged_blobs(pathspecs: Optional[List[str]] = None) -> List[Tuple[str, str]]:
+        """Added, copied or modified staged files as (path, blob SHA)."""
+        args = ["diff", "--cached", "--raw", "-z", "--no-abbrev", "--no-renames", "--diff-filter=ACM"]
+        if pathspecs:
+            args += ["--"] + pathspecs
+        records = GitOperations.stream_git(args)
+        staged: List[Tuple[str, str]] = []
+        for meta in records:
+            path = next(records, b'')
+            if not meta.startswith(b':') or not path:
+                continue
+            staged.append((os.fsdecode(path), meta.split()[3].decode()))
+        return staged
+
+    @staticmethod
+    def cat_file(contents: bool = False) -> CatFileSession:
+        """The bound repository's persistent ``cat-file --batch`` (``contents``) or ``--batch-check`` session."""
+        key = (GitOperations.current_repo(), contents)
+        with GitOperations._sessions_lock:
+            session = GitOperations._sessions.get(key)
+            if session is None:
+                if not GitOperations._sessions:
+                    atexit.register(GitOperations.close_sessions)
+                session = GitOperations._sessions[key] = CatFileSession(key[0], contents)
+        return session
+
+    @staticmethod
+    def close_sessions() -> None:
+        with GitOperations._sessions_lock:
+            sessions = list(GitOperations._sessions.values())
+            GitOperations._sessions.clear()
+        for session in sessions:
+            with session.lock:
+                session.close()
+
+    @staticmethod
+    def read_blob_sizes(blob_shas: List[str]) -> Dict[str, int]:
+        """Look up many blob sizes through the repository's ``git cat-file --batch-check`` session."""
+        found = GitOperations.cat_file().query(blob_shas)
+        return {sha: size for sha, (_, size, _) in found.items()}
+
+    @staticmethod
+    def read_blobs(blob_shas: List[str]) -> Dict[str, bytes]:
+        """Read many blobs through the repository's ``git cat-file --batch`` session."""
+        found = GitOperations.cat_file(contents=True).query(blob_shas)
+        return {sha: data for sha, (_, _, data) in found.items()}
+
+    @staticmethod
+    def get_staged_tree() -> Optional[str]:
+        """Hash of the tree currently staged in the index."""
+        tree = GitOperations.run_git(["write-tree"], check=False)
+        return tree.decode().strip() if tree else None
+
+    @staticmethod
+    def ensure_remote(remote_url: Optional[str] = None) -> None:
+        """Add the configured origin remote when none exists."""
+        remote_url = remote_url or config.remote_url
+        existing_remote = GitOperations.run_git(["remote", "get-url", "origin"], check=False)
+        if not existing_remote:
+            GitOperations.run_command(["git", "remote", "add", "origin", remote_url], capture_output=False)
+            print(f"📡 Remote configured: {remote_url}")
+
+    @staticmethod
+    def stage_paths(paths: List[str]) -> bool:
+        """Stage exactly ``paths`` (additions, edits and deletions) in one batched call.
+
+        Paths go NUL-separated to ``git update-index --add --remove --stdin``,
+        which looks each one up in the index directly, so the cost follows
+        the number of paths rather than the size of the repository.
+        Directory entries (nested repositories) still go through
+        ``git add --pathspec-from-file``.
+        """
+        files = [path for path in paths if not path.endswith('/')]
+        directories = [path for path in paths if path.endswith('/')]
+        commands = []
+        if files:
+            commands.append((["git", "update-index", "--add", "--remove", "-z", "--stdin"],
+                             b''.join(os.fsencode(path) + b'\0' for path in files)))
+        if directories:
+            commands.append((["git", "add", "--pathspec-from-file=-", "--pathspec-file-nul"],
+                             b''.join(os.fsencode(f":(top,literal){path}") + b'\0' for path in directories)))
+        for command, paths_input in commands:
+            try:
+                result = GitOperations._run(command, input=paths_input, capture_output=True)
+            except FileNotFoundError:
+                print("❌ Git executable not found")
+                return False
+            if result.returncode != 0:
+                print(f"❌ Command failed: {' '.join(command[:2])}")
+                print(f"   Error: {os.fsdecode(result.stderr).strip()}")
+                return False
+        return True
+
+    @staticmethod
+    def stage_snapshot(snapshot: 'RepoSnapshot') -> bool:
+        """Stage what ``snapshot`` saw, or everything when its listing was capped."""
+        if snapshot.truncated:
+            return GitOperations.run_git(["add", "--all"]) is not None
+        return GitOperations.stage_paths(snapshot.staging_paths())
+
+    @staticmethod
+    def push(branch: str) -> bool:
+        """Push ``branch`` to origin and report whether it succeeded."""
+        pushed, error = GitOperations.push_branches("origin", [branch])
+        if not pushed and error:
+            print(f"   Error: {error}")
+        return pushed
+
+    @staticmethod
+    def push_branches(remote: str, branches: List[str]) -> Tuple[bool, str]:
+        """Push several branches to ``remote`` in one connection; returns (ok, error text)."""
+        try:
+            result = GitOperations._run(["git", "push", "-u", remote] + branches, capture_output=True,
+                                        env=GitOperations.ssh_environment(remote))
+        except FileNotFoundError:
+            return False, "Git executable not found"
+        return result.returncode == 0, os.fsdecode(result.stderr).strip() if result.returncode else ""
+
+    @staticmethod
+    def ssh_environment(remote: str) -> Optional[Dict[str, str]]:
+        """Environment that reuses one SSH ControlMaster connection per host, when enabled."""
+        if not config.ssh_control_master:
+            return None
+        url = os.fsdecode(GitOperations.run_git(["remote", "get-url", remote], check=False) or b'').strip()
+        if not (url.startswith("ssh://") or re.match(r'^[\w.-]+@[\w.-]+:', url)):
+            return None
+        control_dir = PushQueue.default_path().parent
+        control_dir.mkdir(parents=True, exist_ok=True)
+        ssh = os.environ.get("GIT_SSH_COMMAND") or os.environ.get("GIT_SSH") or "ssh"
+        env = dict(os.environ)
+        env["GIT_SSH_COMMAND"] = (f"{ssh} -o ControlMaster=auto -o ControlPath={control_dir}/ssh-%C "
+                                  f"-o ControlPersist={config.ssh_control_persist}")
+        return env
+
+    @staticmethod
+    def head_commit() -> Optional[str]:
+        """SHA of HEAD, or ``None`` while it is unborn."""
+        head = GitOperations.run_git(["rev-parse", "--verify", "-q", "HEAD"], check=False)
+        return head.decode().strip() or None if head else None
 
     @staticmethod
     def get_recent_commits(limit: int = 5) -> List[str]:
-        """Get recent commit messages for context."""
-        result = GitOperations.run_command(f"git log --oneline -n {limit}")
-        return result.split('\n') if result else []
+        """Get recent commit subjects for context (none while HEAD is unborn)."""
+        if GitOperations.head_commit() is None:
+            return []
+        result = GitOperations.run_git(["log", "--format=%s", f"--max-count={limit}"], check=False)
+        return os.fsdecode(result).splitlines() if result else []
 
-class CommitMessageGenerator:
-    """Enhanced AI-powered commit message generator."""
-    
-    def __init__(self, model_name: str = "mistral"):
-        self.model_name = model_name
-        self.conventional_types = {
-            'feat': '✨',
-            'fix': '🐛', 
-            'docs': '📝',
-            'style': '🎨',
-            'refactor': '♻️',
-            'perf': '⚡',
-            'test': '✅',
-            'build': '🔧',
-            'ci': '👷',
-            'chore': '🔧',
-            'security': '🔒',
-            'config': '⚙️'
+# Hash of the empty tree, used as diff base while HEAD is unborn
+EMPTY_TREE_SHA = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+
+def _matches_glob(path: str, patterns: List[str]) -> bool:
+    """Match ``path`` against globs by full path, file name or directory prefix."""
+    name = path.rsplit('/', 1)[-1]
+    for pattern in patterns:
+        if fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(name, pattern):
+            return True
+        if pattern.endswith('/') and (path + '/').startswith(pattern):
+            return True
+    return False
+
+@dataclass
+class RepoSnapshot:
+    """Point-in-time view of the working tree built from one status pass.
+
+    Paths and line counts come from a single ``git status --porcelain=v2 -z``
+    call and a single combined ``git diff --numstat -z`` call, so the index
+    and worktree are walked once per run instead of once per bucket.
+
+    The diff runs from HEAD (the empty tree while HEAD is unborn) to the
+    worktree, so staged and unstaged edits count once each. Untracked files
+    join it as intent-to-add entries of a scratch index, which lets git pair
+    a moved file with its deleted source as a rename. Rename detection is
+    bounded by ``rename_limit`` and skipped beyond ``rename_max_files``
+    changed paths. Binary files report their size in bytes before and after.
+    """
+    untracked: List[str] = field(default_factory=list)
+    modified: List[str] = field(default_factory=list)
+    staged: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+    renamed: List[str] = field(default_factory=list)
+    unstaged: List[str] = field(default_factory=list)
+    added: List[str] = field(default_factory=list)
+    rename_sources: Dict[str, str] = field(default_factory=dict)
+    line_changes: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+    binary_changes: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+    branch: Optional[str] = None
+    head_oid: Optional[str] = None
+    truncated: bool = False
+
+    BUCKETS = ('untracked', 'modified', 'staged', 'deleted', 'renamed')
+
+    @property
+    def status(self) -> Dict[str, List[str]]:
+        """Status buckets in the shape returned by ``get_repo_status``."""
+        return {bucket: getattr(self, bucket) for bucket in self.BUCKETS}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Aggregate line statistics in the shape returned by ``get_file_changes``."""
+        return {
+            'additions': sum(added for added, _ in self.line_changes.values()),
+            'deletions': sum(removed for _, removed in self.line_changes.values()),
+            'files': len(self.all_paths()),
+            'binary_files': len(self.binary_changes),
+            'binary_bytes': sum(after - before for before, after in self.binary_changes.values()),
         }
 
-    def analyze_changes(self, status: Dict[str, List[str]], stats: Dict[str, int]) -> str:
-        """Analyze changes to determine commit type and scope."""
-        analysis = []
-        
-        # Determine primary change type
-        if any('test' in f.lower() for files in status.values() for f in files):
-            analysis.append("test files")
-        if any(f.endswith(('.md', '.rst', '.txt')) for files in status.values() for f in files):
-            analysis.append("documentation")
-        if any(f.endswith(('.json', '.yml', '.yaml', '.toml', '.ini')) for files in status.values() for f in files):
-            analysis.append("configuration")
-        if any(f.endswith(('.py', '.js', '.ts', '.java', '.cpp')) for files in status.values() for f in files):
-            analysis.append("source code")
-            
-        return ", ".join(analysis) if analysis else "general changes"
+    @property
+    def has_changes(self) -> bool:
+        return any(getattr(self, bucket) for bucket in self.BUCKETS)
 
-    def generate_enhanced_message(self, status: Dict[str, List[str]], stats: Dict[str, int], recent_commits: List[str]) -> Optional[str]:
-        """Generate enhanced commit message with better context."""
+    def all_paths(self) -> List[str]:
+        """Every changed path once, in bucket order."""
+        seen: Dict[str, None] = {}
+        for bucket in self.BUCKETS:
+            for path in getattr(self, bucket):
+                seen.setdefault(path, None)
+        return list(seen)
+
+    def staging_paths(self) -> List[str]:
+        """Paths with worktree changes still to be staged.
+
+        Untracked files, edits and deletions all appear in ``unstaged``;
+        for a staged rename the source is already gone from the index, so
+        only the destination needs adding if it changed again.
+        """
+        return list(dict.fromkeys(self.unstaged))
+
+    def filtered(self, include: List[str], exclude: List[str]) -> 'RepoSnapshot':
+        """Copy of the snapshot limited to paths matching the staging globs.
+
+        A path is kept when it matches an ``include`` glob (or none are
+        set) and no ``exclude`` glob. Globs match the full path, the file
+        name, or a directory prefix such as ``build/``.
+        """
+        if not include and not exclude:
+            return self
+        return self.subset({path for path in self.all_paths()
+                            if (not include or _matches_glob(path, include)) and not _matches_glob(path, exclude)})
+
+    def subset(self, kept: set) -> 'RepoSnapshot':
+        """Copy of the snapshot holding only the paths in ``kept``."""
+        narrowed = RepoSnapshot(branch=self.branch, head_oid=self.head_oid, truncated=self.truncated)
+        for bucket in self.BUCKETS + ('added',):
+            setattr(narrowed, bucket, [path for path in getattr(self, bucket) if path in kept])
+        narrowed.rename_sources = {path: source for path, source in self.rename_sources.items() if path in kept}
+        # The deleted side of an unstaged move is only listed under its destination
+        sources = set(narrowed.rename_sources.values())
+        narrowed.unstaged = [path for path in self.unstaged if path in kept or path in sources]
+        narrowed.line_changes = {path: lines for path, lines in self.line_changes.items() if path in kept}
+        narrowed.binary_changes = {path: sizes for path, sizes in self.binary_changes.items() if path in kept}
+        return narrowed
+
+    @classmethod
+    def capture(cls, max_records: Optional[int] = None, paths: Optional[List[str]] = None) -> 'RepoSnapshot':
+        """Build a snapshot of the current repository.
+
+        ``max_records`` caps how many status entries are read; the git
+        process is stopped once it is reached and ``truncated`` is set.
+        ``paths`` limits the scan to those repository-relative paths.
+        """
+        if max_records is None:
+            max_records = config.max_status_records
+        pathspecs = ["--"] + [f":(top,literal){path}" for path in paths] if paths is not None else []
+        snapshot = cls()
+        with tracer.span("status"):
+            status_records = GitOperations.stream_git(
+                ["status", "--porcelain=v2", "-z", "--branch", "--untracked-files=all"] + pathspecs
+            )
+            try:
+                snapshot._parse_status(status_records, max_records)
+            finally:
+                status_records.close()
+
+        base = snapshot.head_oid or EMPTY_TREE_SHA
+        args = ["diff", base, "--numstat", "-z"]
+        if len(snapshot.all_paths()) > config.rename_max_files:
+            args.append("--no-renames")
+        else:
+            args += [f"-M{config.rename_similarity}%", f"-l{config.rename_limit}"]
+        with tracer.span("numstat"), snapshot._untracked_index(paths is not None) as env:
+            binaries = snapshot._parse_numstat(GitOperations.stream_git(
+                args + pathspecs, max_records=max_records, env=env,
+            ))
+        if binaries:
+            with tracer.span("binary sizes"):
+                snapshot._measure_binaries(binaries)
+        return snapshot
+
+    @contextmanager
+    def _untracked_index(self, limited: bool):
+        """Environment whose index also holds the untracked files as intent-to-add entries.
+
+        The entries go into a scratch copy of the index, so the real one is
+        never touched (``--dry-run`` included). One ``git add -N --all``
+        walks the tree like status does; listing every untracked path as a
+        pathspec would match each path against every other, so paths are
+        only listed for a ``limited`` (``--watch``) capture. Yields ``None``
+        when there is nothing untracked.
+        """
+        index_path = GitOperations.run_git(["rev-parse", "--git-path", "index"], check=False) \
+            if self.untracked else None
+        if not index_path:
+            yield None
+            return
+        import shutil
+        index = GitOperations.worktree_path(os.fsdecode(index_path.strip()))
+        scratch = index.with_name(f"commit-push-stats-{os.getpid()}-{threading.get_ident()}.index")
         try:
-            from langchain_ollama import OllamaLLM
-            
-            # Build comprehensive context
-            change_analysis = self.analyze_changes(status, stats)
-            files_summary = self._build_files_summary(status)
-            context = self._build_context(stats, recent_commits, change_analysis)
-            
-            # Enhanced prompt for better English commit messages
-            prompt = f"""You are a Git commit message expert. Generate a concise, professional commit message in ENGLISH ONLY.
+            env: Optional[Dict[str, str]] = dict(os.environ, GIT_INDEX_FILE=str(scratch))
+            try:
+                if index.exists():
+                    shutil.copyfile(index, scratch)
+                pathspecs = ["--"] + [f":(top,literal){path}" for path in self.untracked] if limited else []
+                added = GitOperations._run(["git", "add", "--intent-to-add", "--all"] + pathspecs,
+                                           capture_output=True, env=env)
+                if added.returncode != 0:
+                    env = None
+            except OSError:
+                env = None
+            # Without the entries the diff still covers every tracked change
+            yield env
+        finally:
+            for leftover in (scratch, scratch.with_name(scratch.name + ".lock")):
+                if leftover.exists():
+                    leftover.unlink()
+
+    def _parse_status(self, records: Iterable[bytes], max_entries: Optional[int] = None) -> None:
+        """Parse NUL-delimited ``git status --porcelain=v2`` records."""
+        records = iter(records)
+        entries = 0
+        for record in records:
+            if not record:
+                continue
+            entry = os.fsdecode(record)
+            kind = entry[0]
+            if kind != '#':
+                if max_entries is not None and entries >= max_entries:
+                    self.truncated = True
+                    break
+                entries += 1
+
+            if kind == '#':
+                key, _, value = entry[2:].partition(' ')
+                if key == 'branch.oid':
+                    self.head_oid = None if value == '(initial)' else value
+                elif key == 'branch.head':
+                    self.branch = None if value == '(detached)' else value
+            elif kind == '?':
+                self.untracked.append(entry[2:])
+                self.unstaged.append(entry[2:])
+                self.added.append(entry[2:])
+            elif kind == '1':
+                fields = entry.split(' ', 8)
+                self._classify(fields[1], fields[8])
+            elif kind == '2':
+                fields = entry.split(' ', 9)
+                path = fields[9]
+                self.rename_sources[path] = os.fsdecode(next(records, b''))
+                self.renamed.append(path)
+                self._classify(fields[1], path)
+            elif kind == 'u':
+                fields = entry.split(' ', 10)
+                self.modified.append(fields[10])
+                self.unstaged.append(fields[10])
+
+    def _classify(self, xy: str, path: str) -> None:
+        """Place a tracked entry into buckets from its index/worktree codes."""
+        index_code, worktree_code = xy[0], xy[1]
+        if index_code != '.':
+            self.staged.append(path)
+        if index_code == 'A':
+            self.added.append(path)
+        if worktree_code != '.':
+            self.unstaged.append(path)
+        if 'D' in (index_code, worktree_code):
+            self.deleted.append(path)
+        elif worktree_code != '.':
+            self.modified.append(path)
+
+    def _parse_numstat(self, records: Iterable[bytes]) -> Dict[str, str]:
+        """Parse NUL-delimited ``git diff --numstat -z`` records.
+
+        Returns the binary files (``-`` counts), mapped to their path in HEAD.
+        """
+        records = iter(records)
+        binaries: Dict[str, str] = {}
+        moves: Dict[str, str] = {}
+        for record in records:
+            if not record:
+                continue
+            parts = os.fsdecode(record).split('\t', 2)
+            if len(parts) < 3:
+                continue
+            path = source = parts[2]
+            if not path:
+                # Rename records carry the source and destination as extra fields
+                source = os.fsdecode(next(records, b''))
+                path = os.fsdecode(next(records, b''))
+                if path not in self.rename_sources:
+                    moves[path] = source
+            if parts[0] == '-':
+                binaries[path] = source
+            added = int(parts[0]) if parts[0].isdigit() else 0
+            removed = int(parts[1]) if parts[1].isdigit() else 0
+            self.line_changes[path] = (added, removed)
+        if moves:
+            self._record_moves(moves)
+        return binaries
+
+    def _record_moves(self, moves: Dict[str, str]) -> None:
+        """Turn delete + add pairs that the diff paired up into renames.
+
+        Status only sees renames that are staged; a file moved in the
+        worktree shows up as a deletion plus an untracked file. Both paths
+        stay in ``unstaged`` so staging records the move.
+        """
+        self.rename_sources.update(moves)
+        self.renamed.extend(moves)
+        sources = set(moves.values())
+        self.untracked = [path for path in self.untracked if path not in moves]
+        self.added = [path for path in self.added if path not in moves]
+        self.deleted = [path for path in self.deleted if path not in sources]
+        self.staged = [path for path in self.staged if path not in sources]
+        self.modified = [path for path in self.modified if path not in sources]
+
+    def _measure_binaries(self, binaries: Dict[str, str]) -> None:
+        """Byte sizes of binary files in HEAD (one ``cat-file`` request each) and in the worktree."""
+        before: Dict[str, Tuple[str, int, Optional[bytes]]] = {}
+        if self.head_oid:
+            names = [f"{self.head_oid}:{source}" for source in binaries.values() if '\n' not in source]
+            before = GitOperations.cat_file().query(names)
+        for path, source in binaries.items():
+            old = before.get(f"{self.head_oid}:{source}")
+            try:
+                new_size = GitOperations.worktree_path(path).stat().st_size
+            except OSError:
+                new_size = 0
+            self.binary_changes[path] = (old[1] if old else 0, new_size)
+
+class JsonLRUCache:
+    """Size-bounded LRU mapping persisted as JSON under .git/.
+
+    With ``autosave`` every lookup and store is written back immediately;
+    otherwise callers batch their updates and call ``save()`` once.
+    """
+
+    FILENAME = "commit-push-cache.json"
+    LABEL = "cache"
+
+    def __init__(self, path: Optional[Path] = None, max_entries: int = 256, autosave: bool = True):
+        if path is None:
+            git_dir = GitOperations.get_git_dir()
+            path = git_dir / self.FILENAME if git_dir else None
+        self.path = path
+        self.max_entries = max_entries
+        self.autosave = autosave
+        self.entries: 'OrderedDict[str, str]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached value and mark it as recently used."""
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        if self.autosave:
+            self.save()
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        """Store a value, evicting the least recently used entries."""
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        if self.autosave:
+            self.save()
+
+    def _load(self) -> None:
+        if not self.path or not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            self.entries = OrderedDict(data.get('entries', []))
+            self.hits = int(data.get('hits', 0))
+            self.misses = int(data.get('misses', 0))
+        except (OSError, ValueError, TypeError):
+            print(f"⚠️ {self.LABEL.capitalize()} is unreadable, starting fresh")
+            self.entries = OrderedDict()
+
+    def save(self) -> None:
+        """Write the cache back to disk atomically."""
+        if not self.path:
+            return
+        data: Dict[str, Any] = {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': list(self.entries.items()),
+        }
+        tmp_path = self.path.with_suffix('.tmp')
+        try:
+            tmp_path.write_text(json.dumps(data), encoding='utf-8')
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ Could not write {self.LABEL}: {e}")
+
+class MessageCache(JsonLRUCache):
+    """LRU cache of generated commit messages.
+
+    Entries are keyed by the staged tree hash, the model name and a hash of
+    the prompt template, so re-running on an unchanged index skips the LLM.
+    """
+
+    FILENAME = "commit-push-messages.json"
+    LABEL = "commit message cache"
+
+    def __init__(self, path: Optional[Path] = None, max_entries: Optional[int] = None):
+        super().__init__(path, max_entries if max_entries is not None else config.message_cache_size)
+
+    @staticmethod
+    def make_key(tree_hash: str, model_name: str, template: str) -> str:
+        """Build the cache key for a staged tree, model and prompt template."""
+        import hashlib
+        template_hash = hashlib.sha256(template.encode('utf-8')).hexdigest()
+        return hashlib.sha256(f"{tree_hash}\0{model_name}\0{template_hash}".encode('utf-8')).hexdigest()
+
+class CommitHistoryIndex:
+    """On-disk retrieval index over past commit subjects, keyed by touched paths.
+
+    Lives in SQLite under .git/ and is updated incrementally from the last
+    indexed commit. Each commit is stored as a set of path tokens (full
+    path, directories, file stem and its words, extension) in an inverted
+    index. ``similar`` scores candidates by TF-IDF-weighted token overlap
+    but only reads a bounded number of postings for the rarest query
+    tokens, so lookups cost the same however long the history is.
+    """
+
+    FILENAME = "commit-push-history.sqlite"
+    # Bounds that keep lookups and indexing independent of history length
+    MAX_QUERY_TOKENS = 32
+    MAX_POSTINGS_PER_TOKEN = 256
+    MAX_TOKENS_PER_COMMIT = 256
+    WORD_SPLIT = re.compile(r'[^a-z0-9]+')
+
+    def __init__(self, path: Optional[Path] = None):
+        if path is None:
+            git_dir = GitOperations.get_git_dir()
+            path = git_dir / self.FILENAME if git_dir else None
+        self.path = path
+
+    def _connect(self) -> 'sqlite3.Connection':
+        import sqlite3
+        connection = sqlite3.connect(str(self.path))
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS commits (id INTEGER PRIMARY KEY, sha TEXT UNIQUE, subject TEXT, tokens INTEGER);
+            CREATE TABLE IF NOT EXISTS tokens (token TEXT PRIMARY KEY, df INTEGER) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS postings (token TEXT, commit_id INTEGER,
+                                                 PRIMARY KEY (token, commit_id)) WITHOUT ROWID;
+        """)
+        return connection
+
+    @classmethod
+    def tokens(cls, path: str, with_files: bool = True) -> List[str]:
+        """Tokens describing one path; ``with_files`` off keeps only directories."""
+        directory, _, name = path.rpartition('/')
+        tokens = []
+        parts = directory.split('/') if directory else []
+        for depth in range(1, len(parts) + 1):
+            tokens.append("d:" + '/'.join(parts[:depth]))
+        if with_files:
+            stem, dot, extension = name.rpartition('.')
+            stem = stem if dot else name
+            tokens.append("p:" + path)
+            tokens.append("n:" + stem.lower())
+            tokens.extend("w:" + word for word in cls.WORD_SPLIT.split(stem.lower()) if len(word) > 2)
+            if dot:
+                tokens.append("e:" + extension.lower())
+        return tokens
+
+    @classmethod
+    def document(cls, paths: List[str]) -> List[str]:
+        """Distinct tokens for a set of paths, capped for very large commits."""
+        with_files = len(paths) <= cls.MAX_TOKENS_PER_COMMIT // 4
+        seen: Dict[str, None] = {}
+        for path in paths:
+            for token in cls.tokens(path, with_files):
+                seen.setdefault(token, None)
+            if len(seen) >= cls.MAX_TOKENS_PER_COMMIT:
+                break
+        return list(seen)[:cls.MAX_TOKENS_PER_COMMIT]
+
+    def update(self, max_commits: Optional[int] = None) -> int:
+        """Index commits added since the last update; returns how many were added."""
+        head = GitOperations.head_commit()
+        if self.path is None or head is None:
+            return 0
+        max_commits = max_commits or config.history_index_max_commits
+        with closing(self._connect()) as connection:
+            row = connection.execute("SELECT value FROM meta WHERE key = 'last_indexed'").fetchone()
+            last = row[0] if row else None
+            if last == head:
+                return 0
+            revisions = [head]
+            if last and GitOperations._run(["git", "merge-base", "--is-ancestor", last, head],
+                                           capture_output=True).returncode == 0:
+                revisions.append(f"^{last}")
+
+            commits: List[Tuple[str, str, List[str]]] = []
+            records = GitOperations.stream_git(
+                ["log", "-z", "--no-merges", "--name-only", f"--max-count={max_commits}",
+                 "--format=%x01%H%x1f%s"] + revisions
+            )
+            for record in records:
+                if record.startswith(b'\x01'):
+                    sha, _, subject = os.fsdecode(record[1:]).partition('\x1f')
+                    commits.append((sha, subject, []))
+                elif record and commits:
+                    commits[-1][2].append(os.fsdecode(record[1:] if record.startswith(b'\n') else record))
+
+            added = 0
+            with connection:
+                # Oldest first, so higher ids mean more recent commits
+                for sha, subject, paths in reversed(commits):
+                    document = self.document(paths)
+                    cursor = connection.execute(
+                        "INSERT OR IGNORE INTO commits (sha, subject, tokens) VALUES (?, ?, ?)",
+                        (sha, subject, len(document)),
+                    )
+                    if not cursor.rowcount:
+                        continue
+                    added += 1
+                    commit_id = cursor.lastrowid
+                    connection.executemany("INSERT OR IGNORE INTO postings VALUES (?, ?)",
+                                           [(token, commit_id) for token in document])
+                    connection.executemany(
+                        "INSERT INTO tokens VALUES (?, 1) ON CONFLICT(token) DO UPDATE SET df = df + 1",
+                        [(token,) for token in document],
+                    )
+                connection.execute("INSERT OR REPLACE INTO meta VALUES ('last_indexed', ?)", (head,))
+        return added
+
+    def similar(self, paths: List[str], limit: int = 5) -> List[str]:
+        """Subjects of the past commits most similar to a change touching ``paths``."""
+        if self.path is None or not self.path.exists() or not paths:
+            return []
+        query = self.document(paths[:self.MAX_TOKENS_PER_COMMIT])
+        with closing(self._connect()) as connection:
+            total = connection.execute("SELECT COUNT(*) FROM commits").fetchone()[0]
+            if not total:
+                return []
+            frequencies: Dict[str, int] = {}
+            for start in range(0, len(query), 500):
+                chunk = query[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                frequencies.update(connection.execute(
+                    f"SELECT token, df FROM tokens WHERE token IN ({placeholders})", chunk).fetchall())
+            weights = {token: math.log(1 + total / df) for token, df in frequencies.items()}
+            rarest = heapq.nlargest(self.MAX_QUERY_TOKENS, weights, key=weights.get)
+
+            scores: Dict[int, float] = {}
+            for token in rarest:
+                for (commit_id,) in connection.execute(
+                        "SELECT commit_id FROM postings WHERE token = ? ORDER BY commit_id DESC LIMIT ?",
+                        (token, self.MAX_POSTINGS_PER_TOKEN)):
+                    scores[commit_id] = scores.get(commit_id, 0.0) + weights[token]
+            if not scores:
+                return []
+
+            candidates = heapq.nlargest(limit * 4, scores, key=lambda commit_id: (scores[commit_id], commit_id))
+            placeholders = ','.join('?' * len(candidates))
+            rows = connection.execute(
+                f"SELECT id, subject, tokens FROM commits WHERE id IN ({placeholders})", candidates).fetchall()
+        # Normalise by document size so sweeping commits do not win on overlap alone
+        ranked = sorted(rows, key=lambda row: (-scores[row[0]] / math.sqrt(max(row[2], 1)), -row[0]))
+        subjects: List[str] = []
+        for _, subject, _ in ranked:
+            if subject not in subjects:
+                subjects.append(subject)
+            if len(subjects) == limit:
+                break
+        return subjects
+
+    @classmethod
+    def examples_for(cls, snapshot: RepoSnapshot, limit: int = 5) -> List[str]:
+        """Style examples for a change: similar past commits, else the most recent ones."""
+        import sqlite3
+        index = cls()
+        try:
+            with tracer.span("history index"):
+                index.update()
+                examples = index.similar(snapshot.all_paths(), limit)
+        except sqlite3.Error as e:
+            print(f"⚠️ Commit history index unavailable: {e}")
+            examples = []
+        return examples or GitOperations.get_recent_commits(limit)
+
+# Prompt sent to the model; its hash is part of the message cache key
+COMMIT_PROMPT_TEMPLATE = """You are a Git commit message expert. Generate a concise, professional commit message in ENGLISH ONLY.
 
 CONTEXT:
 {context}
@@ -184,10 +1334,13 @@ CONTEXT:
 FILES CHANGED:
 {files_summary}
 
+DIFF EXCERPTS:
+{diff_context}
+
 REQUIREMENTS:
 1. Use conventional commit format: type(scope): description
 2. Types: feat, fix, docs, style, refactor, perf, test, build, ci, chore, security
-3. Max 72 characters total
+3. Max {max_length} characters total
 4. Be specific and descriptive
 5. Use present tense, imperative mood
 6. NO emojis in the message itself
@@ -201,58 +1354,859 @@ EXAMPLES:
 
 Generate ONE commit message only:"""
 
-            llm = OllamaLLM(model=self.model_name)
-            message = llm.invoke(prompt).strip()
-            
-            # Clean and validate message
-            message = self._clean_message(message)
-            return message if self._validate_message(message) else None
-            
-        except ImportError:
-            return self._handle_missing_dependency()
-        except Exception as e:
-            print(f"⚠️ AI generation failed: {e}")
-            return None
+# Multi-candidate variant: one JSON reply holding several messages to rank locally
+COMMIT_CANDIDATES_TEMPLATE = COMMIT_PROMPT_TEMPLATE.replace("Generate ONE commit message only:", """\
+Generate {count} DIFFERENT candidate commit messages, each a single line.
+Respond with JSON only, in this shape:
+{{"messages": ["type(scope): description", "..."]}}""")
 
-    def _build_files_summary(self, status: Dict[str, List[str]]) -> str:
-        """Build a summary of changed files."""
-        summary = []
-        for change_type, files in status.items():
-            if files and files != ['']:
-                summary.append(f"{change_type.upper()}: {', '.join(files[:3])}")
-                if len(files) > 3:
-                    summary.append(f"... and {len(files) - 3} more")
-        return '\n'.join(summary) if summary else "No specific files detected"
+# One request covering every commit of a --split run
+SPLIT_PROMPT_TEMPLATE = """You are a Git commit message expert. The changes below will be committed as {count} separate commits.
+Write ONE commit message in ENGLISH ONLY for EACH group, in order.
 
-    def _build_context(self, stats: Dict[str, int], recent_commits: List[str], analysis: str) -> str:
-        """Build context for AI prompt."""
-        context_parts = [
-            f"Change type: {analysis}",
-            f"Files modified: {stats['files']}",
-            f"Lines added: {stats['additions']}",
-            f"Lines deleted: {stats['deletions']}"
-        ]
-        
-        if recent_commits:
-            context_parts.append(f"Recent commits: {', '.join(recent_commits[:3])}")
-            
-        return '\n'.join(context_parts)
+{groups}
 
-    def _clean_message(self, message: str) -> str:
-        """Clean and format commit message."""
-        # Remove quotes
-        if message.startswith('"') and message.endswith('"'):
-            message = message[1:-1]
-        
-        # Remove any prefixes like "Commit message:"
-        prefixes = ["commit message:", "message:", "git commit:"]
-        for prefix in prefixes:
-            if message.lower().startswith(prefix):
-                message = message[len(prefix):].strip()
-        
-        # Ensure proper length
-        if len(message) > config.max_commit_length:
-            message = message[:config.max_commit_length - 3] + "..."
+REQUIREMENTS:
+1. Use conventional commit format: type(scope): description
+2. Types: feat, fix, docs, style, refactor, perf, test, build, ci, chore, security
+3. Max {max_length} characters per message
+4. Use present tense, imperative mood, NO emojis
+5. Describe only the changes of that group
+
+Respond with JSON only, one message per group in the same order:
+{{"messages": ["message for group 1", "message for group 2"]}}"""
+
+# type(scope)!: description
+CONVENTIONAL_MESSAGE = re.compile(r'^(?P<type>[a-z]+)(?:\((?P<scope>[^()]+)\))?!?: (?P<description>\S.*)$')
+
+@dataclass
+class DiffHunk:
+    """One hunk of a streamed diff, with its text capped for prompt use."""
+    path: str
+    index: int
+    header: str
+    lines: List[str] = field(default_factory=list)
+    additions: int = 0
+    deletions: int = 0
+    clipped: bool = False
+
+@dataclass
+class FileDiffSummary:
+    """Per-file totals collected while streaming a diff."""
+    path: str
+    additions: int = 0
+    deletions: int = 0
+    hunks: int = 0
+    binary: bool = False
+
+class DiffContextBuilder:
+    """Fit the most informative parts of a diff into a fixed token budget.
+
+    The diff is streamed once; each hunk is scored by its size and the
+    importance of its file. Per-file summaries are emitted first, then the
+    best hunks fill the rest of the budget. Everything else is truncated
+    deterministically, so the prompt stays bounded for any change size.
+    """
+
+    CHARS_PER_TOKEN = 4
+    SUMMARY_SHARE = 0.25
+    MAX_HUNK_LINES = 40
+    MAX_CANDIDATES = 200
+    # (suffixes or path fragments, weight); first match wins, default 1.0.
+    # Weight 0 marks generated content that is summarised but never excerpted.
+    FILE_WEIGHTS = [
+        (('.lock', 'package-lock.json', 'yarn.lock', 'pnpm-lock.yaml', 'poetry.lock', 'Cargo.lock'), 0.0),
+        (('.min.js', '.min.css', '.map', '.svg', '.snap'), 0.0),
+        (('test', 'spec'), 0.6),
+        (('.md', '.rst', '.txt'), 0.5),
+        (('.json', '.yml', '.yaml', '.toml', '.ini', '.cfg'), 0.7),
+    ]
+    SIGNATURE_REGEX = re.compile(r'^[+-]\s*(?:def |class |function |async |export |public |private |func |fn )')
+
+    def __init__(self, token_budget: int = 1500):
+        self.char_budget = max(token_budget, 1) * self.CHARS_PER_TOKEN
+
+    def build(self, diff_args: List[str], paths: Optional[List[str]] = None,
+              env: Optional[Dict[str, str]] = None) -> str:
+        """Stream ``git diff <diff_args> [-- <paths>]`` and render the budgeted context."""
+        files, hunks, total_hunks = self._collect(diff_args, paths, env)
+        if not files:
+            return "No textual diff available"
+        return self.render(files, hunks, total_hunks)
+
+    def _collect(self, diff_args: List[str], paths: Optional[List[str]] = None,
+                 env: Optional[Dict[str, str]] = None) -> Tuple[List[FileDiffSummary], List[DiffHunk], int]:
+        """Parse the diff, keeping only the highest scoring hunks."""
+        files: List[FileDiffSummary] = []
+        best: List[Tuple[float, int, DiffHunk]] = []
+        total_hunks = 0
+        current_file: Optional[FileDiffSummary] = None
+        current_hunk: Optional[DiffHunk] = None
+
+        def finish_hunk():
+            if current_hunk is None or self.file_weight(current_hunk.path) == 0:
+                return
+            entry = (self.score(current_hunk), -current_hunk.index, current_hunk)
+            if len(best) < self.MAX_CANDIDATES:
+                heapq.heappush(best, entry)
+            else:
+                heapq.heappushpop(best, entry)
+
+        args = ["-c", "core.quotePath=false", "diff"] + diff_args + [
+            "--no-color", "--no-ext-diff", "--src-prefix=a/", "--dst-prefix=b/", "-U2",
+        ]
+        if paths is not None:
+            args += ["--"] + [f":(top,literal){path}" for path in paths]
+        for raw_line in GitOperations.stream_git(args, separator=b'\n', env=env):
+            line = raw_line.decode('utf-8', 'replace')
+            if line.startswith('diff --git '):
+                finish_hunk()
+                current_hunk = None
+                current_file = FileDiffSummary(path=line.split(' b/', 1)[-1])
+                files.append(current_file)
+            elif current_file is None:
+                continue
+            elif line.startswith('+++ ') and current_hunk is None:
+                if line[4:] != '/dev/null':
+                    current_file.path = line[6:] if line.startswith('+++ b/') else line[4:]
+            elif line.startswith('--- ') and current_hunk is None:
+                continue
+            elif line.startswith('Binary files '):
+                current_file.binary = True
+            elif line.startswith('@@'):
+                finish_hunk()
+                total_hunks += 1
+                current_file.hunks += 1
+                current_hunk = DiffHunk(path=current_file.path, index=total_hunks, header=line)
+            elif current_hunk is not None:
+                if line.startswith('+'):
+                    current_hunk.additions += 1
+                    current_file.additions += 1
+                elif line.startswith('-'):
+                    current_hunk.deletions += 1
+                    current_file.deletions += 1
+                if len(current_hunk.lines) < self.MAX_HUNK_LINES:
+                    current_hunk.lines.append(line[:200])
+                else:
+                    current_hunk.clipped = True
+        finish_hunk()
+        return files, [hunk for _, _, hunk in best], total_hunks
+
+    def score(self, hunk: DiffHunk) -> float:
+        """Rank a hunk by change size, file importance and structural edits."""
+        weight = self.file_weight(hunk.path)
+        signatures = sum(1 for line in hunk.lines if self.SIGNATURE_REGEX.match(line))
+        return weight * (min(hunk.additions + hunk.deletions, 60) + 10 * min(signatures, 3))
+
+    def file_weight(self, path: str) -> float:
+        lowered = path.lower()
+        for markers, weight in self.FILE_WEIGHTS:
+            if any(lowered.endswith(marker) if marker.startswith('.') else marker.lower() in lowered
+                   for marker in markers):
+                return weight
+        return 1.0
+
+    def render(self, files: List[FileDiffSummary], hunks: List[DiffHunk], total_hunks: int) -> str:
+        """Lay out file summaries and hunks within the character budget."""
+        parts: List[str] = []
+        summary_budget = int(self.char_budget * self.SUMMARY_SHARE)
+        used = 0
+        shown_files = 0
+        ordered = sorted(files, key=lambda f: (-(f.additions + f.deletions) * self.file_weight(f.path), f.path))
+        for summary in ordered:
+            detail = "binary" if summary.binary else f"+{summary.additions} -{summary.deletions}"
+            line = f"{summary.path}: {detail}, {summary.hunks} hunk{'s' if summary.hunks != 1 else ''}"
+            if used + len(line) + 1 > summary_budget:
+                break
+            parts.append(line)
+            used += len(line) + 1
+            shown_files += 1
+        if shown_files < len(files):
+            parts.append(f"... and {len(files) - shown_files} more files")
+            used += len(parts[-1]) + 1
+
+        remaining = self.char_budget - used
+        ranked = sorted(hunks, key=lambda h: (-self.score(h), h.index))
+        chosen: List[Tuple[DiffHunk, List[str]]] = []
+        for hunk in ranked:
+            header = f"--- {hunk.path} {hunk.header}"
+            cost = len(header) + 1
+            if cost > remaining:
+                continue
+            body: List[str] = []
+            for line in hunk.lines:
+                if cost + len(line) + 1 > remaining:
+                    break
+                body.append(line)
+                cost += len(line) + 1
+            if len(body) < len(hunk.lines) or hunk.clipped:
+                body.append("...")
+                cost += 4
+            chosen.append((hunk, [header] + body))
+            remaining -= cost
+            if remaining < 80:
+                break
+
+        for _, block in sorted(chosen, key=lambda item: item[0].index):
+            parts.extend(block)
+        omitted = total_hunks - len(chosen)
+        if omitted > 0:
+            parts.append(f"[{omitted} more hunk{'s' if omitted != 1 else ''} omitted]")
+        return '\n'.join(parts)
+
+class OllamaError(RuntimeError):
+    """Raised when the Ollama server is unreachable, slow or returns an error."""
+
+class OllamaCancelled(OllamaError):
+    """Raised when a request is stopped through its ``abort`` event."""
+
+class OllamaClient:
+    """Lightweight client for the Ollama REST API.
+
+    Keeps one keep-alive HTTP connection to the server, enforces connect,
+    first-token and total deadlines, and streams tokens so generation can
+    stop as soon as the first line of the reply is complete. A request
+    started with an ``abort`` event is stopped by ``interrupt``, which shuts
+    its socket down so a blocked read returns at once.
+    """
+
+    _shared: Optional['OllamaClient'] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, host: Optional[str] = None, connect_timeout: Optional[float] = None,
+                 first_token_timeout: Optional[float] = None, total_timeout: Optional[float] = None,
+                 keep_alive: Optional[str] = None):
+        from urllib.parse import urlsplit
+        host = host or config.ollama_host
+        url = urlsplit(host if '//' in host else f"http://{host}")
+        self.host = url.hostname or "127.0.0.1"
+        self.port = url.port or 11434
+        self.connect_timeout = connect_timeout if connect_timeout is not None else config.ollama_connect_timeout
+        self.first_token_timeout = (first_token_timeout if first_token_timeout is not None
+                                    else config.ollama_first_token_timeout)
+        self.total_timeout = total_timeout if total_timeout is not None else config.ollama_total_timeout
+        self.keep_alive = keep_alive or config.ollama_keep_alive
+        self._connection: Optional['http.client.HTTPConnection'] = None
+        self._lock = threading.Lock()
+        # Abort event and socket of the request in flight, read by ``interrupt``
+        self._abort: Optional[threading.Event] = None
+        self._active_sock: Optional['socket.socket'] = None
+
+    @classmethod
+    def shared(cls) -> 'OllamaClient':
+        """Process-wide client, so warm-up and generation share one connection."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def generate(self, model: str, prompt: str, stop_at_newline: bool = True,
+                 options: Optional[Dict[str, Any]] = None, response_format: Optional[str] = None,
+                 abort: Optional[threading.Event] = None) -> str:
+        """Stream a completion, returning early once the first line is complete.
+
+        Raises ``OllamaCancelled`` when ``abort`` is set, whether before the
+        request is sent or while its reply streams.
+        """
+        payload: Dict[str, Any] = {
+            'model': model,
+            'prompt': prompt,
+            'stream': True,
+            'keep_alive': self.keep_alive,
+            'options': options or {'temperature': 0.2, 'num_predict': 96},
+        }
+        if response_format:
+            payload['format'] = response_format
+
+        with self._lock:
+            self._abort = abort
+            try:
+                return self._stream(payload, stop_at_newline)
+            finally:
+                self._abort = None
+                self._active_sock = None
+
+    def _stream(self, payload: Dict[str, Any], stop_at_newline: bool) -> str:
+        """Send ``payload`` and read the streamed reply; the caller holds ``_lock``."""
+        import http.client
+        import socket
+        deadline = time.monotonic() + self.total_timeout
+        response, sock = self._request(payload, min(self.first_token_timeout, self.total_timeout))
+        text = ''
+        complete = False
+        try:
+            while True:
+                line = response.readline()
+                self._check_abort()
+                if not line:
+                    break
+                chunk = json.loads(line)
+                if chunk.get('error'):
+                    raise OllamaError(chunk['error'])
+                text += chunk.get('response', '')
+                if chunk.get('done'):
+                    response.read()
+                    complete = True
+                    break
+                if stop_at_newline and '\n' in text.lstrip():
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise OllamaError(f"no complete reply within {self.total_timeout:g}s")
+                sock.settimeout(remaining)
+        except socket.timeout:
+            self.close()
+            raise OllamaError("timed out waiting for the model") from None
+        except ValueError as e:
+            self.close()
+            raise OllamaError(f"malformed response: {e}") from None
+        except (OSError, http.client.HTTPException) as e:
+            self.close()
+            self._check_abort()
+            raise OllamaError(f"connection lost while streaming: {e}") from None
+        finally:
+            if not complete:
+                # Abandoning a streamed reply leaves the connection unusable
+                self.close()
+        return text.lstrip().split('\n', 1)[0] if stop_at_newline else text
+
+    def interrupt(self, abort: threading.Event) -> None:
+        """Stop the request started with ``abort``, which the caller has set.
+
+        Shutting the socket down wakes a read blocked on the model; a
+        request not yet sent sees the event and never goes out.
+        """
+        import socket
+        sock = self._active_sock
+        if self._abort is abort and sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _check_abort(self) -> None:
+        if self._abort is not None and self._abort.is_set():
+            raise OllamaCancelled("request cancelled")
+
+    def warm(self, model: str) -> bool:
+        """Load the model into memory ahead of the first prompt."""
+        import http.client
+        try:
+            with self._lock:
+                response, _ = self._request({'model': model, 'keep_alive': self.keep_alive, 'stream': False},
+                                            self.total_timeout)
+                response.read()
+            return True
+        except (OllamaError, OSError, http.client.HTTPException):
+            self.close()
+            return False
+
+    def warm_async(self, model: str) -> 'Future':
+        """Start ``warm`` in the background."""
+        return _run_in_daemon(self.warm, model)
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _request(self, payload: Dict[str, Any],
+                 read_timeout: float) -> Tuple['http.client.HTTPResponse', 'socket.socket']:
+        """POST to /api/generate, reconnecting once if a pooled connection went stale.
+
+        Also returns the socket the reply is read from: after a
+        ``Connection: close`` or HTTP/1.0 reply, http.client drops
+        ``connection.sock`` as soon as ``getresponse()`` returns.
+        """
+        import http.client
+        import socket
+        body = json.dumps(payload).encode('utf-8')
+        for attempt in range(2):
+            reused = self._connection is not None
+            try:
+                if self._connection is None:
+                    self._connection = http.client.HTTPConnection(self.host, self.port, timeout=self.connect_timeout)
+                if self._connection.sock is None:
+                    # New, or closed by the server after the previous reply
+                    self._connection.connect()
+                sock = self._connection.sock
+                self._active_sock = sock
+                # Checked after publishing the socket so ``interrupt`` cannot miss this request
+                self._check_abort()
+                sock.settimeout(read_timeout)
+                self._connection.request('POST', '/api/generate', body=body,
+                                         headers={'Content-Type': 'application/json'})
+                response = self._connection.getresponse()
+            except socket.timeout:
+                self.close()
+                raise OllamaError(f"Ollama at {self.host}:{self.port} did not respond in time") from None
+            except (OSError, http.client.HTTPException) as e:
+                self.close()
+                self._check_abort()
+                if reused and attempt == 0:
+                    continue
+                raise OllamaError(f"cannot reach Ollama at {self.host}:{self.port}: {e}") from None
+            if response.status != 200:
+                detail = response.read().decode('utf-8', 'replace')
+                self.close()
+                raise OllamaError(f"HTTP {response.status}: {detail[:200]}")
+            return response, sock
+        raise OllamaError(f"cannot reach Ollama at {self.host}:{self.port}")
+
+@dataclass
+class ChangeClassification:
+    """Commit type, scope and description guessed from the shape of a change."""
+    commit_type: str
+    scope: str
+    description: str
+    confidence: float
+    kinds: Dict[str, int]
+
+    @property
+    def message(self) -> str:
+        scope = f"({self.scope})" if self.scope else ""
+        return f"{self.commit_type}{scope}: {self.description}"
+
+class ChangeClassifier:
+    """Single-pass, table-driven commit classifier used before the model.
+
+    Every path is mapped to a kind (source, test, docs, config, lock, ci,
+    build, style, asset) through file name, directory and extension tables,
+    with per-directory and per-extension results memoised so large changes
+    cost one dictionary lookup per path. The kind counts and the change
+    shape (only additions, deletions or pure renames) then select a rule;
+    rules for single-purpose changes are confident enough to skip the model.
+    """
+
+    FILENAME_KINDS = {
+        'package-lock.json': 'lock', 'yarn.lock': 'lock', 'pnpm-lock.yaml': 'lock', 'poetry.lock': 'lock',
+        'pipfile.lock': 'lock', 'cargo.lock': 'lock', 'composer.lock': 'lock', 'gemfile.lock': 'lock',
+        'go.sum': 'lock', 'uv.lock': 'lock',
+        'dockerfile': 'build', 'makefile': 'build', 'setup.py': 'build', 'setup.cfg': 'build',
+        'pyproject.toml': 'build', 'package.json': 'build', 'requirements.txt': 'build',
+        'requirements-dev.txt': 'build', 'cmakelists.txt': 'build', 'cargo.toml': 'build', 'go.mod': 'build',
+        'readme': 'docs', 'readme.md': 'docs', 'license': 'docs', 'changelog.md': 'docs', 'contributing.md': 'docs',
+        '.gitlab-ci.yml': 'ci', '.travis.yml': 'ci', 'jenkinsfile': 'ci',
+        '.gitignore': 'config', '.editorconfig': 'config', '.gitattributes': 'config',
+    }
+    DIRECTORY_KINDS = {
+        'test': 'test', 'tests': 'test', '__tests__': 'test', 'spec': 'test', 'specs': 'test', 'e2e': 'test',
+        'cypress': 'test', 'docs': 'docs', 'doc': 'docs', 'workflows': 'ci', '.circleci': 'ci',
+    }
+    EXTENSION_KINDS = {
+        **dict.fromkeys(('py', 'js', 'ts', 'tsx', 'jsx', 'java', 'go', 'rs', 'c', 'h', 'cpp', 'hpp', 'cs', 'rb',
+                         'php', 'kt', 'swift', 'scala', 'vue', 'svelte', 'sql', 'sh'), 'source'),
+        **dict.fromkeys(('md', 'rst', 'txt', 'adoc'), 'docs'),
+        **dict.fromkeys(('json', 'yml', 'yaml', 'toml', 'ini', 'cfg', 'conf', 'env', 'properties'), 'config'),
+        **dict.fromkeys(('css', 'scss', 'sass', 'less'), 'style'),
+        **dict.fromkeys(('png', 'jpg', 'jpeg', 'gif', 'svg', 'ico', 'webp', 'woff', 'woff2', 'ttf'), 'asset'),
+    }
+    TEST_NAME = re.compile(r'^test_|_test\.|\.test\.|\.spec\.|_spec\.')
+    # Path components that say little about what changed
+    GENERIC_DIRS = frozenset(('src', 'lib', 'app', 'apps', 'packages', 'pkg', 'internal', 'cmd', 'source'))
+
+    # kind -> (commit type, scope override, noun, confidence) when the change touches only that kind
+    SINGLE_KIND_RULES = {
+        'lock': ('chore', 'deps', 'lockfile', 0.95),
+        'docs': ('docs', None, 'documentation', 0.9),
+        'test': ('test', None, 'tests', 0.9),
+        'ci': ('ci', None, 'CI workflow', 0.9),
+        'style': ('style', None, 'styles', 0.8),
+        'build': ('build', None, 'build configuration', 0.8),
+        'config': ('chore', 'config', 'configuration', 0.75),
+        'asset': ('chore', 'assets', 'assets', 0.75),
+    }
+
+    # Counters of how often heuristics answered without the model, shared by batch threads
+    _stats_lock = threading.Lock()
+    decisions = {'heuristic': 0, 'model': 0}
+
+    def __init__(self):
+        self._directories: Dict[str, Tuple[Optional[str], str]] = {}
+
+    def _directory_info(self, directory: str) -> Tuple[Optional[str], str]:
+        """Kind implied by a directory (``tests/``, ``docs/``) and its scope, memoised."""
+        info = self._directories.get(directory)
+        if info is None:
+            parts = directory.split('/')
+            lowered = [part.lower() for part in parts]
+            kind = next((self.DIRECTORY_KINDS[part] for part in lowered if part in self.DIRECTORY_KINDS), None)
+            scope = next((part for part, low in zip(parts, lowered)
+                          if low not in self.GENERIC_DIRS and low not in self.DIRECTORY_KINDS
+                          and not part.startswith('.')), '')
+            info = self._directories[directory] = (kind, scope)
+        return info
+
+    def kind_of(self, path: str) -> str:
+        return self._describe(path)[0]
+
+    def scope_of(self, path: str) -> str:
+        """First meaningful directory, or the file stem for top-level files."""
+        return self._describe(path)[1]
+
+    def _describe(self, path: str) -> Tuple[str, str]:
+        directory, _, name = path.rpartition('/')
+        directory_kind, scope = self._directory_info(directory) if directory else (None, name.rpartition('.')[0] or name)
+        return self._name_kind(name.lower(), directory_kind), scope
+
+    def _name_kind(self, lowered: str, directory_kind: Optional[str]) -> str:
+        kind = self.FILENAME_KINDS.get(lowered)
+        if kind:
+            return kind
+        # Substring checks first: far cheaper than running the regex on every name
+        if ('test' in lowered or 'spec' in lowered) and self.TEST_NAME.search(lowered):
+            return 'test'
+        if directory_kind:
+            return directory_kind
+        _, dot, extension = lowered.rpartition('.')
+        return self.EXTENSION_KINDS.get(extension, 'source') if dot else 'source'
+
+    def classify(self, snapshot: RepoSnapshot) -> ChangeClassification:
+        """Classify the change in one pass over its paths."""
+        paths = snapshot.all_paths()
+        if not paths:
+            return ChangeClassification('chore', '', 'update repository', 0.0, {})
+
+        kinds: Dict[str, int] = {}
+        scopes: Dict[str, int] = {}
+        directories = self._directories
+        directory_info = self._directory_info
+        name_kind = self._name_kind
+        for path in paths:
+            directory, _, name = path.rpartition('/')
+            if directory:
+                directory_kind, scope = directories.get(directory) or directory_info(directory)
+            else:
+                directory_kind, scope = None, name.rpartition('.')[0] or name
+            kind = name_kind(name.lower(), directory_kind)
+            kinds[kind] = kinds.get(kind, 0) + 1
+            scopes[scope] = scopes.get(scope, 0) + 1
+
+        count = len(paths)
+        only_added = len(snapshot.added) == count
+        only_deleted = len(snapshot.deleted) == count
+        only_renamed = (bool(snapshot.renamed) and len(snapshot.renamed) == count
+                        and all(snapshot.line_changes.get(path, (0, 0)) == (0, 0) for path in snapshot.renamed))
+        scope = next(iter(scopes)) if len(scopes) == 1 else ''
+        subject = Path(paths[0]).name if count == 1 else None
+
+        if only_renamed:
+            if count == 1:
+                source = Path(snapshot.rename_sources.get(paths[0], '')).name
+                return ChangeClassification('refactor', scope, f"rename {source} to {subject}", 0.95, kinds)
+            return ChangeClassification('refactor', scope, f"move {count} files", 0.9, kinds)
+
+        verb = "add" if only_added else "remove" if only_deleted else "update"
+        if len(kinds) == 1:
+            kind = next(iter(kinds))
+            rule = self.SINGLE_KIND_RULES.get(kind)
+            if rule:
+                commit_type, scope_override, noun, confidence = rule
+                if kind == 'lock':
+                    noun = subject or "lockfiles"
+                    verb = "update"
+                return ChangeClassification(commit_type, scope_override or scope, f"{verb} {subject or noun}",
+                                            confidence, kinds)
+
+        # Source changes: the model is needed to tell a feature from a fix
+        commit_type = "chore" if only_deleted else "feat"
+        if kinds.get('source') and kinds.get('test') and len(kinds) == 2:
+            commit_type = "feat" if only_added else "fix"
+        description = f"{verb} {subject or f'{count} files'}"
+        return ChangeClassification(commit_type, scope, description, 0.5 if only_deleted else 0.3, kinds)
+
+    @classmethod
+    def record(cls, used_heuristic: bool) -> None:
+        with cls._stats_lock:
+            cls.decisions['heuristic' if used_heuristic else 'model'] += 1
+
+    @classmethod
+    def summary(cls) -> str:
+        total = sum(cls.decisions.values())
+        if not total:
+            return ""
+        skipped = cls.decisions['heuristic']
+        return f"🧮 Heuristics answered {skipped}/{total} ({skipped / total:.0%}) without the model"
+
+class CommitMessageGenerator:
+    """Enhanced AI-powered commit message generator."""
+    
+    # Single worker that serialises model calls when many repositories share one model
+    model_executor: Optional['ThreadPoolExecutor'] = None
+    
+    def __init__(self, model_name: str = "mistral", cache: Optional[MessageCache] = None,
+                 client: Optional['OllamaClient'] = None):
+        self.model_name = model_name
+        self.cache = cache
+        self.client = client
+        self.classifier = ChangeClassifier()
+        self.candidates = max(1, config.commit_candidates)
+        self.template = COMMIT_CANDIDATES_TEMPLATE if self.candidates > 1 else COMMIT_PROMPT_TEMPLATE
+        self.max_length = config.max_commit_length
+        self._classified: Optional[Tuple[RepoSnapshot, ChangeClassification]] = None
+        self.cancelled = threading.Event()
+        self.conventional_types = {
+            'feat': '✨',
+            'fix': '🐛', 
+            'docs': '📝',
+            'style': '🎨',
+            'refactor': '♻️',
+            'perf': '⚡',
+            'test': '✅',
+            'build': '🔧',
+            'ci': '👷',
+            'chore': '🔧',
+            'security': '🔒',
+            'config': '⚙️'
+        }
+
+    KIND_LABELS = {
+        'source': "source code", 'test': "test files", 'docs': "documentation", 'config': "configuration",
+        'lock': "lockfiles", 'ci': "CI", 'build': "build files", 'style': "styles", 'asset': "assets",
+    }
+
+    def classify(self, snapshot: RepoSnapshot) -> ChangeClassification:
+        """Classify ``snapshot`` once, reusing the result for later calls."""
+        if self._classified is None or self._classified[0] is not snapshot:
+            with tracer.span("classify", paths=len(snapshot.all_paths())):
+                self._classified = (snapshot, self.classifier.classify(snapshot))
+        return self._classified[1]
+
+    def cancel(self) -> None:
+        """Abandon generation: an HTTP request in flight is stopped and no message is returned.
+
+        The langchain backend cannot be interrupted; its reply is discarded.
+        """
+        self.cancelled.set()
+        (self.client or OllamaClient.shared()).interrupt(self.cancelled)
+
+    def analyze_changes(self, snapshot: RepoSnapshot) -> str:
+        """Analyze changes to determine commit type and scope."""
+        kinds = self.classify(snapshot).kinds
+        ranked = sorted(kinds.items(), key=lambda item: -item[1])
+        return ", ".join(f"{self.KIND_LABELS.get(kind, kind)} ({count})" for kind, count in ranked) \
+            or "general changes"
+
+    def heuristic_message(self, snapshot: RepoSnapshot) -> Optional[str]:
+        """Message from the local classifier when it is confident enough to skip the model."""
+        classification = self.classify(snapshot)
+        confident = classification.confidence >= config.heuristic_confidence
+        ChangeClassifier.record(confident)
+        if not confident:
+            return None
+        print(f"🧮 Heuristic message (confidence {classification.confidence:.2f}); model not needed")
+        RunJournal.note(source='heuristic')
+        return self._clean_message(classification.message)
+
+    def generate_enhanced_message(self, snapshot: RepoSnapshot, recent_commits: List[str]) -> Optional[str]:
+        """Generate enhanced commit message with better context."""
+        tree_hash = GitOperations.get_staged_tree() if self.cache is not None else None
+        cached = self.lookup_cached(tree_hash)
+        if cached:
+            return cached
+
+        message = self.generate_uncached(snapshot, recent_commits)
+        if message:
+            self.remember(tree_hash, message)
+        return message
+
+    def lookup_cached(self, tree_hash: Optional[str]) -> Optional[str]:
+        """Return the cached message for a staged tree, if any."""
+        if self.cache is None or not tree_hash:
+            return None
+        cached = self.cache.get(self._cache_key(tree_hash))
+        if cached:
+            print(f"⚡ Using cached commit message (hits: {self.cache.hits}, misses: {self.cache.misses})")
+            RunJournal.count('message_cache_hits')
+            RunJournal.note(source='cache')
+        else:
+            RunJournal.count('message_cache_misses')
+        return cached
+
+    def _cache_key(self, tree_hash: str) -> str:
+        # The length limit is filled into the prompt, so it is part of what the cache answers for
+        return MessageCache.make_key(tree_hash, self.model_name, f"{self.template}\0{self.max_length}")
+
+    def remember(self, tree_hash: Optional[str], message: str) -> None:
+        """Cache a generated message for a staged tree."""
+        if self.cache is not None and tree_hash:
+            self.cache.put(self._cache_key(tree_hash), message)
+
+    def generate_uncached(self, snapshot: RepoSnapshot, recent_commits: List[str],
+                          staged: bool = True) -> Optional[str]:
+        """Ask the model for a commit message, bypassing the cache.
+
+        The diff excerpts come from the index when ``staged`` is set, or
+        from the worktree against HEAD when staging has not finished yet.
+        The worktree diff reads a scratch index holding the snapshot's
+        untracked files, so it covers the same paths however far staging
+        has got.
+        """
+        try:
+            with tracer.span("prompt build"):
+                # Build comprehensive context
+                change_analysis = self.analyze_changes(snapshot)
+                files_summary = self._build_files_summary(snapshot.status)
+                context = self._build_context(snapshot.stats, recent_commits, change_analysis)
+                builder = DiffContextBuilder(config.prompt_token_budget)
+                if staged:
+                    diff_context = builder.build(["--cached"])
+                else:
+                    # Only the snapshot's own untracked files, so excluded ones stay out of the prompt
+                    with snapshot._untracked_index(limited=True) as env:
+                        paths = snapshot.all_paths() + list(snapshot.rename_sources.values())
+                        diff_context = builder.build([snapshot.head_oid or EMPTY_TREE_SHA], paths, env)
+                
+                # Enhanced prompt for better English commit messages
+                prompt = self.template.format(
+                    context=context, files_summary=files_summary, diff_context=diff_context,
+                    count=self.candidates, max_length=self.max_length,
+                )
+
+            if self.cancelled.is_set():
+                return None
+            with tracer.span("llm", model=self.model_name, prompt_chars=len(prompt)):
+                message = self._invoke_model(prompt, structured=self.candidates > 1).strip()
+            if self.cancelled.is_set():
+                return None
+            
+            if self.candidates > 1:
+                message = self.pick_best(self.parse_candidates(message), snapshot) or ''
+            
+            # Clean and validate message
+            message = self._clean_message(message)
+            if not self._validate_message(message):
+                return None
+            RunJournal.note(source='llm', model=self.model_name)
+            return message
+            
+        except ImportError:
+            print("⚠️ langchain-ollama not installed; use --backend http or pip install langchain-ollama")
+            return None
+        except OllamaCancelled:
+            return None
+        except OllamaError as e:
+            print(f"⚠️ Ollama request failed: {e}")
+            return None
+        except Exception as e:
+            print(f"⚠️ AI generation failed: {e}")
+            return None
+
+    def _build_files_summary(self, status: Dict[str, List[str]]) -> str:
+        """Build a summary of changed files."""
+        summary = []
+        for change_type, files in status.items():
+            if files and files != ['']:
+                summary.append(f"{change_type.upper()}: {', '.join(files[:3])}")
+                if len(files) > 3:
+                    summary.append(f"... and {len(files) - 3} more")
+        return '\n'.join(summary) if summary else "No specific files detected"
+
+    def _build_context(self, stats: Dict[str, int], recent_commits: List[str], analysis: str) -> str:
+        """Build context for AI prompt."""
+        context_parts = [
+            f"Change type: {analysis}",
+            f"Files modified: {stats['files']}",
+            f"Lines added: {stats['additions']}",
+            f"Lines deleted: {stats['deletions']}"
+        ]
+        if stats.get('binary_files'):
+            context_parts.append(f"Binary files: {stats['binary_files']} ({stats['binary_bytes']:+,} bytes)")
+        
+        if recent_commits:
+            examples = '\n'.join(f"- {subject}" for subject in recent_commits[:5])
+            context_parts.append(f"Past commits touching similar files (match their style):\n{examples}")
+            
+        return '\n'.join(context_parts)
+
+    @staticmethod
+    def parse_candidates(reply: str) -> List[str]:
+        """Candidate messages from a JSON reply, falling back to one per line."""
+        try:
+            data = json.loads(reply)
+        except ValueError:
+            data = None
+        if isinstance(data, dict):
+            data = data.get('messages') or next((v for v in data.values() if isinstance(v, list)), None)
+        if isinstance(data, list):
+            messages = [item.get('message', '') if isinstance(item, dict) else item for item in data]
+            return [m.strip() for m in messages if isinstance(m, str) and m.strip()]
+        return [line.strip(' -*\t') for line in reply.splitlines() if ':' in line]
+
+    def score_candidate(self, message: str, snapshot: RepoSnapshot) -> Optional[float]:
+        """Score a candidate locally; ``None`` means it is not usable at all."""
+        if not self._validate_message(message):
+            return None
+        match = CONVENTIONAL_MESSAGE.match(message)
+        if config.use_conventional_commits and (not match or match['type'] not in self.conventional_types):
+            return None
+
+        score = 0.0
+        # Messages that would be cut off with "..." lose most of their value
+        overflow = len(message) - config.max_commit_length
+        score += 2.0 if overflow <= 0 else -2.0 - overflow / 10
+        if match:
+            classification = self.classify(snapshot)
+            if match['type'] == classification.commit_type:
+                score += 1.0
+            scope = (match['scope'] or '').lower()
+            if scope:
+                score += 2.0 if scope in self._path_vocabulary(snapshot) else -1.0
+            description = match['description']
+            if description.endswith('.'):
+                score -= 0.5
+            if len(description.split()) >= 3:
+                score += 0.5
+        return score
+
+    def _path_vocabulary(self, snapshot: RepoSnapshot) -> set:
+        """Lower-cased directory names, file stems and classifier scopes of the change."""
+        vocabulary = {self.classify(snapshot).scope.lower()}
+        for path in snapshot.all_paths()[:2000]:
+            parts = path.lower().split('/')
+            vocabulary.update(parts[:-1])
+            vocabulary.add(parts[-1].rpartition('.')[0] or parts[-1])
+        vocabulary.discard('')
+        return vocabulary
+
+    def pick_best(self, candidates: List[str], snapshot: RepoSnapshot) -> Optional[str]:
+        """Highest-scoring candidate, or ``None`` when none is usable."""
+        scored = []
+        for position, candidate in enumerate(candidates):
+            cleaned = self._strip_decorations(candidate)
+            score = self.score_candidate(cleaned, snapshot)
+            if score is not None:
+                scored.append((score, -position, cleaned))
+        if not scored:
+            print(f"⚠️ None of the {len(candidates)} candidate messages was usable")
+            return None
+        score, position, best = max(scored)
+        print(f"🏆 Picked candidate {1 - position} of {len(candidates)} "
+              f"({len(scored)} valid, score {score:.1f})")
+        return best
+
+    @staticmethod
+    def _strip_decorations(message: str) -> str:
+        """Remove quotes and prefixes such as "Commit message:" around a reply."""
+        message = message.strip()
+        # Remove quotes
+        if message.startswith('"') and message.endswith('"'):
+            message = message[1:-1]
+        
+        # Remove any prefixes like "Commit message:"
+        prefixes = ["commit message:", "message:", "git commit:"]
+        for prefix in prefixes:
+            if message.lower().startswith(prefix):
+                message = message[len(prefix):].strip()
+        return message
+
+    def _clean_message(self, message: str) -> str:
+        """Clean and format commit message."""
+        message = self._strip_decorations(message)
+        
+        # Ensure proper length
+        if len(message) > config.max_commit_length:
+            message = message[:config.max_commit_length - 3] + "..."
             
         return message
 
@@ -267,42 +2221,209 @@ Generate ONE commit message only:"""
         
         return True
 
-    def _handle_missing_dependency(self) -> Optional[str]:
-        """Handle missing langchain-ollama dependency."""
-        print("⚠️ langchain-ollama not installed. Installing automatically...")
+    def _invoke_model(self, prompt: str, structured: bool = False, replies: Optional[int] = None) -> str:
+        """Send a prompt to the configured backend and return the raw reply.
+
+        ``structured`` asks for a complete JSON reply holding ``replies``
+        messages (default: the candidate count) instead of stopping at the
+        first line.
+        """
+        if config.llm_backend == "langchain":
+            from langchain_ollama import OllamaLLM
+            if structured:
+                return OllamaLLM(model=self.model_name, format="json", temperature=0.7).invoke(prompt)
+            return OllamaLLM(model=self.model_name).invoke(prompt)
+        client = self.client or OllamaClient.shared()
+        kwargs: Dict[str, Any] = {'abort': self.cancelled}
+        if structured:
+            kwargs.update({
+                'stop_at_newline': False,
+                'response_format': 'json',
+                'options': {'temperature': 0.7, 'num_predict': 32 + 40 * (replies or self.candidates)},
+            })
+        if CommitMessageGenerator.model_executor is not None:
+            return CommitMessageGenerator.model_executor.submit(
+                client.generate, self.model_name, prompt, **kwargs).result()
+        return client.generate(self.model_name, prompt, **kwargs)
+
+    def generate_fallback_message(self, snapshot: RepoSnapshot) -> str:
+        """Generate fallback message when AI fails."""
+        return self._clean_message(self.classify(snapshot).message)
+
+def _compile_source(path: str, source: bytes) -> Optional[str]:
+    """Compile Python source in-process and describe the first error, if any."""
+    try:
+        compile(source, path, 'exec', dont_inherit=True)
+    except SyntaxError as e:
+        return f"line {e.lineno}: {e.msg}"
+    except ValueError as e:
+        return str(e)
+    return None
+
+# Secret patterns checked against added diff lines, combined into one regex
+SECRET_PATTERNS = {
+    'credential assignment': rb'(?i:password|passwd|secret|api[_-]?key|access[_-]?key|auth[_-]?token|token)'
+                             rb'["\']?\s*[:=]\s*["\']?[^\s"\']{4,}',
+    'AWS access key': rb'\b(?:AKIA|ASIA)[0-9A-Z]{16}\b',
+    'private key': rb'-----BEGIN (?:[A-Z]+ )?PRIVATE KEY-----',
+    'GitHub token': rb'\bgh[pousr]_[A-Za-z0-9]{36,}',
+    'Slack token': rb'\bxox[abposr]-[A-Za-z0-9-]{10,}',
+    'API secret key': rb'\bsk-[A-Za-z0-9_-]{20,}',
+}
+
+class PreCommitScanner:
+    """Native pre-commit checks run by the installed hook.
+
+    Blob sizes come from one ``git cat-file --batch-check`` call, and the
+    staged diff is streamed once through a precompiled multi-pattern
+    matcher that only looks at added lines.
+    """
+
+    SECRET_REGEX = re.compile(
+        b'|'.join(b'(?P<p%d>%s)' % (i, pattern) for i, pattern in enumerate(SECRET_PATTERNS.values()))
+    )
+    # Lowercase literals that every pattern above contains; located with bytes.find
+    # so only candidate lines ever reach the regex engine
+    SECRET_ANCHORS = (
+        b'passw', b'secret', b'key', b'token', b'akia', b'asia',
+        b'ghp_', b'gho_', b'ghu_', b'ghs_', b'ghr_', b'xox', b'sk-',
+    )
+    PATTERN_NAMES = list(SECRET_PATTERNS)
+
+    @staticmethod
+    def run() -> bool:
+        """Run all staged-content checks; returns True when the commit may proceed."""
+        print("🔍 Running pre-commit checks...")
+        large_files = PreCommitScanner.find_large_files()
+        if large_files:
+            print(f"❌ Large files detected (>{config.large_file_threshold_mb:g}MB):")
+            for path, size in large_files:
+                print(f"   {path} ({size / (1024 * 1024):.1f}MB)")
+            print("Consider using Git LFS for large files.")
+            return False
+
+        findings = PreCommitScanner.find_secrets()
+        if findings:
+            print("⚠️ Potential secrets detected in staged changes:")
+            for path, kind, line in findings:
+                print(f"   {path}: [{kind}] {line}")
+            print("Please review before committing.")
+            confirmed = PreCommitScanner.confirm("Continue anyway? (y/N): ")
+            if confirmed is None:
+                print("❌ Non-interactive commit blocked; allowlist the path or commit with --no-verify")
+                return False
+            if not confirmed:
+                return False
+
+        print("✅ Pre-commit checks passed")
+        return True
+
+    @staticmethod
+    def confirm(question: str) -> Optional[bool]:
+        """Ask on the controlling terminal; ``None`` when there is none or prompts are off.
+
+        Git runs hooks with stdin on /dev/null, so the terminal is opened
+        directly rather than read through stdin.
+        """
+        if config.non_interactive:
+            return None
         try:
-            subprocess.check_call([sys.executable, "-m", "pip", "install", "-U", "langchain-ollama"])
-            print("✅ langchain-ollama installed successfully!")
-            return None  # Will retry in main flow
-        except subprocess.CalledProcessError:
-            print("❌ Failed to install langchain-ollama")
+            # Unbuffered: a terminal is not seekable, which text read/write mode requires
+            terminal = open("/dev/tty", "r+b", buffering=0)
+        except OSError:
             return None
+        with terminal:
+            terminal.write(question.encode('utf-8'))
+            reply = terminal.readline().decode('utf-8', 'replace')
+        return reply.strip().lower() in ('y', 'yes')
 
-    def generate_fallback_message(self, status: Dict[str, List[str]], stats: Dict[str, int]) -> str:
-        """Generate fallback message when AI fails."""
-        if stats['files'] == 0:
-            return "chore: update repository"
-        
-        # Determine commit type based on files
-        commit_type = "feat"
-        if any('fix' in f.lower() for files in status.values() for f in files):
-            commit_type = "fix"
-        elif any(f.endswith('.md') for files in status.values() for f in files):
-            commit_type = "docs"
-        elif any('test' in f.lower() for files in status.values() for f in files):
-            commit_type = "test"
-        
-        scope = ""
-        if stats['files'] == 1:
-            # Try to extract scope from single file
-            all_files = [f for files in status.values() for f in files if f]
-            if all_files:
-                filename = Path(all_files[0]).stem
-                scope = f"({filename})"
-        
-        action = "update" if status['modified'] else "add"
-        
-        return f"{commit_type}{scope}: {action} {stats['files']} file{'s' if stats['files'] > 1 else ''}"
+    @staticmethod
+    def find_large_files() -> List[Tuple[str, int]]:
+        """Staged files above the configured size threshold."""
+        threshold = int(config.large_file_threshold_mb * 1024 * 1024)
+        staged = GitOperations.get_staged_blobs()
+        sizes = GitOperations.read_blob_sizes(list({blob_sha for _, blob_sha in staged}))
+        return [
+            (path, sizes[blob_sha]) for path, blob_sha in staged
+            if sizes.get(blob_sha, 0) > threshold
+            and not PreCommitScanner._allowed(path, config.large_file_allowlist)
+        ]
+
+    @staticmethod
+    def find_secrets(max_findings: int = 50) -> List[Tuple[str, str, str]]:
+        """Scan added lines of the staged diff as (path, pattern name, line)."""
+        findings: List[Tuple[str, str, str]] = []
+        current_path = ""
+        blocks = GitOperations.stream_git_blocks([
+            "-c", "core.quotePath=false", "diff", "--cached", "--no-color", "--no-ext-diff",
+            "--src-prefix=a/", "--dst-prefix=b/", "-U0",
+        ])
+        try:
+            for block in blocks:
+                headers = PreCommitScanner._file_headers(block)
+                header_starts = [start for start, _ in headers]
+                for line_start in PreCommitScanner._candidate_lines(block):
+                    if block[line_start:line_start + 1] != b'+' or block.startswith(b'+++ ', line_start):
+                        continue
+                    line_end = block.find(b'\n', line_start)
+                    line = block[line_start + 1:line_end if line_end >= 0 else len(block)]
+                    match = PreCommitScanner.SECRET_REGEX.search(line)
+                    if not match:
+                        continue
+                    index = bisect.bisect_right(header_starts, line_start) - 1
+                    path = headers[index][1] if index >= 0 else current_path
+                    if PreCommitScanner._allowed(path, config.secret_allowlist):
+                        continue
+                    kind = PreCommitScanner.PATTERN_NAMES[int(match.lastgroup[1:])]
+                    findings.append((path, kind, line.decode('utf-8', 'replace').strip()[:120]))
+                    if len(findings) >= max_findings:
+                        return findings
+                if headers:
+                    current_path = headers[-1][1]
+        finally:
+            blocks.close()
+        return findings
+
+    @staticmethod
+    def _file_headers(block: bytes) -> List[Tuple[int, str]]:
+        """Offsets and paths of the ``+++ b/<path>`` headers in a diff block."""
+        headers = []
+        start = 0 if block.startswith(b'+++ ') else None
+        pos = 0
+        while True:
+            if start is None:
+                hit = block.find(b'\n+++ ', pos)
+                if hit < 0:
+                    break
+                start = hit + 1
+            line_end = block.find(b'\n', start)
+            if line_end < 0:
+                line_end = len(block)
+            name = block[start + 4:line_end]
+            if name.startswith(b'b/'):
+                name = name[2:]
+            headers.append((start, os.fsdecode(name)))
+            pos, start = line_end, None
+        return headers
+
+    @staticmethod
+    def _candidate_lines(block: bytes) -> List[int]:
+        """Start offsets of lines containing any secret anchor, in order."""
+        lowered = block.lower()
+        starts = set()
+        for anchor in PreCommitScanner.SECRET_ANCHORS:
+            pos = lowered.find(anchor)
+            while pos >= 0:
+                starts.add(lowered.rfind(b'\n', 0, pos) + 1)
+                line_end = lowered.find(b'\n', pos)
+                if line_end < 0:
+                    break
+                pos = lowered.find(anchor, line_end + 1)
+        return sorted(starts)
+
+    @staticmethod
+    def _allowed(path: str, allowlist: List[str]) -> bool:
+        return any(fnmatch.fnmatch(path, pattern) for pattern in allowlist)
 
 class PreCommitHooks:
     """Pre-commit hook functionality."""
@@ -314,33 +2435,12 @@ class PreCommitHooks:
         hooks_dir.mkdir(exist_ok=True)
         
         pre_commit_hook = hooks_dir / "pre-commit"
-        hook_content = """#!/bin/sh
+        script_dir = Path(__file__).resolve().parent
+        # Importing the module (rather than running the file) reuses its cached bytecode on every commit
+        hook_content = f"""#!/bin/sh
 # Auto-generated pre-commit hook
-echo "🔍 Running pre-commit checks..."
-
-# Check for large files (>10MB)
-large_files=$(git diff --cached --name-only | xargs -I {} find {} -size +10M 2>/dev/null)
-if [ ! -z "$large_files" ]; then
-    echo "❌ Large files detected (>10MB):"
-    echo "$large_files"
-    echo "Consider using Git LFS for large files."
-    exit 1
-fi
-
-# Check for common secrets patterns
-secrets=$(git diff --cached | grep -E "(password|secret|key|token).*=" | grep -v "# " || true)
-if [ ! -z "$secrets" ]; then
-    echo "⚠️ Potential secrets detected in staged changes:"
-    echo "$secrets"
-    echo "Please review before committing."
-    read -p "Continue anyway? (y/N): " -n 1 -r
-    echo
-    if [[ ! $REPLY =~ ^[Yy]$ ]]; then
-        exit 1
-    fi
-fi
-
-echo "✅ Pre-commit checks passed"
+exec "{sys.executable}" -c "import sys; sys.path.insert(0, sys.argv.pop(1)); import commit_push; commit_push.main()" \\
+    "{script_dir}" --scan-staged
 """
         
         with open(pre_commit_hook, 'w') as f:
@@ -351,116 +2451,1646 @@ echo "✅ Pre-commit checks passed"
         print("✅ Pre-commit hooks installed")
 
     @staticmethod
-    def check_code_quality():
-        """Run basic code quality checks."""
-        python_files = GitOperations.run_command("git diff --cached --name-only --diff-filter=ACM | grep '\\.py$'")
-        if python_files:
-            print("🐍 Checking Python code quality...")
-            for file in python_files.split('\n'):
-                if file:
-                    # Basic syntax check
-                    result = subprocess.run([sys.executable, "-m", "py_compile", file], 
-                                         capture_output=True, text=True)
-                    if result.returncode != 0:
-                        print(f"❌ Syntax error in {file}")
-                        return False
+    def check_code_quality(paths: Optional[List[str]] = None):
+        """Run basic code quality checks.
+
+        Checks the staged content of Python files, or the worktree content
+        of ``paths`` when given. Sources are compiled in-process across a
+        process pool and results are cached by blob SHA, so unchanged blobs
+        are never compiled twice.
+        """
+        started = time.perf_counter()
+        if paths is None:
+            sources = PreCommitHooks._staged_python_sources()
+        else:
+            sources = PreCommitHooks._worktree_python_sources(paths)
+        if not sources:
+            return True
+
+        print("🐍 Checking Python code quality...")
+        cache = JsonLRUCache(
+            PreCommitHooks._syntax_cache_path(), max_entries=config.syntax_cache_size, autosave=False
+        )
+        errors: Dict[str, str] = {}
+        pending: List[Tuple[str, str, bytes]] = []
+        for path, blob_sha, source in sources:
+            cached = cache.get(blob_sha)
+            if cached is None:
+                pending.append((path, blob_sha, source))
+            elif cached:
+                errors[path] = cached
+
+        compile_started = time.perf_counter()
+        for (path, blob_sha, _), error in zip(pending, PreCommitHooks._compile_all(pending)):
+            cache.put(blob_sha, error or "")
+            if error:
+                errors[path] = error
+        compile_time = time.perf_counter() - compile_started
+        cache.save()
+        RunJournal.count('syntax_cached', len(sources) - len(pending))
+        RunJournal.count('syntax_compiled', len(pending))
+
+        for path in sorted(errors):
+            print(f"❌ Syntax error in {path}: {errors[path]}")
+        if not errors:
+            print("✅ All Python files passed syntax check")
+        print(f"   {len(sources)} files in {time.perf_counter() - started:.2f}s "
+              f"({len(sources) - len(pending)} cached, {len(pending)} compiled in {compile_time:.2f}s, "
+              f"{len(errors)} errors)")
+        return not errors
+
+    @staticmethod
+    def _syntax_cache_path() -> Optional[Path]:
+        git_dir = GitOperations.get_git_dir()
+        return git_dir / "commit-push-syntax.json" if git_dir else None
+
+    @staticmethod
+    def _staged_python_sources() -> List[Tuple[str, str, bytes]]:
+        """Staged Python files as (path, blob SHA, content) read from the index."""
+        staged = GitOperations.get_staged_blobs(["*.py"])
+        blobs = GitOperations.read_blobs([blob_sha for _, blob_sha in staged])
+        return [(path, blob_sha, blobs[blob_sha]) for path, blob_sha in staged if blob_sha in blobs]
+
+    @staticmethod
+    def _worktree_python_sources(paths: List[str]) -> List[Tuple[str, str, bytes]]:
+        """Python files from the worktree as (path, blob SHA, content)."""
+        import hashlib
+        sources = []
+        for path in paths:
+            if not path.endswith('.py'):
+                continue
+            try:
+                content = GitOperations.worktree_path(path).read_bytes()
+            except OSError:
+                continue
+            blob_sha = hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+            sources.append((path, blob_sha, content))
+        return sources
+
+    @staticmethod
+    def _compile_all(sources: List[Tuple[str, str, bytes]]) -> List[Optional[str]]:
+        """Compile sources, fanning out to a process pool for larger batches."""
+        jobs = [(path, content) for path, _, content in sources]
+        if len(jobs) < config.syntax_pool_threshold:
+            return [_compile_source(path, content) for path, content in jobs]
+        # Loading multiprocessing costs more than compiling a few files inline
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor() as pool:
+            return list(pool.map(_compile_source, *zip(*jobs), chunksize=16))
+
+def _run_in_daemon(fn, *args) -> 'Future':
+    """Run ``fn`` on a daemon thread so an abandoned call cannot block exit."""
+    from concurrent.futures import Future
+    future = Future()
+    fn = GitOperations.bind_repo(fn)
+
+    def runner():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=runner, daemon=True).start()
+    return future
+
+class CommitPipeline:
+    """Concurrent commit preparation.
+
+    Message generation starts as soon as the snapshot is known, while code
+    quality checks, staging and remote setup run alongside it. A failed
+    quality check cancels the run and restores the index to its prior tree;
+    so does a failed staging step, which also sets ``staging_failed``.
+    Cancelling also stops a model request in flight, so the shared client
+    and the model executor are free for the next repository.
+    """
+
+    def __init__(self, args: argparse.Namespace, settings: 'RepoSettings'):
+        self.args = args
+        self.settings = settings
+        self.cancelled = threading.Event()
+        self.staging_failed = False
+
+    def run(self, snapshot: RepoSnapshot) -> Optional[str]:
+        """Prepare the commit and return its message, if one was produced."""
+        from concurrent.futures import ThreadPoolExecutor
+        generator = None
+        generation = None
+        commit_message = self.args.message
+        if not commit_message and not self.args.no_ai:
+            cache = None if self.args.no_cache else MessageCache()
+            generator = CommitMessageGenerator(config.ollama_model, cache)
+            commit_message = generator.heuristic_message(snapshot)
+            if not commit_message and not snapshot.unstaged:
+                # The index already holds the final tree, so the cache can answer up front
+                commit_message = generator.lookup_cached(GitOperations.get_staged_tree())
+            if not commit_message:
+                print("🤖 Generating AI commit message in background...")
+                generation = _run_in_daemon(self._generate, generator, snapshot)
+
+        checked_paths = [p for p in snapshot.all_paths() if p not in snapshot.deleted]
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            quality = pool.submit(GitOperations.bind_repo(self._check_quality), checked_paths)
+            staging = pool.submit(GitOperations.bind_repo(self._stage), snapshot)
+            pool.submit(GitOperations.bind_repo(GitOperations.ensure_remote), self.settings.remote_url)
+
+            previous_tree, staged_tree = staging.result()
+            if staged_tree is None and not self.cancelled.is_set():
+                self.staging_failed = True
+                self.cancelled.set()
+                quality.cancel()
+                if generation is not None:
+                    generator.cancel()
+                if previous_tree:
+                    GitOperations.run_git(["read-tree", previous_tree])
+                print("❌ Staging failed")
+                return None
+            if not quality.result():
+                self.cancelled.set()
+                if generation is not None:
+                    generator.cancel()
+                if previous_tree:
+                    GitOperations.run_git(["read-tree", previous_tree])
+                print("❌ Code quality checks failed")
+                return None
+
+        if generation is not None:
+            commit_message = generation.result()
+            if commit_message and generator is not None:
+                generator.remember(staged_tree, commit_message)
+        return commit_message
+
+    def _stage(self, snapshot: RepoSnapshot) -> Tuple[Optional[str], Optional[str]]:
+        """Stage the snapshot's changes, returning the index tree before and after.
+
+        The tree after is ``None`` when staging failed.
+        """
+        if self.cancelled.is_set():
+            return None, None
+        with tracer.span("staging"):
+            previous_tree = GitOperations.get_staged_tree()
+            if not GitOperations.stage_snapshot(snapshot):
+                return previous_tree, None
+            print("📁 Changes staged")
+            return previous_tree, GitOperations.get_staged_tree()
+
+    @staticmethod
+    def _check_quality(paths: List[str]) -> bool:
+        with tracer.span("quality checks"):
+            return PreCommitHooks.check_code_quality(paths)
+
+    @staticmethod
+    def _generate(generator: CommitMessageGenerator, snapshot: RepoSnapshot) -> Optional[str]:
+        return generator.generate_uncached(snapshot, CommitHistoryIndex.examples_for(snapshot), staged=False)
+
+@dataclass
+class CommitGroup:
+    """One logical commit of a ``--split`` run."""
+    key: Tuple[str, str]
+    paths: List[str]
+    tree: Optional[str] = None
+    message: Optional[str] = None
+
+class SplitCommitter:
+    """``--split``: commit one large change as several logical commits.
+
+    Paths are grouped by kind (docs, tests, lockfiles, CI...) and, for
+    source code, by scope. The worktree is staged once; each group's tree
+    is then built in a scratch index from the previous tree plus that
+    group's staged blobs, so no file is re-read. Messages come from the
+    heuristic tier, the cache, or one batched model request covering every
+    remaining group. The commits are chained with ``git commit-tree`` and
+    HEAD is moved once at the end.
+    """
+
+    # Foundations first, then code, then everything describing it
+    KIND_ORDER = ('lock', 'build', 'config', 'source', 'style', 'asset', 'test', 'docs', 'ci')
+    ZERO_SHA = "0" * 40
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.classifier = ChangeClassifier()
+
+    def plan(self, paths: List[str], rename_sources: Dict[str, str]) -> List[CommitGroup]:
+        """Group paths by kind and source scope, merging the smallest source groups past the cap."""
+        destinations = {source: path for path, source in rename_sources.items()}
+        groups: Dict[Tuple[str, str], List[str]] = {}
+        for path in paths:
+            # A rename's removed source goes with its destination
+            anchor = destinations.get(path, path)
+            kind, scope = self.classifier._describe(anchor)
+            key = (kind, scope) if kind == 'source' else (kind, '')
+            groups.setdefault(key, []).append(path)
+
+        limit = max(1, config.split_max_groups)
+        if len(groups) > limit:
+            # Scoped source groups fold, smallest first, into the unscoped one (never the reverse)
+            catch_all = ('source', '')
+            donors = sorted((key for key in groups if key[0] == 'source' and key != catch_all),
+                            key=lambda key: len(groups[key]))
+            if catch_all not in groups and len(donors) > 1:
+                groups[catch_all] = groups.pop(donors.pop(0))
+            while len(groups) > limit and donors and catch_all in groups:
+                groups[catch_all].extend(groups.pop(donors.pop(0)))
+            if len(groups) > limit:
+                # Still too many kinds: fold the smallest ones together
+                ordered = sorted(groups, key=lambda key: len(groups[key]))
+                merged = [path for key in ordered[:len(groups) - limit + 1] for path in groups.pop(key)]
+                groups.setdefault(('mixed', ''), []).extend(merged)
+
+        def order(key: Tuple[str, str]) -> Tuple[int, int]:
+            kind = key[0]
+            rank = self.KIND_ORDER.index(kind) if kind in self.KIND_ORDER else len(self.KIND_ORDER)
+            return rank, -len(groups[key])
+        return [CommitGroup(key, groups[key]) for key in sorted(groups, key=order)]
+
+    def run(self, snapshot: RepoSnapshot) -> Optional[List[str]]:
+        """Stage, group and commit the snapshot; returns the messages of the new commits."""
+        with tracer.span("staging"):
+            previous_tree = GitOperations.get_staged_tree()
+            if not GitOperations.stage_snapshot(snapshot):
+                return None
+        print("📁 Changes staged")
+
+        # Every group's paths are in the index now, so one check covers all the commits
+        with tracer.span("quality checks"):
+            quality_ok = PreCommitHooks.check_code_quality()
+        if not quality_ok or not self._run_pre_commit_hook():
+            if previous_tree:
+                GitOperations.run_git(["read-tree", previous_tree])
+            print("❌ Code quality checks failed" if not quality_ok else "❌ pre-commit hook failed")
+            return None
+
+        head = GitOperations.head_commit()
+        entries = self._staged_entries(head)
+        if not entries:
+            print("ℹ️ Nothing staged to split")
+            return []
+
+        groups = self.plan(list(entries), snapshot.rename_sources)
+        planned = [path for group in groups for path in group.paths]
+        if len(planned) != len(entries) or set(planned) != set(entries):
+            print("⚠️ Split plan does not cover the staged paths exactly; making one commit instead")
+            groups = [CommitGroup(('mixed', ''), list(entries))]
+        print(f"✂️ Splitting {len(entries)} paths into {len(groups)} commits")
+        git_dir = GitOperations.get_git_dir()
+        scratch_index = git_dir / "commit-push-split.index"
+        env = dict(os.environ, GIT_INDEX_FILE=str(scratch_index))
+        try:
+            with tracer.span("split trees"):
+                self._build_trees(groups, entries, head, env)
+        finally:
+            if scratch_index.exists():
+                scratch_index.unlink()
+
+        parent_tree = GitOperations.run_git(["rev-parse", f"{head}^{{tree}}"]).decode().strip() if head \
+            else EMPTY_TREE_SHA
+        with tracer.span("message"):
+            self._assign_messages(groups, snapshot, parent_tree)
+
+        parent = head
+        with tracer.span("commit"):
+            for group in groups:
+                command = ["git", "commit-tree", group.tree] + (["-p", parent] if parent else [])
+                created = GitOperations._run(command, input=group.message.encode('utf-8'), capture_output=True)
+                if created.returncode != 0:
+                    print(f"❌ Command failed: git commit-tree ({os.fsdecode(created.stderr).strip()})")
+                    return None
+                parent = created.stdout.decode().strip()
+                print(f"✅ Commit created: {group.message} ({len(group.paths)} paths)")
+            moved = GitOperations._run(
+                ["git", "update-ref", "-m", f"commit (split): {groups[0].message}", "HEAD", parent,
+                 head or self.ZERO_SHA],
+                capture_output=True,
+            )
+        if moved.returncode != 0:
+            print(f"❌ Could not move HEAD: {os.fsdecode(moved.stderr).strip()}")
+            return None
+        return [group.message for group in groups]
+
+    @staticmethod
+    def _staged_entries(head: Optional[str]) -> Dict[str, Optional[Tuple[str, str]]]:
+        """Staged paths mapped to (mode, blob SHA), or ``None`` for deletions."""
+        records = GitOperations.stream_git(
+            ["diff", "--cached", "--raw", "-z", "--no-abbrev", "--no-renames", head or EMPTY_TREE_SHA]
+        )
+        entries: Dict[str, Optional[Tuple[str, str]]] = {}
+        for meta in records:
+            path = next(records, b'')
+            if not meta.startswith(b':') or not path:
+                continue
+            _, new_mode, _, new_sha, status = meta[1:].decode().split(' ', 4)
+            entries[os.fsdecode(path)] = None if status.startswith('D') else (new_mode, new_sha)
+        return entries
+
+    @staticmethod
+    def _run_pre_commit_hook() -> bool:
+        """Run the repository's pre-commit hook once, since commit-tree skips hooks."""
+        hook_path = GitOperations.run_git(["rev-parse", "--git-path", "hooks/pre-commit"], check=False)
+        hook = GitOperations.worktree_path(os.fsdecode(hook_path.strip())) if hook_path else None
+        if hook is None or not hook.is_file() or not os.access(hook, os.X_OK):
+            return True
+        with tracer.span("pre-commit hook"):
+            # Same stdin as under git commit, so the hook prompts (or not) the same way
+            return GitOperations._run([str(hook)], stdin=subprocess.DEVNULL).returncode == 0
+
+    def _build_trees(self, groups: List[CommitGroup], entries: Dict[str, Optional[Tuple[str, str]]],
+                     head: Optional[str], env: Dict[str, str]) -> None:
+        """Write one tree per group, each on top of the previous group's tree."""
+        GitOperations._run(["git", "read-tree"] + ([head] if head else ["--empty"]), env=env, check=True)
+        for group in groups:
+            index_info = b''.join(
+                (f"0 {self.ZERO_SHA}" if entries[path] is None else ' '.join(entries[path])).encode()
+                + b'\t' + os.fsencode(path) + b'\0'
+                for path in group.paths
+            )
+            GitOperations._run(["git", "update-index", "-z", "--index-info"], input=index_info, env=env, check=True)
+            written = GitOperations._run(["git", "write-tree"], env=env, capture_output=True, check=True)
+            group.tree = written.stdout.decode().strip()
+
+    def _assign_messages(self, groups: List[CommitGroup], snapshot: RepoSnapshot, parent_tree: str) -> None:
+        """Heuristics and cache first, then one batched model request for the rest."""
+        cache = None if self.args.no_cache or self.args.no_ai else MessageCache()
+        generator = CommitMessageGenerator(config.ollama_model, cache)
+        subsets = [snapshot.subset(set(group.paths)) for group in groups]
+        pending: List[int] = []
+        for position, (group, subset) in enumerate(zip(groups, subsets)):
+            if not subset.has_changes:
+                # Paths staged before the run are not in the snapshot
+                subset = RepoSnapshot(modified=list(group.paths), unstaged=list(group.paths))
+                subsets[position] = subset
+            if self.args.no_ai:
+                continue
+            group.message = generator.heuristic_message(subset) or generator.lookup_cached(group.tree)
+            if not group.message:
+                pending.append(position)
+
+        if pending:
+            print(f"🤖 Generating {len(pending)} commit messages in one request...")
+            replies = self._batched_messages([groups[i] for i in pending], [subsets[i] for i in pending],
+                                             generator, parent_tree, groups)
+            for position, reply in zip(pending, replies):
+                message = generator._clean_message(reply) if reply else ''
+                if generator._validate_message(message):
+                    groups[position].message = message
+                    generator.remember(groups[position].tree, message)
+
+        for group, subset in zip(groups, subsets):
+            if not group.message:
+                group.message = generator.generate_fallback_message(subset)
+
+    @staticmethod
+    def _batched_messages(pending: List[CommitGroup], subsets: List[RepoSnapshot],
+                          generator: CommitMessageGenerator, parent_tree: str,
+                          groups: List[CommitGroup]) -> List[str]:
+        """Ask the model for every pending group's message in a single request."""
+        budget = max(200, config.prompt_token_budget // len(pending))
+        previous_tree = {id(group): (groups[i - 1].tree if i else parent_tree) for i, group in enumerate(groups)}
+        blocks = []
+        for number, (group, subset) in enumerate(zip(pending, subsets), start=1):
+            stats = subset.stats
+            files = ', '.join(group.paths[:8]) + (f" ... and {len(group.paths) - 8} more" if len(group.paths) > 8 else '')
+            # Diff between consecutive trees: nothing is read from the worktree
+            excerpt = DiffContextBuilder(budget).build([previous_tree[id(group)], group.tree])
+            blocks.append(f"GROUP {number} ({generator.analyze_changes(subset)}; "
+                          f"+{stats['additions']} -{stats['deletions']} lines)\nFILES: {files}\nDIFF:\n{excerpt}")
+        prompt = SPLIT_PROMPT_TEMPLATE.format(count=len(pending), groups='\n\n'.join(blocks),
+                                              max_length=config.max_commit_length)
+        try:
+            with tracer.span("llm", model=generator.model_name, prompt_chars=len(prompt), groups=len(pending)):
+                reply = generator._invoke_model(prompt, structured=True, replies=len(pending))
+        except ImportError:
+            print("⚠️ langchain-ollama not installed; use --backend http or pip install langchain-ollama")
+            return []
+        except OllamaError as e:
+            print(f"⚠️ Ollama request failed: {e}")
+            return []
+        except Exception as e:
+            print(f"⚠️ AI generation failed: {e}")
+            return []
+        return CommitMessageGenerator.parse_candidates(reply)
+
+class PushQueue:
+    """Persistent queue of pushes that failed or were deferred.
+
+    One entry per (repository, remote, branch): queuing a newer commit
+    replaces the older entry, since pushing the branch tip sends every
+    pending commit. Entries for the same repository and remote are
+    flushed in a single ``git push``. Failed attempts back off
+    exponentially up to ``push_retry_max_seconds``.
+    """
+
+    _lock = threading.Lock()
+    # Set whenever this process queues a push, to wake the flusher
+    updated = threading.Event()
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path or self.default_path()
+
+    @staticmethod
+    def default_path() -> Path:
+        if config.push_queue_path:
+            return Path(config.push_queue_path).expanduser()
+        cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+        return Path(cache_home) / "commit-push" / "push-queue.json"
+
+    @staticmethod
+    def backoff(attempts: int) -> float:
+        """Retry delay after ``attempts`` failures, with jitter so queues do not retry in lockstep."""
+        delay = min(config.push_retry_max_seconds, config.push_retry_base_seconds * 2 ** max(0, attempts - 1))
+        import random
+        return delay * random.uniform(0.8, 1.2)
+
+    @contextmanager
+    def _locked(self):
+        """Serialise queue updates across threads and, where supported, processes."""
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path.with_suffix('.lock'), 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self) -> List[Dict[str, Any]]:
+        try:
+            entries = json.loads(self.path.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError):
+            print(f"⚠️ Ignoring unreadable push queue {self.path}")
+            return []
+        return entries if isinstance(entries, list) else []
+
+    def _save(self, entries: List[Dict[str, Any]]) -> None:
+        temp_path = self.path.with_suffix('.tmp')
+        temp_path.write_text(json.dumps(entries, indent=2), encoding='utf-8')
+        os.replace(temp_path, self.path)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        with self._locked():
+            return self._load()
+
+    def add(self, repo: Path, branch: str, commit: Optional[str], error: str = "",
+            remote: str = "origin", delay: Optional[float] = None) -> Dict[str, Any]:
+        """Queue ``branch`` of ``repo`` for pushing; ``error`` marks a failed attempt."""
+        repo = str(Path(repo).resolve())
+        now = time.time()
+        with self._locked():
+            entries = self._load()
+            previous = next((e for e in entries if (e['repo'], e['remote'], e['branch']) == (repo, remote, branch)),
+                            None)
+            attempts = (previous or {}).get('attempts', 0) + (1 if error else 0)
+            next_attempt = now + (delay if delay is not None else self.backoff(attempts))
+            if previous is not None and not error:
+                # A deferred commit joins the pending push instead of postponing it
+                next_attempt = min(next_attempt, previous['next_attempt'])
+            entry = {
+                'repo': repo, 'remote': remote, 'branch': branch, 'commit': commit,
+                'queued_at': (previous or {}).get('queued_at', now),
+                'attempts': attempts,
+                'next_attempt': next_attempt,
+                'last_error': error or (previous or {}).get('last_error', ""),
+            }
+            if previous is not None:
+                entries.remove(previous)
+            entries.append(entry)
+            self._save(entries)
+        self.updated.set()
+        return entry
+
+    def discard(self, repo: Path, remote: str, branches: Iterable[str]) -> None:
+        """Forget entries that a direct push has already delivered."""
+        repo, branches = str(Path(repo).resolve()), set(branches)
+        with self._locked():
+            entries = self._load()
+            kept = [e for e in entries if not (e['repo'] == repo and e['remote'] == remote
+                                               and e['branch'] in branches)]
+            if len(kept) != len(entries):
+                self._save(kept)
+
+    def seconds_until_due(self) -> Optional[float]:
+        entries = self.entries()
+        if not entries:
+            return None
+        return max(0.0, min(e['next_attempt'] for e in entries) - time.time())
+
+    def flush(self, force: bool = False, skip_repos: Iterable[Path] = ()) -> Tuple[int, int]:
+        """Push due entries, one ``git push`` per repository and remote.
+
+        ``skip_repos`` are left alone, typically because the caller is
+        about to push them itself. Returns (entries pushed, entries still queued).
+        """
+        now = time.time()
+        skipped = {str(Path(repo).resolve()) for repo in skip_repos}
+        groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for entry in self.entries():
+            if entry['repo'] in skipped:
+                continue
+            if force or entry['next_attempt'] <= now:
+                groups.setdefault((entry['repo'], entry['remote']), []).append(entry)
+
+        delivered: List[Dict[str, Any]] = []
+        failed: Dict[Tuple[str, str, str], str] = {}
+        for (repo, remote), group in groups.items():
+            branches = [e['branch'] for e in group]
+            if not Path(repo).is_dir():
+                print(f"⚠️ Dropping queued push for missing repository {repo}")
+                delivered.extend(group)
+                continue
+            with tracer.span("queued push"), GitOperations.use_repo(Path(repo), Path(repo).name):
+                pushed, error = GitOperations.push_branches(remote, branches)
+            if pushed:
+                print(f"✅ Flushed queued push: {Path(repo).name} → {remote} ({', '.join(branches)})")
+                delivered.extend(group)
+            else:
+                print(f"⚠️ Queued push still failing: {Path(repo).name} → {remote}")
+                for e in group:
+                    failed[(repo, remote, e['branch'])] = error or "push failed"
+
+        with self._locked():
+            entries = self._load()
+            remaining: List[Dict[str, Any]] = []
+            for entry in entries:
+                key = (entry['repo'], entry['remote'], entry['branch'])
+                # Keep entries re-queued with a newer commit while the push ran
+                if any(key == (d['repo'], d['remote'], d['branch']) and entry['commit'] == d['commit']
+                       for d in delivered):
+                    continue
+                if key in failed:
+                    entry['attempts'] += 1
+                    entry['last_error'] = failed[key]
+                    entry['next_attempt'] = time.time() + self.backoff(entry['attempts'])
+                remaining.append(entry)
+            if groups:
+                self._save(remaining)
+        return len(delivered), len(remaining)
+
+class PushFlusher:
+    """Background thread that retries queued pushes as they come due.
+
+    With ``once`` it makes a single pass over the due entries, so a
+    one-shot run can flush earlier failures while it does its own work.
+    """
+
+    def __init__(self, queue: PushQueue, once: bool = False, skip_repos: Iterable[Path] = ()):
+        self.queue = queue
+        self.once = once
+        self.skip_repos = list(skip_repos)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="push-flusher", daemon=True)
+
+    def start(self) -> 'PushFlusher':
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop after the push in progress, if any, has finished."""
+        self._stop.set()
+        PushQueue.updated.set()
+        self._thread.join(timeout)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.queue.flush(skip_repos=self.skip_repos)
+            except Exception as e:
+                print(f"⚠️ Push queue flush failed: {e}")
+            if self.once:
+                return
+            wait = self.queue.seconds_until_due()
+            PushQueue.updated.wait(60.0 if wait is None else min(max(wait, 1.0), 60.0))
+            PushQueue.updated.clear()
+
+@dataclass
+class RepoSettings:
+    """Per-repository Git settings, taken from that repository's ``Config``."""
+    path: Path
+    remote_url: str
+    branch: str
+    stage_include: List[str] = field(default_factory=list)
+    stage_exclude: List[str] = field(default_factory=list)
+
+    @classmethod
+    def load(cls, path: Path, default_repo_name: Optional[str] = None) -> 'RepoSettings':
+        repo_config = Config.load(path, default_repo_name=default_repo_name)
+        return cls(
+            path=path,
+            remote_url=repo_config.remote_url,
+            branch=repo_config.default_branch,
+            stage_include=repo_config.stage_include,
+            stage_exclude=repo_config.stage_exclude,
+        )
+
+@dataclass
+class RepoResult:
+    """Outcome of one commit/push run."""
+    repo: str
+    outcome: str
+    message: str = ""
+    files: int = 0
+    seconds: float = 0.0
+
+@dataclass
+class RunRecord:
+    """What one run did and where its time went; becomes one journal line."""
+    repo: str
+    started: float = field(default_factory=time.time)
+    phases: Dict[str, float] = field(default_factory=dict)
+    fields: Dict[str, Any] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add_phase(self, name: str, seconds: float) -> None:
+        with self.lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds * 1000
+
+    def note(self, **values: Any) -> None:
+        with self.lock:
+            self.fields.update(values)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self.lock:
+            self.fields[name] = self.fields.get(name, 0) + amount
+
+    def to_json(self) -> str:
+        with self.lock:
+            entry = {'ts': round(self.started, 3), 'repo': self.repo, **self.fields,
+                     'phases': {name: round(ms, 1) for name, ms in self.phases.items()}}
+        return json.dumps(entry, separators=(',', ':'), ensure_ascii=False)
+
+class RunJournal:
+    """Append-only JSONL journal of runs under .git/, rotated by size.
+
+    Each run appends one line with a single ``O_APPEND`` write, so
+    concurrent runs never interleave. When the file outgrows
+    ``journal_max_bytes`` it becomes ``.1`` (older files shift up) and at
+    most ``journal_files`` files are kept.
+    """
+
+    FILENAME = "commit-push-journal.jsonl"
+    _lock = threading.Lock()
+
+    def __init__(self, path: Optional[Path] = None):
+        if path is None:
+            git_dir = GitOperations.get_git_dir()
+            path = git_dir / self.FILENAME if git_dir else None
+        self.path = path
+
+    @staticmethod
+    def current() -> Optional[RunRecord]:
+        """Record of the run on this thread, if any."""
+        return getattr(_repo_context, 'record', None)
+
+    @staticmethod
+    def note(**values: Any) -> None:
+        record = RunJournal.current()
+        if record is not None:
+            record.note(**values)
+
+    @staticmethod
+    def count(name: str, amount: int = 1) -> None:
+        record = RunJournal.current()
+        if record is not None:
+            record.count(name, amount)
+
+    @staticmethod
+    @contextmanager
+    def recording(repo: str):
+        """Bind a fresh record to this thread for the duration of a run."""
+        previous = RunJournal.current()
+        record = _repo_context.record = RunRecord(repo)
+        try:
+            yield record
+        finally:
+            _repo_context.record = previous
+
+    def files(self) -> List[Path]:
+        """Journal files, oldest first."""
+        if self.path is None:
+            return []
+        rotated = [self.path.with_name(f"{self.path.name}.{n}") for n in range(config.journal_files - 1, 0, -1)]
+        return [p for p in rotated + [self.path] if p.exists()]
+
+    def append(self, record: RunRecord) -> None:
+        if self.path is None:
+            return
+        line = (record.to_json() + "\n").encode('utf-8')
+        try:
+            if self.path.exists() and self.path.stat().st_size + len(line) > config.journal_max_bytes:
+                self._rotate()
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            print(f"⚠️ Could not write the run journal: {e}")
+
+    def _rotate(self) -> None:
+        with self._lock:
+            if not self.path.exists() or self.path.stat().st_size < config.journal_max_bytes // 2:
+                return  # Another thread rotated first
+            for n in range(config.journal_files - 1, 0, -1):
+                source = self.path if n == 1 else self.path.with_name(f"{self.path.name}.{n - 1}")
+                if source.exists():
+                    os.replace(source, self.path.with_name(f"{self.path.name}.{n}"))
+            if config.journal_files <= 1 and self.path.exists():
+                self.path.unlink()
+
+    def records(self, since: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Stream the records of every journal file, skipping damaged lines."""
+        for path in self.files():
+            try:
+                with open(path, 'rb') as handle:
+                    for line in handle:
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue
+                        if isinstance(entry, dict) and (since is None or entry.get('ts', 0) >= since):
+                            yield entry
+            except OSError:
+                continue
+
+class LatencyHistogram:
+    """Constant-memory latency distribution with log-spaced buckets (about 2.5% error)."""
+
+    GROWTH = 1.05
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.total = 0
+
+    def add(self, ms: float) -> None:
+        index = math.ceil(math.log(max(ms, 0.01)) / math.log(self.GROWTH))
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.total += 1
+
+    def quantile(self, q: float) -> float:
+        rank = max(1, math.ceil(q * self.total))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # Geometric middle of the bucket
+                return self.GROWTH ** (index - 0.5)
+        return 0.0
+
+class JournalStats:
+    """Aggregates journal records one at a time for ``stats``."""
+
+    def __init__(self):
+        self.runs = 0
+        self.first: Optional[float] = None
+        self.last: Optional[float] = None
+        self.total = LatencyHistogram()
+        self.phases: Dict[str, LatencyHistogram] = {}
+        self.outcomes: Dict[str, int] = {}
+        self.sources: Dict[str, int] = {}
+        self.models: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        self.runs += 1
+        ts = entry.get('ts')
+        if isinstance(ts, (int, float)):
+            self.first = ts if self.first is None else min(self.first, ts)
+            self.last = ts if self.last is None else max(self.last, ts)
+        if isinstance(entry.get('ms'), (int, float)):
+            self.total.add(entry['ms'])
+        for name, ms in (entry.get('phases') or {}).items():
+            if isinstance(ms, (int, float)):
+                self.phases.setdefault(name, LatencyHistogram()).add(ms)
+        for key, tally in (('outcome', self.outcomes), ('source', self.sources), ('model', self.models)):
+            if entry.get(key):
+                tally[entry[key]] = tally.get(entry[key], 0) + 1
+        for key in ('message_cache_hits', 'message_cache_misses', 'syntax_cached', 'syntax_compiled',
+                    'files', 'additions', 'deletions'):
+            if isinstance(entry.get(key), int):
+                self.counters[key] = self.counters.get(key, 0) + entry[key]
+
+    @staticmethod
+    def _rate(part: int, whole: int) -> str:
+        return f"{part / whole:.0%} ({part}/{whole})" if whole else "n/a"
+
+    def print_report(self) -> None:
+        if not self.runs:
+            print("ℹ️ The run journal is empty")
+            return
+        span = ""
+        if self.first is not None:
+            span = (f" from {datetime.fromtimestamp(self.first):%Y-%m-%d %H:%M} "
+                    f"to {datetime.fromtimestamp(self.last):%Y-%m-%d %H:%M}")
+        print(f"📒 {self.runs} runs{span}")
+        print("📊 " + ", ".join(f"{name}: {count}" for name, count in sorted(self.outcomes.items())))
+
+        rows = [("run", self.total)] + sorted(self.phases.items(), key=lambda item: -item[1].quantile(0.5))
+        width = max(len(name) for name, _ in rows) + 2
+        print(f"\n⏱️ {'Latency':<{width - 3}} {'Runs':>6} {'p50 ms':>9} {'p95 ms':>9}")
+        for name, histogram in rows:
+            if histogram.total:
+                print(f"{name:<{width}} {histogram.total:>6} {histogram.quantile(0.5):>9.1f} "
+                      f"{histogram.quantile(0.95):>9.1f}")
+
+        messages = sum(self.sources.values())
+        ranked = sorted(self.sources.items(), key=lambda item: -item[1])
+        print("\n📝 Message sources: " + (", ".join(f"{source} {self._rate(count, messages)}"
+                                                   for source, count in ranked) or "n/a"))
+        c = self.counters
+        hits, misses = c.get('message_cache_hits', 0), c.get('message_cache_misses', 0)
+        print(f"⚡ Message cache hit rate: {self._rate(hits, hits + misses)}")
+        cached, compiled = c.get('syntax_cached', 0), c.get('syntax_compiled', 0)
+        print(f"🐍 Syntax cache hit rate: {self._rate(cached, cached + compiled)}")
+        pushes = self.outcomes.get('pushed', 0) + self.outcomes.get('push failed', 0)
+        print(f"🚀 Push success rate: {self._rate(self.outcomes.get('pushed', 0), pushes)}")
+        if self.models:
+            print("🤖 Models: " + ", ".join(f"{model} ({count})" for model, count in sorted(self.models.items())))
+        print(f"📁 {c.get('files', 0)} files, +{c.get('additions', 0)} -{c.get('deletions', 0)} lines across all runs")
+
+def run_preflight(args: argparse.Namespace, settings: RepoSettings, use_cache: bool = True) -> bool:
+    """Check the commit identity, SSH keys and remote before doing any work.
+
+    The checks (``diagnose_ssh``) run concurrently under one deadline, and a
+    reachable remote is remembered for ``diagnostics_ttl_seconds``. An
+    unreachable remote only blocks the run when the push would happen now;
+    with ``--defer-push`` the push queue retries it. ``use_cache=False``
+    (``--diagnose``) probes everything again and prints the full report.
+    """
+    try:
+        import diagnose_ssh
+    except ImportError:
+        print("⚠️ diagnose_ssh.py not found next to commit_push.py; skipping preflight")
         return True
+    url = os.fsdecode(GitOperations.run_git(["remote", "get-url", "origin"], check=False) or b'').strip()
+    cache = diagnose_ssh.ResultCache(PushQueue.default_path().parent / "diagnostics.json",
+                                     ttl=config.diagnostics_ttl_seconds)
+    with tracer.span("preflight"):
+        results = diagnose_ssh.run_checks(
+            Path(GitOperations.current_repo() or Path.cwd()), url=url or settings.remote_url,
+            timeout=config.diagnostics_timeout_seconds, use_cache=use_cache, cache=cache,
+            # Reuses (and warms) the ControlMaster connection the push will use
+            env=GitOperations.ssh_environment("origin"),
+        )
+    blocking = [r for r in results if not r.ok and not (r.name == "remote" and getattr(args, 'defer_push', False))]
+    if not use_cache or any(r.status != "ok" for r in results):
+        diagnose_ssh.print_report(results)
+    else:
+        print(f"🩺 Preflight passed ({', '.join(r.name for r in results)})")
+    return not blocking
+
+def run_repository(args: argparse.Namespace, settings: RepoSettings,
+                   push_slots: Optional[threading.Semaphore] = None,
+                   snapshot: Optional[RepoSnapshot] = None) -> RepoResult:
+    """Analyse, commit and push one repository.
+
+    A ``snapshot`` that is already current (as kept by ``--watch``) skips
+    the initial status scan. Unless ``journal`` is off, the run is appended
+    to the repository's run journal.
+    """
+    if not config.journal:
+        return _run_repository(args, settings, push_slots, snapshot)
+    with RunJournal.recording(settings.path.name) as record:
+        result = RepoResult(repo=str(settings.path), outcome="error")
+        try:
+            result = _run_repository(args, settings, push_slots, snapshot)
+            return result
+        finally:
+            record.note(outcome=result.outcome, ms=round((time.time() - record.started) * 1000, 1))
+            RunJournal().append(record)
+
+def _run_repository(args: argparse.Namespace, settings: RepoSettings,
+                    push_slots: Optional[threading.Semaphore], snapshot: Optional[RepoSnapshot]) -> RepoResult:
+    started = time.perf_counter()
+    result = RepoResult(repo=str(settings.path), outcome="clean")
+
+    # Initialize Git repo if needed
+    if not GitOperations.is_git_repo():
+        if args.dry_run:
+            print("DRY RUN: Would initialize Git repository")
+        else:
+            GitOperations.run_command(["git", "init"], capture_output=False)
+            print("📁 Git repository initialized")
+    
+    # Get repository status
+    if snapshot is None:
+        snapshot = RepoSnapshot.capture()
+    
+    # Only the paths selected by the staging globs are analysed and committed
+    all_changes = snapshot
+    snapshot = snapshot.filtered(settings.stage_include, settings.stage_exclude)
+    if all_changes.has_changes and not snapshot.has_changes:
+        print("ℹ️ All changes are excluded by the staging globs")
+    stats = snapshot.stats
+    result.files = stats['files']
+    RunJournal.note(files=stats['files'], additions=stats['additions'], deletions=stats['deletions'])
+    
+    # Check if there are changes
+    if not snapshot.has_changes:
+        print("ℹ️ No changes detected in repository")
+        print("✨ Repository is up to date!")
+        result.seconds = time.perf_counter() - started
+        return result
+    
+    binary_note = f", {stats['binary_files']} binary ({stats['binary_bytes']:+,} bytes)" if stats['binary_files'] else ""
+    print(f"📊 Changes detected: {stats['files']} files, +{stats['additions']} -{stats['deletions']} lines{binary_note}")
+    if snapshot.truncated:
+        print(f"⚠️ Status listing capped at {config.max_status_records} entries")
+        if settings.stage_include or settings.stage_exclude:
+            # Paths past the cap are unknown, so the globs cannot be applied to them
+            print("❌ Staging globs need the full listing; raise max_status_records to commit")
+            result.outcome = "error"
+            result.seconds = time.perf_counter() - started
+            return result
+    
+    if config.preflight and not run_preflight(args, settings):
+        result.outcome = "preflight failed"
+        result.seconds = time.perf_counter() - started
+        return result
+    
+    if args.dry_run:
+        print("DRY RUN: Would stage and commit changes")
+        print(f"Files to be added: {stats['files']}")
+        result.outcome = "dry-run"
+        result.seconds = time.perf_counter() - started
+        return result
+    
+    if getattr(args, 'split', False):
+        messages = SplitCommitter(args).run(snapshot)
+        if not messages:
+            result.outcome = "error" if messages is None else "clean"
+            result.seconds = time.perf_counter() - started
+            return result
+        result.message = f"{len(messages)} commits: {messages[0]}" + (" ..." if len(messages) > 1 else "")
+        result.outcome = "committed"
+        RunJournal.note(source='split', commits=len(messages))
+        if args.pipeline:
+            # The pipeline normally sets the remote up while staging
+            GitOperations.ensure_remote(settings.remote_url)
+        return _publish(args, settings, result, push_slots, started)
+    
+    if args.pipeline:
+        pipeline = CommitPipeline(args, settings)
+        commit_message = pipeline.run(snapshot)
+        if pipeline.cancelled.is_set():
+            result.outcome = "error" if pipeline.staging_failed else "checks failed"
+            result.seconds = time.perf_counter() - started
+            return result
+    else:
+        # Stage changes
+        with tracer.span("staging"):
+            previous_tree = GitOperations.get_staged_tree()
+            staged = GitOperations.stage_snapshot(snapshot)
+        if not staged:
+            result.outcome = "error"
+            result.seconds = time.perf_counter() - started
+            return result
+        print("📁 Changes staged")
+        
+        # Run pre-commit checks on what is about to be committed
+        with tracer.span("quality checks"):
+            quality_ok = PreCommitHooks.check_code_quality()
+        if not quality_ok:
+            if previous_tree:
+                GitOperations.run_git(["read-tree", previous_tree])
+            print("❌ Code quality checks failed")
+            result.outcome = "checks failed"
+            result.seconds = time.perf_counter() - started
+            return result
+        
+        # Generate commit message
+        commit_message = args.message
+        if not commit_message and not args.no_ai:
+            with tracer.span("message"):
+                cache = None if args.no_cache else MessageCache()
+                generator = CommitMessageGenerator(config.ollama_model, cache)
+                commit_message = generator.heuristic_message(snapshot)
+                if not commit_message:
+                    print("🤖 Generating AI commit message...")
+                    recent_commits = CommitHistoryIndex.examples_for(snapshot)
+                    commit_message = generator.generate_enhanced_message(snapshot, recent_commits)
+    
+    # Fallback message
+    if not commit_message:
+        generator = CommitMessageGenerator()
+        commit_message = generator.generate_fallback_message(snapshot)
+        print(f"📝 Using fallback message: {commit_message}")
+        RunJournal.note(source='fallback')
+    else:
+        if args.message:
+            RunJournal.note(source='user')
+        print(f"✅ Commit message: {commit_message}")
+    result.message = commit_message
+    
+    # Create commit
+    with tracer.span("commit"):
+        try:
+            committed = GitOperations._run(["git", "commit", "-m", commit_message]).returncode == 0
+        except FileNotFoundError:
+            print("❌ Git executable not found")
+            committed = False
+    if not committed:
+        # A pre-commit hook refusal lands here; HEAD is unchanged, so there is nothing to push
+        print("❌ Commit failed; nothing was pushed")
+        result.outcome = "error"
+        result.seconds = time.perf_counter() - started
+        return result
+    print(f"✅ Commit created: {commit_message}")
+    result.outcome = "committed"
+    
+    return _publish(args, settings, result, push_slots, started)
+
+def _publish(args: argparse.Namespace, settings: RepoSettings, result: RepoResult,
+             push_slots: Optional[threading.Semaphore], started: float) -> RepoResult:
+    """Point the configured branch at HEAD and push it, or queue the push."""
+    # Configure branch and remote
+    GitOperations.run_command(["git", "branch", "-M", settings.branch], capture_output=False)
+    
+    if not args.pipeline:
+        GitOperations.ensure_remote(settings.remote_url)
+    
+    queue = PushQueue()
+    if getattr(args, 'defer_push', False):
+        queue.add(settings.path, settings.branch, GitOperations.head_commit(), delay=config.push_defer_seconds)
+        print(f"📮 Push queued; it goes out with the next flush (within {config.push_defer_seconds:g}s in --watch)")
+        result.outcome = "queued"
+        result.seconds = time.perf_counter() - started
+        return result
+    
+    # Push to GitHub
+    print("🚀 Pushing to GitHub...")
+    with tracer.span("push"):
+        if push_slots is not None:
+            with push_slots:
+                pushed, error = GitOperations.push_branches("origin", [settings.branch])
+        else:
+            pushed, error = GitOperations.push_branches("origin", [settings.branch])
+    
+    if pushed:
+        print("✅ Successfully pushed to GitHub!")
+        queue.discard(settings.path, "origin", [settings.branch])
+        result.outcome = "pushed"
+    else:
+        if error:
+            print(f"   Error: {error}")
+        entry = queue.add(settings.path, settings.branch, GitOperations.head_commit(), error=error or "push failed")
+        retry_in = max(0, entry['next_attempt'] - time.time())
+        print("⚠️ Push failed. Check SSH connection and repository permissions.")
+        print(f"📮 Queued for retry in {retry_in:.0f}s (run with --flush-queue to retry now)")
+        result.outcome = "push failed"
+    result.seconds = time.perf_counter() - started
+    return result
+
+class _RepoTaggedOutput:
+    """Stdout wrapper that prefixes lines printed by batch worker threads."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._pending = threading.local()
+        self._lock = threading.Lock()
+
+    def write(self, text: str) -> int:
+        label = getattr(_repo_context, 'label', None)
+        if not label:
+            return self.stream.write(text)
+        buffered = getattr(self._pending, 'text', '') + text
+        *lines, self._pending.text = buffered.split('\n')
+        if lines:
+            with self._lock:
+                self.stream.write(''.join(f"[{label}] {line}\n" for line in lines))
+        return len(text)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+class BatchRunner:
+    """Commit and push many repositories from one process.
+
+    Git work runs on a bounded worker pool, every model request goes
+    through one shared single-worker queue to the same warm model, and a
+    semaphore caps how many pushes are in flight at once.
+    """
+
+    def __init__(self, args: argparse.Namespace, repos: List[Path]):
+        self.args = args
+        self.repos = repos
+        self.workers = config.batch_workers
+        self.push_slots = threading.BoundedSemaphore(max(1, config.batch_push_concurrency))
+
+    @staticmethod
+    def discover(spec: str) -> List[Path]:
+        """Expand a list file (one path per line) or a glob into repositories."""
+        spec_path = Path(spec).expanduser()
+        if spec_path.is_file():
+            lines = spec_path.read_text(encoding='utf-8').splitlines()
+            candidates = [
+                (spec_path.parent / Path(line.strip()).expanduser()) for line in lines
+                if line.strip() and not line.strip().startswith('#')
+            ]
+        else:
+            candidates = [Path(match) for match in sorted(glob.glob(os.path.expanduser(spec)))]
+
+        repos: List[Path] = []
+        for candidate in candidates:
+            candidate = candidate.resolve()
+            if (candidate / ".git").exists() and candidate not in repos:
+                repos.append(candidate)
+        return repos
+
+    def run(self) -> List[RepoResult]:
+        """Process every repository and return results in input order."""
+        uses_model = not (self.args.message or self.args.no_ai or self.args.dry_run)
+        if uses_model and config.llm_backend == "http":
+            OllamaClient.shared().warm_async(config.ollama_model)
+
+        original_stdout = sys.stdout
+        sys.stdout = _RepoTaggedOutput(original_stdout)
+        from concurrent.futures import ThreadPoolExecutor
+        CommitMessageGenerator.model_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm")
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="repo") as pool:
+                return list(pool.map(self._process, self.repos))
+        finally:
+            CommitMessageGenerator.model_executor.shutdown(wait=False)
+            CommitMessageGenerator.model_executor = None
+            sys.stdout = original_stdout
+
+    def _process(self, repo: Path) -> RepoResult:
+        started = time.perf_counter()
+        with GitOperations.use_repo(repo, label=repo.name):
+            try:
+                settings = RepoSettings.load(repo, default_repo_name=repo.name)
+                return run_repository(self.args, settings, self.push_slots)
+            except Exception as e:
+                print(f"❌ Unexpected error: {e}")
+                return RepoResult(repo=str(repo), outcome="error", message=str(e),
+                                  seconds=time.perf_counter() - started)
+
+    @staticmethod
+    def print_table(results: List[RepoResult]) -> None:
+        """Print a per-repository summary table."""
+        name_width = max([len(Path(r.repo).name) for r in results] + [len("Repository")])
+        print(f"\n{'Repository':<{name_width}}  {'Outcome':<13} {'Files':>6} {'Time':>7}  Message")
+        print(f"{'-' * name_width}  {'-' * 13} {'-' * 6} {'-' * 7}  {'-' * 30}")
+        for r in results:
+            print(f"{Path(r.repo).name:<{name_width}}  {r.outcome:<13} {r.files:>6} {r.seconds:>6.1f}s  {r.message}")
+        counts: Dict[str, int] = {}
+        for r in results:
+            counts[r.outcome] = counts.get(r.outcome, 0) + 1
+        print("📊 " + ", ".join(f"{outcome}: {count}" for outcome, count in sorted(counts.items())))
+        if ChangeClassifier.summary():
+            print(ChangeClassifier.summary())
+
+class InotifyWatcher:
+    """Recursive change notifications through Linux inotify (via ctypes).
+
+    ``poll`` returns the repository-relative paths touched since the last
+    call, or ``None`` when the kernel queue overflowed and a full rescan
+    is needed.
+    """
+
+    NAME = "inotify"
+    IN_MODIFY, IN_ATTRIB, IN_CLOSE_WRITE = 0x2, 0x4, 0x8
+    IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x40, 0x80, 0x100, 0x200
+    IN_DELETE_SELF, IN_MOVE_SELF = 0x400, 0x800
+    IN_Q_OVERFLOW, IN_IGNORED, IN_ISDIR = 0x4000, 0x8000, 0x40000000
+    IN_NONBLOCK, IN_CLOEXEC = 0o4000, 0o2000000
+    MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+            | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self, root: Path, skip_dirs: Iterable[str] = ()):
+        import ctypes
+        import ctypes.util
+        libc_name = ctypes.util.find_library('c')
+        if not sys.platform.startswith('linux') or not libc_name:
+            raise OSError(errno.ENOSYS, "inotify is not available on this platform")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.root = root
+        self.skip_dirs = set(skip_dirs) | {'.git'}
+        self.fd = self.libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches: Dict[int, str] = {}
+        try:
+            self._watch_tree('')
+        except OSError:
+            self.close()
+            raise
+
+    def _watch_tree(self, relative: str) -> None:
+        """Add a watch for ``relative`` and every directory below it."""
+        import ctypes
+        pending = [relative]
+        while pending:
+            current = pending.pop()
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(self.root / current), self.MASK)
+            if wd < 0:
+                code = ctypes.get_errno()
+                if code in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                    continue
+                raise OSError(code, f"inotify_add_watch failed for {current or '.'}")
+            self.watches[wd] = current
+            try:
+                with os.scandir(self.root / current) as entries:
+                    for entry in entries:
+                        child = f"{current}/{entry.name}" if current else entry.name
+                        if entry.is_dir(follow_symlinks=False) and child not in self.skip_dirs \
+                                and entry.name not in self.skip_dirs:
+                            pending.append(child)
+            except OSError:
+                continue
+
+    def poll(self, timeout: Optional[float]) -> Optional[set]:
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed: set = set()
+        overflow = False
+        while True:
+            try:
+                data = os.read(self.fd, 256 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+                offset += self.EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                if mask & self.IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                directory = self.watches.get(wd)
+                if mask & self.IN_IGNORED:
+                    self.watches.pop(wd, None)
+                if directory is None or not name:
+                    continue
+                path = f"{directory}/{name}" if directory else name
+                if path in self.skip_dirs or name in self.skip_dirs:
+                    continue
+                changed.add(path)
+                if mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    # Files may land in a new directory before its watch exists
+                    self._watch_tree(path)
+        return None if overflow else changed
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+class PollingWatcher:
+    """Fallback watcher that compares file mtimes and sizes between scans."""
+
+    NAME = "polling"
+
+    def __init__(self, root: Path, skip_dirs: Iterable[str] = (), interval: float = 2.0):
+        self.root = root
+        self.skip_dirs = set(skip_dirs) | {'.git'}
+        self.interval = interval
+        self.state = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        state: Dict[str, Tuple[int, int]] = {}
+        pending = ['']
+        while pending:
+            current = pending.pop()
+            try:
+                with os.scandir(self.root / current) as entries:
+                    for entry in entries:
+                        child = f"{current}/{entry.name}" if current else entry.name
+                        if child in self.skip_dirs or entry.name in self.skip_dirs:
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(child)
+                            continue
+                        try:
+                            info = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        state[child] = (info.st_mtime_ns, info.st_size)
+            except OSError:
+                continue
+        return state
+
+    def poll(self, timeout: Optional[float]) -> Optional[set]:
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        current = self._scan()
+        previous, self.state = self.state, current
+        changed = {path for path, stamp in current.items() if previous.get(path) != stamp}
+        changed.update(path for path in previous if path not in current)
+        return changed
+
+    def close(self) -> None:
+        pass
+
+class WatchMode:
+    """Long-running ``--watch`` loop that commits after edits settle.
+
+    Watcher events feed an in-memory dirty-path set. Once no event has
+    arrived for ``watch_quiet_seconds`` (or edits have kept coming for
+    ``watch_max_delay_seconds``) only those paths, plus whatever the
+    previous snapshot still had pending, are re-scanned and handed to
+    ``run_repository``.
+    """
+
+    def __init__(self, args: argparse.Namespace, settings: RepoSettings):
+        self.args = args
+        self.settings = settings
+        self.quiet = config.watch_quiet_seconds
+        self.dirty: set = set()
+        self.rescan_all = False
+        self.first_event: Optional[float] = None
+        self.last_event: Optional[float] = None
+        self.snapshot = RepoSnapshot()
+
+    @staticmethod
+    def enable_git_caches() -> List[str]:
+        """Turn on the untracked cache and, where built in, fsmonitor for child git processes.
+
+        Uses ``GIT_CONFIG_COUNT`` so the repository's own config is left untouched.
+        """
+        settings = [("core.untrackedCache", "true")]
+        build_options = GitOperations.run_git(["version", "--build-options"], check=False) or b''
+        if b"fsmonitor--daemon" in build_options:
+            settings.append(("core.fsmonitor", "true"))
+        count = int(os.environ.get("GIT_CONFIG_COUNT", "0") or 0)
+        for key, value in settings:
+            os.environ[f"GIT_CONFIG_KEY_{count}"] = key
+            os.environ[f"GIT_CONFIG_VALUE_{count}"] = value
+            count += 1
+        os.environ["GIT_CONFIG_COUNT"] = str(count)
+        return [key for key, _ in settings]
+
+    @staticmethod
+    def ignored_directories() -> List[str]:
+        """Top-level ignored directories (build output, virtualenvs) not worth watching."""
+        output = GitOperations.run_git(
+            ["ls-files", "-z", "--others", "--ignored", "--exclude-standard", "--directory"], check=False
+        ) or b''
+        return [os.fsdecode(entry).rstrip('/') for entry in output.split(b'\0') if entry.endswith(b'/')]
+
+    def open_watcher(self, root: Path):
+        skip = self.ignored_directories()
+        try:
+            return InotifyWatcher(root, skip)
+        except OSError as e:
+            print(f"⚠️ inotify unavailable ({e.strerror or e}); polling every {config.watch_poll_interval}s")
+            return PollingWatcher(root, skip, config.watch_poll_interval)
+
+    def run(self) -> None:
+        top = GitOperations.run_git(["rev-parse", "--show-toplevel"], check=False)
+        root = Path(os.fsdecode(top.strip())) if top else self.settings.path
+        caches = self.enable_git_caches()
+        watcher = self.open_watcher(root)
+        flusher = PushFlusher(PushQueue()).start()
+        print(f"👀 Watching {root} with {watcher.NAME} (git: {', '.join(caches)})")
+        print(f"⏳ Committing after {self.quiet:g}s without edits - press Ctrl+C to stop")
+
+        with tracer.span("warm snapshot"):
+            self.snapshot = RepoSnapshot.capture()
+        if self.snapshot.has_changes:
+            self._mark(time.monotonic())
+        try:
+            while True:
+                now = time.monotonic()
+                timeout = self._time_to_cycle(now)
+                changes = watcher.poll(1.0 if timeout is None else max(0.05, min(timeout, 1.0)))
+                now = time.monotonic()
+                if changes is None:
+                    self.rescan_all = True
+                    self._mark(now)
+                elif changes:
+                    self.dirty.update(changes)
+                    self._mark(now)
+                timeout = self._time_to_cycle(now)
+                if timeout is not None and timeout <= 0:
+                    self._cycle()
+        except KeyboardInterrupt:
+            print("\n👋 Watch stopped")
+        finally:
+            watcher.close()
+            flusher.stop()
+
+    def _mark(self, now: float) -> None:
+        if self.first_event is None:
+            self.first_event = now
+            if not (self.args.message or self.args.no_ai or self.args.dry_run) and config.llm_backend == "http":
+                # Load the model while the edits settle
+                OllamaClient.shared().warm_async(config.ollama_model)
+        self.last_event = now
+
+    def _time_to_cycle(self, now: float) -> Optional[float]:
+        """Seconds until the pending changes should be committed, or ``None`` when idle."""
+        if self.first_event is None:
+            return None
+        return min(self.last_event + self.quiet, self.first_event + config.watch_max_delay_seconds) - now
+
+    def _refresh(self) -> RepoSnapshot:
+        """Re-scan only what may have changed since the last snapshot."""
+        paths = self.dirty | set(self.snapshot.all_paths()) | set(self.snapshot.rename_sources.values())
+        if self.rescan_all or self.snapshot.truncated or len(paths) > config.watch_max_paths:
+            return RepoSnapshot.capture()
+        if not paths:
+            return self.snapshot
+        return RepoSnapshot.capture(paths=sorted(paths))
+
+    def _reload_config(self) -> None:
+        """Apply edits to .commit-push.json (and the environment) before the next commit.
+
+        The file is only parsed again when its mtime changes. Everything
+        reads ``config`` when it runs, except the quiet period kept here
+        and the shared Ollama connection, which are rebuilt.
+        """
+        global config
+        try:
+            fresh = Config.load(self.settings.path)
+            settings = RepoSettings.load(self.settings.path)
+        except ConfigError as e:
+            print(f"⚠️ Keeping the previous settings: {e}")
+            return
+        self.settings = settings
+        if fresh == config:
+            return
+        connection = ('ollama_host', 'ollama_connect_timeout', 'ollama_first_token_timeout',
+                      'ollama_total_timeout', 'ollama_keep_alive')
+        if any(getattr(fresh, name) != getattr(config, name) for name in connection):
+            with OllamaClient._shared_lock:
+                if OllamaClient._shared is not None:
+                    OllamaClient._shared.close()
+                OllamaClient._shared = None
+        config = fresh
+        self.quiet = config.watch_quiet_seconds
+        print("🔧 Configuration reloaded")
+
+    def _cycle(self) -> None:
+        started = time.perf_counter()
+        try:
+            with tracer.span("watch cycle"):
+                snapshot = self._refresh()
+                self.dirty.clear()
+                self.rescan_all = False
+                self.first_event = self.last_event = None
+                if not snapshot.has_changes:
+                    self.snapshot = snapshot
+                    return
+                print(f"\n🔔 {datetime.now().strftime('%H:%M:%S')} changes settled")
+                self._reload_config()
+                result = run_repository(self.args, self.settings, snapshot=snapshot)
+        except Exception as e:
+            print(f"❌ Watch cycle failed: {e}")
+            self.rescan_all = True
+            return
+        # After a commit the worktree matches HEAD, so nothing stays pending
+        self.snapshot = RepoSnapshot() if result.outcome in ("committed", "pushed", "push failed") else snapshot
+        print(f"🔁 Cycle finished: {result.outcome} in {time.perf_counter() - started:.1f}s")
+        if ChangeClassifier.summary():
+            print(ChangeClassifier.summary())
 
 def main():
     """Enhanced main function with argument parsing."""
+    global config
     parser = argparse.ArgumentParser(description="AI-powered Git commit and push tool")
+    parser.add_argument("command", nargs="?", choices=["stats"],
+                        help="stats: summarise the run journal (latencies, hit rates, outcomes) and exit")
+    parser.add_argument("--days", type=float, default=None, metavar="N",
+                        help="With stats, only count runs from the last N days")
     parser.add_argument("--dry-run", action="store_true", help="Show what would be done without executing")
     parser.add_argument("--install-hooks", action="store_true", help="Install pre-commit hooks")
+    parser.add_argument("--scan-staged", action="store_true", help="Run the pre-commit checks on staged changes")
     parser.add_argument("--no-ai", action="store_true", help="Skip AI message generation")
     parser.add_argument("--message", "-m", help="Use custom commit message")
-    parser.add_argument("--model", default="mistral", help="Ollama model to use")
+    parser.add_argument("--model", default=None, help=f"Ollama model to use (default: {config.ollama_model})")
+    parser.add_argument("--backend", choices=["http", "langchain"], default=None,
+                        help="LLM backend: built-in Ollama HTTP client (default) or LangChain")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the cached AI commit messages")
+    parser.add_argument("--candidates", type=int, default=None, metavar="N",
+                        help="Ask the model for N messages in one JSON reply and keep the best-scoring one")
+    parser.add_argument("--heuristic-confidence", type=float, default=None, metavar="SCORE",
+                        help=f"Skip the model when the local classifier is at least this confident "
+                             f"(0-1, default: {config.heuristic_confidence:g}; above 1 always asks the model)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Generate the message while checks, staging and remote setup run")
+    parser.add_argument("--split", action="store_true",
+                        help="Commit the changes as several logical commits (docs, tests, deps, per-scope code)")
+    parser.add_argument("--repos", metavar="LIST_OR_GLOB",
+                        help="Process many repositories: a file with one path per line, or a glob")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="Parallel repositories in --repos mode")
+    parser.add_argument("--defer-push", action="store_true",
+                        help="Commit now and leave the push to the background push queue")
+    parser.add_argument("--flush-queue", action="store_true",
+                        help="Retry every queued push now and exit")
+    parser.add_argument("--ssh-control-master", action="store_true",
+                        help="Reuse one SSH connection per host across pushes")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and commit/push whenever edits settle")
+    parser.add_argument("--quiet-period", type=float, default=None, metavar="SECONDS",
+                        help=f"Seconds without edits before --watch commits (default: {config.watch_quiet_seconds:g})")
+    parser.add_argument("--preflight", action="store_true",
+                        help="Check Git identity, SSH keys and the remote before committing (results are cached)")
+    parser.add_argument("--non-interactive", action="store_true",
+                        help="Never prompt; the pre-commit hook blocks on findings instead of asking")
+    parser.add_argument("--diagnose", action="store_true",
+                        help="Run the environment checks without the cache, print them and exit")
+    parser.add_argument("--profile", nargs="?", const="commit-push-trace.json", metavar="TRACE_FILE",
+                        help="Print phase timings and write a Chrome trace (default: commit-push-trace.json)")
     
     args = parser.parse_args()
+    tracer.enabled = bool(args.profile)
+    flusher: Optional[PushFlusher] = None
     
     try:
+        # Flags override the environment, which overrides .commit-push.json
+        cli_values = {
+            'ollama_model': args.model,
+            'llm_backend': args.backend,
+            'ssh_control_master': True if args.ssh_control_master else None,
+            'heuristic_confidence': args.heuristic_confidence,
+            'commit_candidates': args.candidates,
+            'batch_workers': args.jobs,
+            'watch_quiet_seconds': args.quiet_period,
+            'preflight': True if args.preflight else None,
+            'non_interactive': True if args.non_interactive or args.repos or args.watch else None,
+        }
+        Config.overrides = {name: value for name, value in cli_values.items() if value is not None}
+        try:
+            config = Config.load(Path.cwd())
+        except ConfigError as e:
+            print(f"❌ Invalid configuration: {e}")
+            sys.exit(2)
+        if config.non_interactive:
+            # Reaches the hook that git commit runs, so unattended runs never wait on a prompt
+            os.environ["COMMIT_PUSH_NON_INTERACTIVE"] = "1"
+        
+        if args.scan_staged:
+            sys.exit(0 if PreCommitScanner.run() else 1)
+        
         # Install hooks if requested
         if args.install_hooks:
             PreCommitHooks.install_hooks()
             return
         
-        # Update config
-        config.ollama_model = args.model
+        if args.command == "stats":
+            report_journal(args)
+            return
+        
+        if args.diagnose:
+            sys.exit(0 if run_preflight(args, RepoSettings.load(Path.cwd()), use_cache=False) else 1)
+        
+        if args.flush_queue:
+            pushed, remaining = PushQueue().flush(force=True)
+            print(f"📮 Push queue: {pushed} pushed, {remaining} still queued")
+            sys.exit(1 if remaining else 0)
         
         print("🚀 Enhanced Git Commit Push Assistant")
         print(f"📅 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
-        # Initialize Git repo if needed
-        if not GitOperations.is_git_repo():
-            if args.dry_run:
-                print("DRY RUN: Would initialize Git repository")
-            else:
-                GitOperations.run_command("git init", capture_output=False)
-                print("📁 Git repository initialized")
+        if args.repos and args.watch:
+            print("❌ --watch works on a single repository; it cannot be combined with --repos")
+            sys.exit(2)
         
-        # Get repository status
-        status = GitOperations.get_repo_status()
-        stats = GitOperations.get_file_changes()
+        if args.split and args.message:
+            print("❌ --split writes one message per commit; it cannot be combined with --message")
+            sys.exit(2)
         
-        # Check if there are changes
-        has_changes = any(files for files in status.values())
-        if not has_changes:
-            print("ℹ️ No changes detected in repository")
-            print("✨ Repository is up to date!")
-            return
+        repos = BatchRunner.discover(args.repos) if args.repos else [Path.cwd()]
         
-        print(f"📊 Changes detected: {stats['files']} files, +{stats['additions']} -{stats['deletions']} lines")
+        # Retry earlier failed pushes of other repositories while this run does its own work
+        if not args.dry_run and not args.watch and PushQueue().seconds_until_due() == 0:
+            flusher = PushFlusher(PushQueue(), once=True, skip_repos=repos).start()
         
-        if args.dry_run:
-            print("DRY RUN: Would stage and commit changes")
-            print(f"Files to be added: {sum(len(files) for files in status.values())}")
+        if args.repos:
+            if not repos:
+                print(f"❌ No Git repositories matched {args.repos}")
+                sys.exit(1)
+            print(f"📚 Processing {len(repos)} repositories")
+            with tracer.span("run"):
+                results = BatchRunner(args, repos).run()
+            BatchRunner.print_table(results)
+            if any(r.outcome in ("error", "push failed", "checks failed") for r in results):
+                sys.exit(1)
             return
         
-        # Run pre-commit checks
-        if not PreCommitHooks.check_code_quality():
-            print("❌ Code quality checks failed")
+        if args.watch:
+            with tracer.span("run"):
+                WatchMode(args, RepoSettings.load(Path.cwd())).run()
             return
         
-        # Stage changes
-        GitOperations.run_command("git add .", capture_output=False)
-        print("📁 Changes staged")
+        # Load the model while the repository is analysed
+        if not (args.message or args.no_ai or args.dry_run) and config.llm_backend == "http":
+            OllamaClient.shared().warm_async(config.ollama_model)
         
-        # Generate commit message
-        commit_message = args.message
-        if not commit_message and not args.no_ai:
-            print("🤖 Generating AI commit message...")
-            generator = CommitMessageGenerator(config.ollama_model)
-            recent_commits = GitOperations.get_recent_commits()
-            commit_message = generator.generate_enhanced_message(status, stats, recent_commits)
-        
-        # Fallback message
-        if not commit_message:
-            generator = CommitMessageGenerator()
-            commit_message = generator.generate_fallback_message(status, stats)
-            print(f"📝 Using fallback message: {commit_message}")
-        else:
-            print(f"✅ Commit message: {commit_message}")
-        
-        # Create commit
-        GitOperations.run_command(f'git commit -m "{commit_message}"', capture_output=False)
-        print(f"✅ Commit created: {commit_message}")
-        
-        # Configure branch and remote
-        GitOperations.run_command(f"git branch -M {config.default_branch}", capture_output=False)
-        
-        existing_remote = GitOperations.run_command("git remote get-url origin")
-        if not existing_remote:
-            GitOperations.run_command(f"git remote add origin {config.remote_url}", capture_output=False)
-            print(f"📡 Remote configured: {config.remote_url}")
-        
-        # Push to GitHub
-        print("🚀 Pushing to GitHub...")
-        push_result = GitOperations.run_command(f"git push -u origin {config.default_branch}", 
-                                              capture_output=True, check=False)
-        
-        if push_result is not None:
-            print("✅ Successfully pushed to GitHub!")
-        else:
-            print("⚠️ Push failed. Check SSH connection and repository permissions.")
+        with tracer.span("run"):
+            result = run_repository(args, RepoSettings.load(Path.cwd()))
+        if result.outcome == "error":
+            sys.exit(1)
             
     except KeyboardInterrupt:
         print("\n⏹️ Operation cancelled by user")
@@ -468,6 +4098,30 @@ def main():
     except Exception as e:
         print(f"❌ Unexpected error: {e}")
         sys.exit(1)
+    finally:
+        if flusher is not None:
+            flusher.stop()
+        if tracer.enabled:
+            report_profile(args.profile)
+
+def report_journal(args: argparse.Namespace) -> None:
+    """Stream the run journals of this repository (or every ``--repos`` match) into one summary."""
+    since = time.time() - args.days * 86400 if args.days else None
+    summary = JournalStats()
+    for repo in (BatchRunner.discover(args.repos) if args.repos else [Path.cwd()]):
+        with GitOperations.use_repo(repo):
+            for entry in RunJournal().records(since):
+                summary.add(entry)
+    summary.print_report()
+
+def report_profile(trace_file: str) -> None:
+    """Print the timing summary and write the Chrome trace."""
+    tracer.print_summary()
+    try:
+        tracer.write_chrome_trace(Path(trace_file))
+        print(f"\n📈 Trace written to {trace_file}")
+    except OSError as e:
+        print(f"⚠️ Could not write trace: {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
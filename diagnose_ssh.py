@@ -1,114 +1,261 @@
 #!/usr/bin/env python3
-import subprocess
+"""
+Diagnostic de l'environnement Git/SSH, utilisable seul ou comme preflight
+de ``commit_push.py``.
+
+Les vérifications indépendantes tournent en parallèle, chacune avec sa
+propre échéance, et les résultats réseau réussis sont mis en cache pendant
+un TTL configurable pour ne pas re-sonder SSH à chaque commit.
+"""
+import argparse
+import json
 import os
+import re
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_TTL = 600.0
+DEFAULT_TIMEOUT = 5.0
+
+@dataclass
+class CheckResult:
+    """Outcome of one check: ``status`` is "ok", "warn" or "fail"."""
+    name: str
+    status: str
+    detail: str
+    seconds: float = 0.0
+    cached: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.status != "fail"
 
-def run_cmd(cmd):
+@dataclass
+class Check:
+    """A named probe; ``cache_key`` set means a passing result may be reused."""
+    name: str
+    probe: Callable[[float], Tuple[str, str]]
+    deadline: float
+    cache_key: Optional[str] = None
+
+def run_cmd(cmd: List[str], timeout: float = DEFAULT_TIMEOUT, cwd: Optional[Path] = None,
+            env: Optional[Dict[str, str]] = None) -> Tuple[bool, str, str]:
+    """Run ``cmd`` without a shell, killing its whole process group at the deadline.
+
+    ``git ls-remote`` spawns ``ssh``; killing only git would leave ssh
+    holding the pipes open until the TCP timeout.
+    """
+    try:
+        process = subprocess.Popen(cmd, cwd=cwd, env=env, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE, text=True, start_new_session=True)
+    except OSError as e:
+        return False, "", str(e)
     try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-        return result.returncode == 0, result.stdout, result.stderr
-    except:
-        return False, "", "Commande échouée"
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        process.communicate()
+        return False, "", f"pas de réponse en {timeout:g}s"
+    return process.returncode == 0, stdout.strip(), stderr.strip()
 
-def diagnose_ssh():
-    print("🔍 DIAGNOSTIC SSH GITHUB\n" + "="*50)
-    
-    # 1. Vérifier les clés SSH
-    print("1️⃣ Vérification des clés SSH...")
-    ssh_dir = Path.home() / ".ssh"
-    
-    if not ssh_dir.exists():
-        print("❌ Dossier ~/.ssh inexistant")
-        return False
-    
-    keys = list(ssh_dir.glob("id_*"))
-    public_keys = [k for k in keys if k.suffix == ".pub"]
-    
-    if not public_keys:
-        print("❌ Aucune clé SSH trouvée")
-        return False
-    
-    print(f"✅ Clés trouvées : {[k.name for k in public_keys]}")
-    
-    # 2. Test de connexion GitHub
-    print("\n2️⃣ Test de connexion GitHub...")
-    success, stdout, stderr = run_cmd("ssh -T git@github.com")
-    
-    if "successfully authenticated" in stdout:
-        print("✅ Connexion SSH GitHub réussie")
-        username = stdout.split("Hi ")[1].split("!")[0] if "Hi " in stdout else "inconnu"
-        print(f"👤 Utilisateur connecté : {username}")
-    else:
-        print("❌ Échec de connexion SSH")
-        print(f"Erreur : {stderr}")
+class ResultCache:
+    """Passing results per check key, stored as JSON next to the push queue."""
+
+    _lock = threading.Lock()
+
+    def __init__(self, path: Optional[Path] = None, ttl: float = DEFAULT_TTL):
+        if path is None:
+            cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+            path = Path(cache_home) / "commit-push" / "diagnostics.json"
+        self.path = path
+        self.ttl = ttl
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry = self._load().get(key)
+        if isinstance(entry, dict) and time.time() - entry.get('at', 0) < self.ttl:
+            return entry
+        return None
+
+    def put(self, key: str, status: str, detail: str) -> None:
+        with self._lock:
+            data = self._load()
+            now = time.time()
+            data = {k: v for k, v in data.items() if isinstance(v, dict) and now - v.get('at', 0) < self.ttl}
+            data[key] = {'status': status, 'detail': detail, 'at': now}
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                temporary = self.path.with_suffix('.tmp')
+                temporary.write_text(json.dumps(data, indent=1), encoding='utf-8')
+                os.replace(temporary, self.path)
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+def check_ssh_keys(timeout: float) -> Tuple[str, str]:
+    """Keys loaded in the agent, else key files under ~/.ssh."""
+    loaded, stdout, _ = run_cmd(["ssh-add", "-l"], timeout)
+    if loaded and stdout:
+        return "ok", f"{len(stdout.splitlines())} clé(s) chargée(s) dans l'agent"
+    public_keys = sorted(p.name for p in (Path.home() / ".ssh").glob("id_*.pub"))
+    if public_keys:
+        return "ok", f"clés trouvées (agent vide) : {', '.join(public_keys)}"
+    return "warn", "aucune clé SSH trouvée (~/.ssh/id_*.pub)"
+
+def check_git_identity(repo: Optional[Path], timeout: float) -> Tuple[str, str]:
+    """The identity git would commit with here (config or GIT_COMMITTER_* variables)."""
+    found, stdout, _ = run_cmd(["git", "var", "GIT_COMMITTER_IDENT"], timeout, cwd=repo)
+    if not found or not stdout:
+        return "fail", "identité Git non configurée (git config --global user.name / user.email)"
+    return "ok", stdout.rsplit(' ', 2)[0]
+
+def is_ssh_url(url: str) -> bool:
+    return url.startswith("ssh://") or bool(re.match(r'^[\w.-]+@[\w.-]+:', url))
+
+def remote_url(repo: Optional[Path], remote: str = "origin", timeout: float = DEFAULT_TIMEOUT) -> Optional[str]:
+    found, stdout, _ = run_cmd(["git", "remote", "get-url", remote], timeout, cwd=repo)
+    return stdout if found and stdout else None
+
+def check_remote(url: str, timeout: float, env: Optional[Dict[str, str]] = None) -> Tuple[str, str]:
+    """Reach and authenticate against ``url`` with ``git ls-remote``.
+
+    Works for any transport git supports, so a local bare repository or a
+    local sshd (``ssh://localhost:2222/...``) can stand in for GitHub.
+    """
+    env = dict(env or os.environ)
+    env.setdefault("GIT_TERMINAL_PROMPT", "0")
+    ssh = env.get("GIT_SSH_COMMAND") or env.get("GIT_SSH") or "ssh"
+    # Never wait on a password or host-key prompt, and give up on the TCP connect before the deadline
+    env["GIT_SSH_COMMAND"] = f"{ssh} -o BatchMode=yes -o ConnectTimeout={max(1, int(timeout))}"
+    reachable, stdout, stderr = run_cmd(["git", "ls-remote", "--heads", url], timeout, env=env)
+    if reachable:
+        return "ok", f"{url} ({len(stdout.splitlines())} branche(s))"
+    # The first line names the cause; git's generic advice follows it
+    reason = stderr.splitlines()[0] if stderr else "échec"
+    return "fail", f"{url} : {reason}"
+
+def run_checks(repo: Optional[Path] = None, remote: str = "origin", url: Optional[str] = None,
+               ttl: float = DEFAULT_TTL, timeout: float = DEFAULT_TIMEOUT, use_cache: bool = True,
+               env: Optional[Dict[str, str]] = None, cache: Optional[ResultCache] = None) -> List[CheckResult]:
+    """Run every check concurrently; none takes longer than ``timeout``."""
+    url = url or remote_url(repo, remote, timeout)
+    checks = [Check("git_identity", lambda deadline: check_git_identity(repo, deadline), timeout)]
+    if not url or is_ssh_url(url):
+        checks.insert(0, Check("ssh_keys", check_ssh_keys, timeout))
+    if url:
+        checks.append(Check("remote", lambda deadline: check_remote(url, deadline, env), timeout,
+                            cache_key=f"remote:{url}"))
+    cache = cache or ResultCache(ttl=ttl)
+
+    def execute(check: Check) -> CheckResult:
+        if use_cache and check.cache_key:
+            hit = cache.get(check.cache_key)
+            if hit:
+                return CheckResult(check.name, hit['status'], hit['detail'], cached=True)
+        started = time.perf_counter()
+        status, detail = check.probe(check.deadline)
+        if check.cache_key and status == "ok":
+            cache.put(check.cache_key, status, detail)
+        return CheckResult(check.name, status, detail, time.perf_counter() - started)
+
+    with ThreadPoolExecutor(max_workers=len(checks)) as pool:
+        results = list(pool.map(execute, checks))
+    if not url:
+        results.append(CheckResult("remote", "warn", f"aucun remote '{remote}' configuré"))
+    return results
+
+def print_report(results: List[CheckResult]) -> None:
+    icons = {"ok": "✅", "warn": "⚠️", "fail": "❌"}
+    for result in results:
+        timing = "cache" if result.cached else f"{result.seconds:.2f}s"
+        print(f"{icons.get(result.status, '•')} {result.name:<13} {result.detail} ({timing})")
+
+def start_agent() -> bool:
+    """Start an ssh-agent for this process and its children when none is reachable.
+
+    ``eval $(ssh-agent -s)`` in a subshell dies with it; the variables are
+    set in ``os.environ`` instead, and printed so a shell can reuse them.
+    """
+    # Without an agent ssh-add reports on stderr; an empty agent answers on stdout
+    _, _, stderr = run_cmd(["ssh-add", "-l"])
+    if os.environ.get("SSH_AUTH_SOCK") and "agent" not in stderr.lower():
+        return True
+    started, stdout, stderr = run_cmd(["ssh-agent", "-s"])
+    if not started:
+        print(f"❌ Impossible de démarrer ssh-agent : {stderr}")
         return False
-    
-    # 3. Vérifier la configuration Git
-    print("\n3️⃣ Configuration Git...")
-    success, stdout, stderr = run_cmd("git config --global user.name")
-    if success and stdout:
-        print(f"✅ Nom utilisateur : {stdout}")
-    else:
-        print("⚠️ Nom utilisateur Git non configuré")
-    
-    success, stdout, stderr = run_cmd("git config --global user.email")
-    if success and stdout:
-        print(f"✅ Email : {stdout}")
-    else:
-        print("⚠️ Email Git non configuré")
-    
-    # 4. Vérifier le remote
-    print("\n4️⃣ Configuration du remote...")
-    success, stdout, stderr = run_cmd("git remote -v")
-    if success and stdout:
-        print(f"✅ Remotes configurés :\n{stdout}")
-    else:
-        print("⚠️ Aucun remote configuré")
-    
-    # 5. Vérifier le statut Git
-    print("\n5️⃣ Statut du dépôt...")
-    success, stdout, stderr = run_cmd("git status --porcelain")
-    if success:
-        if stdout:
-            print(f"📝 Changements détectés :\n{stdout}")
-        else:
-            print("✅ Dépôt propre")
-    
+    for name, value in re.findall(r'(SSH_AUTH_SOCK|SSH_AGENT_PID)=([^;]+);', stdout):
+        os.environ[name] = value
+        print(f"   export {name}={value}")
     return True
 
 def fix_common_issues():
     print("\n🔧 CORRECTIONS AUTOMATIQUES\n" + "="*50)
-    
+
     # Configurer Git si nécessaire
-    success, stdout, stderr = run_cmd("git config --global user.name")
+    success, stdout, stderr = run_cmd(["git", "config", "--global", "user.name"])
     if not success or not stdout:
         print("🔧 Configuration du nom utilisateur...")
-        run_cmd('git config --global user.name "khafidmedheb"')
-    
-    success, stdout, stderr = run_cmd("git config --global user.email")
+        run_cmd(["git", "config", "--global", "user.name", "khafidmedheb"])
+
+    success, stdout, stderr = run_cmd(["git", "config", "--global", "user.email"])
     if not success or not stdout:
         print("🔧 Configuration de l'email...")
-        run_cmd('git config --global user.email "khafid1506@gmail.com"')
-    
+        run_cmd(["git", "config", "--global", "user.email", "khafid1506@gmail.com"])
+
     # Démarrer l'agent SSH
     print("🔧 Démarrage de l'agent SSH...")
-    run_cmd("eval $(ssh-agent -s)")
-    
-    # Ajouter les clés SSH
+    if not start_agent():
+        return
+
+    # Ajouter les clés SSH (ssh-add peut demander la phrase de passe)
     ssh_dir = Path.home() / ".ssh"
     for key_file in ["id_ed25519", "id_rsa"]:
         key_path = ssh_dir / key_file
         if key_path.exists():
             print(f"🔧 Ajout de la clé {key_file}...")
-            run_cmd(f"ssh-add ~/.ssh/{key_file}")
+            subprocess.run(["ssh-add", str(key_path)])
+    ResultCache().clear()
+
+def diagnose_ssh(ttl: float = DEFAULT_TTL, timeout: float = DEFAULT_TIMEOUT, use_cache: bool = True) -> bool:
+    print("🔍 DIAGNOSTIC SSH GITHUB\n" + "="*50)
+    results = run_checks(Path.cwd(), ttl=ttl, timeout=timeout, use_cache=use_cache)
+    print_report(results)
+    return all(result.ok for result in results)
 
 if __name__ == "__main__":
-    if diagnose_ssh():
+    parser = argparse.ArgumentParser(description="Diagnostic Git/SSH")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Échéance par vérification (s)")
+    parser.add_argument("--ttl", type=float, default=DEFAULT_TTL, help="Durée de validité du cache (s)")
+    parser.add_argument("--no-cache", action="store_true", help="Ignorer les résultats en cache")
+    args = parser.parse_args()
+
+    if diagnose_ssh(args.ttl, args.timeout, not args.no_cache):
         print("\n✅ Diagnostic terminé avec succès!")
-        
+
         choice = input("\n🤔 Voulez-vous appliquer les corrections automatiques ? (o/N): ")
         if choice.lower() in ['o', 'oui', 'y', 'yes']:
             fix_common_issues()
     else:
         print("\n❌ Problèmes détectés. Consultez les solutions ci-dessous.")
-        fix_common_issues()
\ No newline at end of file
+        fix_common_issues()
@@ -0,0 +1,66 @@
+"""Shared fixtures: throwaway repositories with a bare ``origin`` and an isolated environment."""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def git(repo: Path, *args: str, input: str = None) -> str:
+    return subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True, text=True,
+                          input=input).stdout.strip()
+
+
+def run_tool(repo: Path, *args: str, timeout: float = 60) -> subprocess.CompletedProcess:
+    """Run commit_push.py as a user would, from inside ``repo``."""
+    return subprocess.run([sys.executable, str(ROOT / "commit_push.py"), *args], cwd=repo,
+                          stdin=subprocess.DEVNULL, capture_output=True, text=True, timeout=timeout)
+
+
+@pytest.fixture(autouse=True)
+def isolated_env(tmp_path, monkeypatch):
+    """No global git config, no reachable model, and a per-test push queue."""
+    home = tmp_path / "home"
+    home.mkdir()
+    values = {
+        'HOME': str(home),
+        'XDG_CACHE_HOME': str(home / ".cache"),
+        'GIT_CONFIG_NOSYSTEM': '1',
+        'GIT_AUTHOR_NAME': 'Test', 'GIT_AUTHOR_EMAIL': 'test@example.com',
+        'GIT_COMMITTER_NAME': 'Test', 'GIT_COMMITTER_EMAIL': 'test@example.com',
+        'COMMIT_PUSH_QUEUE': str(tmp_path / "push-queue.json"),
+        'OLLAMA_HOST': 'http://127.0.0.1:9',
+    }
+    for name, value in values.items():
+        monkeypatch.setenv(name, value)
+    for name in list(os.environ):
+        if name.startswith("COMMIT_PUSH_") and name != 'COMMIT_PUSH_QUEUE':
+            monkeypatch.delenv(name)
+    return values
+
+
+@pytest.fixture
+def make_repo(tmp_path):
+    """Factory for a repository with one commit, pushed to its own bare ``origin``."""
+    def make(name: str = "work") -> Path:
+        remote = tmp_path / f"{name}.git"
+        git(tmp_path, "init", "-q", "--bare", str(remote))
+        work = tmp_path / name
+        work.mkdir()
+        git(work, "init", "-q", "-b", "main")
+        git(work, "remote", "add", "origin", str(remote))
+        (work / "README.md").write_text("# demo\n")
+        git(work, "add", "README.md")
+        git(work, "commit", "-q", "-m", "init")
+        git(work, "push", "-q", "-u", "origin", "main")
+        return work
+    return make
+
+
+@pytest.fixture
+def repo(make_repo) -> Path:
+    return make_repo()
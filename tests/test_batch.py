@@ -0,0 +1,51 @@
+"""--repos: many repositories from one process, pushed to local bare remotes."""
+from commit_push import BatchRunner
+from conftest import git, run_tool
+
+
+def remote_head(repo):
+    return git(repo, "--git-dir", str(repo.parent / f"{repo.name}.git"), "rev-parse", "main")
+
+
+def test_batch_pushes_each_repository(make_repo, tmp_path):
+    first, second, clean = make_repo("first"), make_repo("second"), make_repo("clean")
+    (first / "one.txt").write_text("one\n")
+    (second / "two.txt").write_text("two\n")
+    clean_head = git(clean, "rev-parse", "HEAD")
+    repo_list = tmp_path / "repos.txt"
+    repo_list.write_text("# nightly\nfirst\nsecond\n\nclean\n")
+
+    result = run_tool(tmp_path, "--no-ai", "--repos", str(repo_list), "--jobs", "2")
+
+    assert result.returncode == 0, result.stdout
+    for repo in (first, second):
+        assert remote_head(repo) == git(repo, "rev-parse", "HEAD")
+        assert git(repo, "status", "--porcelain") == ""
+    assert remote_head(clean) == clean_head
+    table = result.stdout[result.stdout.index("Repository"):]
+    assert "pushed: 2" in table and "clean: 1" in table
+
+
+def test_failed_commit_is_not_pushed(make_repo, tmp_path):
+    good, refused = make_repo("good"), make_repo("refused")
+    (good / "ok.txt").write_text("ok\n")
+    (refused / "blocked.txt").write_text("blocked\n")
+    hook = refused / ".git" / "hooks" / "pre-commit"
+    hook.write_text("#!/bin/sh\nexit 1\n")
+    hook.chmod(0o755)
+    refused_head = git(refused, "rev-parse", "HEAD")
+
+    result = run_tool(tmp_path, "--no-ai", "--repos", str(tmp_path / "*"))
+
+    assert result.returncode == 1
+    assert "[refused] ❌ Commit failed; nothing was pushed" in result.stdout
+    assert git(refused, "rev-parse", "HEAD") == refused_head
+    assert remote_head(refused) == refused_head
+    assert remote_head(good) == git(good, "rev-parse", "HEAD")
+
+
+def test_discover_skips_non_repositories(make_repo, tmp_path):
+    repo = make_repo("real")
+    (tmp_path / "plain").mkdir()
+
+    assert BatchRunner.discover(str(tmp_path / "*")) == [repo.resolve()]
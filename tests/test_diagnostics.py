@@ -0,0 +1,92 @@
+"""Preflight diagnostics against local bare repositories standing in for GitHub."""
+import time
+
+import diagnose_ssh
+from conftest import git, run_tool
+
+
+def by_name(results):
+    return {result.name: result for result in results}
+
+
+def test_reachable_bare_remote(repo, tmp_path):
+    cache = diagnose_ssh.ResultCache(tmp_path / "diagnostics.json")
+
+    results = by_name(diagnose_ssh.run_checks(repo, cache=cache))
+
+    assert results["remote"].status == "ok"
+    assert results["git_identity"].status == "ok"
+    # A local path needs no SSH key
+    assert "ssh_keys" not in results
+
+
+def test_missing_remote_fails_and_is_not_cached(repo, tmp_path):
+    cache = diagnose_ssh.ResultCache(tmp_path / "diagnostics.json")
+    url = str(tmp_path / "missing.git")
+
+    first = by_name(diagnose_ssh.run_checks(repo, url=url, cache=cache))["remote"]
+    second = by_name(diagnose_ssh.run_checks(repo, url=url, cache=cache))["remote"]
+
+    assert first.status == second.status == "fail"
+    assert not second.cached
+
+
+def test_passing_remote_is_cached_for_the_ttl(repo, tmp_path):
+    path = tmp_path / "diagnostics.json"
+    diagnose_ssh.run_checks(repo, cache=diagnose_ssh.ResultCache(path, ttl=60))
+
+    cached = by_name(diagnose_ssh.run_checks(repo, cache=diagnose_ssh.ResultCache(path, ttl=60)))
+    expired = by_name(diagnose_ssh.run_checks(repo, cache=diagnose_ssh.ResultCache(path, ttl=0)))
+    probed = by_name(diagnose_ssh.run_checks(repo, use_cache=False, cache=diagnose_ssh.ResultCache(path, ttl=60)))
+
+    assert cached["remote"].cached
+    assert not expired["remote"].cached
+    assert not probed["remote"].cached
+
+
+def test_hanging_remote_is_cut_at_the_deadline(repo, tmp_path):
+    hanging_ssh = tmp_path / "hanging-ssh"
+    hanging_ssh.write_text("#!/bin/sh\nsleep 30\n")
+    hanging_ssh.chmod(0o755)
+    started = time.monotonic()
+
+    results = by_name(diagnose_ssh.run_checks(
+        repo, url="ssh://git@example.invalid/demo.git", timeout=1, use_cache=False,
+        env={"PATH": "/usr/bin:/bin", "GIT_SSH_COMMAND": str(hanging_ssh)},
+        cache=diagnose_ssh.ResultCache(tmp_path / "diagnostics.json")))
+
+    assert results["remote"].status == "fail"
+    assert "pas de réponse en 1s" in results["remote"].detail
+    assert time.monotonic() - started < 5
+
+
+def test_preflight_blocks_an_unreachable_remote(repo):
+    remote = repo.parent / "work.git"
+    remote.rename(repo.parent / "offline.git")
+    (repo / "notes.txt").write_text("notes\n")
+    head = git(repo, "rev-parse", "HEAD")
+
+    result = run_tool(repo, "--no-ai", "--preflight")
+
+    assert "❌ remote" in result.stdout
+    assert git(repo, "rev-parse", "HEAD") == head
+
+
+def test_preflight_passes_and_pushes(repo):
+    (repo / "notes.txt").write_text("notes\n")
+
+    result = run_tool(repo, "--no-ai", "--preflight")
+
+    assert "🩺 Preflight passed" in result.stdout
+    assert git(repo, "rev-parse", "origin/main") == git(repo, "rev-parse", "HEAD")
+
+
+def test_deferred_push_is_not_blocked_by_the_remote(repo):
+    (repo.parent / "work.git").rename(repo.parent / "offline.git")
+    (repo / "notes.txt").write_text("notes\n")
+    head = git(repo, "rev-parse", "HEAD")
+
+    result = run_tool(repo, "--no-ai", "--preflight", "--defer-push")
+
+    assert "📮 Push queued" in result.stdout, result.stdout
+    assert git(repo, "rev-parse", "HEAD") != head
@@ -0,0 +1,27 @@
+"""Importing commit_push stays cheap: within budget and without the lazily loaded modules."""
+import subprocess
+import sys
+
+from benchmark import IMPORT_BUDGET_MS, IMPORT_PROBE, LAZY_MODULES
+from conftest import ROOT
+
+
+def probe_import():
+    result = subprocess.run([sys.executable, "-c", IMPORT_PROBE, str(ROOT)],
+                            capture_output=True, text=True, check=True)
+    elapsed, modules = result.stdout.splitlines()
+    return float(elapsed), set(modules.split())
+
+
+def test_lazy_modules_are_not_imported():
+    _, loaded = probe_import()
+
+    assert sorted(name for name in LAZY_MODULES if name in loaded) == []
+
+
+def test_import_within_budget():
+    # Same gate as benchmark.py: cached bytecode, fastest of several runs
+    subprocess.run([sys.executable, "-m", "compileall", "-q", str(ROOT / "commit_push.py")], check=True)
+    fastest = min(probe_import()[0] for _ in range(5))
+
+    assert fastest < IMPORT_BUDGET_MS
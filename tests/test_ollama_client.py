@@ -0,0 +1,259 @@
+"""OllamaClient against a stub server speaking just enough of /api/generate."""
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+import commit_push
+from commit_push import OllamaCancelled, OllamaClient, OllamaError
+
+
+class StubOllama:
+    """One-connection-at-a-time server; ``reply(conn)`` writes each response."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.requests = 0
+        self.connections = 0
+        self.listener = socket.socket()
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen()
+        self.port = self.listener.getsockname()[1]
+        self.release = threading.Event()
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            self.connections += 1
+            with conn:
+                reader = conn.makefile("rb")
+                while self._read_request(reader):
+                    self.requests += 1
+                    if not self.reply(self, conn):
+                        break
+
+    @staticmethod
+    def _read_request(reader) -> bool:
+        length = 0
+        line = reader.readline()
+        if not line:
+            return False
+        while line not in (b"\r\n", b""):
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"content-length":
+                length = int(value)
+            line = reader.readline()
+        reader.read(length)
+        return True
+
+    def client(self, **timeouts) -> OllamaClient:
+        timeouts = {'connect_timeout': 2, 'first_token_timeout': 10, 'total_timeout': 10, **timeouts}
+        return OllamaClient(host=f"http://127.0.0.1:{self.port}", keep_alive="1m", **timeouts)
+
+    def close(self):
+        self.release.set()
+        self.listener.close()
+
+
+def chunks(*parts, done=True, close=False) -> bytes:
+    body = b"".join(json.dumps({'response': part, 'done': False}).encode() + b"\n" for part in parts)
+    if done:
+        body += json.dumps({'response': '', 'done': True}).encode() + b"\n"
+    head = b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+    head += b"Connection: close\r\n" if close else b""
+    return head + b"Content-Length: %d\r\n\r\n" % len(body) + body
+
+
+def hang_after_first_token(server, conn) -> bool:
+    """Start a chunked reply, then stall as a slow model would."""
+    first = json.dumps({'response': 'feat', 'done': False}).encode() + b"\n"
+    conn.sendall(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n"
+                 + b"%x\r\n" % len(first) + first + b"\r\n")
+    server.release.wait(30)
+    return False
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(reply):
+        server = StubOllama(reply)
+        servers.append(server)
+        return server
+    yield start
+    for server in servers:
+        server.close()
+
+
+def test_interrupt_stops_a_streaming_request(stub):
+    server = stub(hang_after_first_token)
+    client = server.client()
+    abort = threading.Event()
+    outcome = {}
+
+    def call():
+        try:
+            outcome['text'] = client.generate("m", "p", abort=abort)
+        except Exception as e:
+            outcome['error'] = e
+    worker = threading.Thread(target=call)
+    worker.start()
+    time.sleep(0.3)
+
+    started = time.monotonic()
+    abort.set()
+    client.interrupt(abort)
+    worker.join(5)
+
+    assert not worker.is_alive()
+    assert time.monotonic() - started < 2
+    assert isinstance(outcome.get('error'), OllamaCancelled)
+    # The lock is free for the next caller
+    assert client._lock.acquire(timeout=0.1)
+    client._lock.release()
+
+
+def test_aborted_request_is_never_sent(stub):
+    server = stub(lambda server, conn: conn.sendall(chunks("fix: x\n")) or True)
+    client = server.client()
+    abort = threading.Event()
+    abort.set()
+
+    with pytest.raises(OllamaCancelled):
+        client.generate("m", "p", abort=abort)
+    assert server.requests == 0
+    assert client.generate("m", "p") == "fix: x"
+
+
+def test_generator_cancel_stops_its_request(stub):
+    server = stub(hang_after_first_token)
+    generator = commit_push.CommitMessageGenerator("m", client=server.client())
+    outcome = {}
+
+    def call():
+        try:
+            outcome['message'] = generator._invoke_model("p")
+        except Exception as e:
+            outcome['error'] = e
+    worker = threading.Thread(target=call)
+    worker.start()
+    time.sleep(0.3)
+
+    generator.cancel()
+    worker.join(5)
+
+    assert not worker.is_alive()
+    assert isinstance(outcome.get('error'), OllamaCancelled)
+
+
+def trickle(*parts, pause=0.0):
+    """Chunked reply sending one token per chunk, ``pause`` seconds apart, never finishing."""
+    def reply(server, conn) -> bool:
+        conn.sendall(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n")
+        for part in parts:
+            line = json.dumps({'response': part, 'done': False}).encode() + b"\n"
+            try:
+                conn.sendall(b"%x\r\n" % len(line) + line + b"\r\n")
+            except OSError:
+                return False
+            time.sleep(pause)
+        server.release.wait(30)
+        return False
+    return reply
+
+
+def test_stops_at_the_first_complete_line(stub):
+    server = stub(trickle("feat", ": add", " stub\n", "Second paragraph"))
+
+    assert server.client().generate("m", "p") == "feat: add stub"
+
+
+def test_reuses_one_connection_after_complete_replies(stub):
+    server = stub(lambda server, conn: conn.sendall(chunks("docs: a")) or True)
+    client = server.client()
+
+    assert [client.generate("m", "p") for _ in range(3)] == ["docs: a"] * 3
+    assert server.requests == 3
+    assert server.connections == 1
+
+
+@pytest.mark.parametrize("reply", [
+    lambda server, conn: conn.sendall(chunks("fix: b\n", close=True)) and False,
+    lambda server, conn: conn.sendall(chunks("fix: b\n").replace(b"HTTP/1.1", b"HTTP/1.0", 1)) and False,
+], ids=["connection-close", "http-1.0"])
+def test_reconnects_after_the_server_closes(stub, reply):
+    server = stub(reply)
+    client = server.client()
+
+    assert client.generate("m", "p") == "fix: b"
+    assert client.generate("m", "p") == "fix: b"
+    assert server.connections == 2
+
+
+def test_full_reply_without_stopping_at_newline(stub):
+    server = stub(lambda server, conn: conn.sendall(chunks('{"a": 1,', '\n"b": 2}')) or True)
+
+    assert server.client().generate("m", "p", stop_at_newline=False) == '{"a": 1,\n"b": 2}'
+
+
+def test_first_token_deadline(stub):
+    server = stub(lambda server, conn: server.release.wait(30) and False)
+    started = time.monotonic()
+
+    with pytest.raises(OllamaError, match="did not respond in time"):
+        server.client(first_token_timeout=0.3).generate("m", "p")
+    assert time.monotonic() - started < 2
+
+
+def test_total_deadline(stub):
+    server = stub(trickle(*["word "] * 50, pause=0.1))
+    started = time.monotonic()
+
+    with pytest.raises(OllamaError):
+        server.client(total_timeout=0.5).generate("m", "p")
+    assert time.monotonic() - started < 2
+
+
+def test_error_chunk_is_raised(stub):
+    body = json.dumps({'error': "model 'm' not found"}).encode() + b"\n"
+    server = stub(lambda server, conn: conn.sendall(
+        b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(body) + body) or True)
+
+    with pytest.raises(OllamaError, match="not found"):
+        server.client().generate("m", "p")
+
+
+def test_http_error_status(stub):
+    server = stub(lambda server, conn: conn.sendall(
+        b"HTTP/1.1 404 Not Found\r\nContent-Length: 9\r\n\r\nno model!") or True)
+
+    with pytest.raises(OllamaError, match="HTTP 404"):
+        server.client().generate("m", "p")
+
+
+def test_unreachable_server():
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    port = listener.getsockname()[1]
+    listener.close()
+
+    with pytest.raises(OllamaError, match="cannot reach Ollama"):
+        OllamaClient(host=f"127.0.0.1:{port}", connect_timeout=1).generate("m", "p")
+
+
+def test_warm_loads_the_model(stub):
+    body = json.dumps({'done': True}).encode()
+    server = stub(lambda server, conn: conn.sendall(
+        b"HTTP/1.1 200 OK\r\nContent-Length: %d\r\n\r\n" % len(body) + body) or True)
+    client = server.client()
+
+    assert client.warm("m") is True
+    assert client.warm_async("m").result(5) is True
+    assert server.connections == 1
@@ -0,0 +1,66 @@
+"""The installed hook asks on the terminal, and blocks when there is none."""
+import fcntl
+import os
+import subprocess
+import termios
+
+import pytest
+
+from conftest import git, run_tool
+
+SECRET = 'api_key = "sk-1234567890abcdefghijklmnop"\n'
+
+
+@pytest.fixture
+def hooked_repo(repo):
+    assert run_tool(repo, "--install-hooks").returncode == 0
+    (repo / "settings.py").write_text(SECRET)
+    git(repo, "add", "settings.py")
+    return repo
+
+
+def commit_on_terminal(repo, answer: str) -> subprocess.CompletedProcess:
+    """``git commit`` with a pseudo-terminal as its controlling terminal, answering the prompt."""
+    master, slave = os.openpty()
+
+    def take_terminal():
+        fcntl.ioctl(slave, termios.TIOCSCTTY, 0)
+
+    try:
+        process = subprocess.Popen(["git", "commit", "-q", "-m", "add settings"], cwd=repo, stdin=subprocess.DEVNULL,
+                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT, start_new_session=True,
+                                   preexec_fn=take_terminal, pass_fds=(slave,))
+        os.write(master, answer.encode())
+        output, _ = process.communicate(timeout=60)
+    finally:
+        os.close(slave)
+        os.close(master)
+    return subprocess.CompletedProcess(process.args, process.returncode, output.decode(), None)
+
+
+def test_hook_blocks_without_terminal(hooked_repo):
+    head = git(hooked_repo, "rev-parse", "HEAD")
+    result = subprocess.run(["git", "commit", "-q", "-m", "add settings"], cwd=hooked_repo, capture_output=True,
+                            text=True, start_new_session=True)
+
+    assert result.returncode != 0
+    assert "Non-interactive commit blocked" in result.stdout + result.stderr
+    assert git(hooked_repo, "rev-parse", "HEAD") == head
+
+
+@pytest.mark.parametrize("answer, committed", [("y\n", True), ("n\n", False)])
+def test_hook_prompts_on_terminal(hooked_repo, answer, committed):
+    head = git(hooked_repo, "rev-parse", "HEAD")
+    result = commit_on_terminal(hooked_repo, answer)
+
+    assert "Potential secrets detected" in result.stdout
+    assert (git(hooked_repo, "rev-parse", "HEAD") != head) is committed
+
+
+def test_non_interactive_setting_skips_the_prompt(hooked_repo, monkeypatch):
+    monkeypatch.setenv("COMMIT_PUSH_NON_INTERACTIVE", "1")
+    head = git(hooked_repo, "rev-parse", "HEAD")
+    result = commit_on_terminal(hooked_repo, "y\n")
+
+    assert "Non-interactive commit blocked" in result.stdout
+    assert git(hooked_repo, "rev-parse", "HEAD") == head
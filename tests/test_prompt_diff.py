@@ -0,0 +1,66 @@
+"""The pipeline's prompt shows the same diff whether or not staging has run yet."""
+import commit_push
+from commit_push import CommitMessageGenerator, GitOperations, RepoSnapshot
+from conftest import git
+
+
+class RecordingClient:
+    def __init__(self):
+        self.prompts = []
+
+    def generate(self, model, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return "feat: add the new module"
+
+    def interrupt(self, abort):
+        pass
+
+
+def capture(repo, include=(), exclude=()) -> RepoSnapshot:
+    with GitOperations.use_repo(repo):
+        return RepoSnapshot.capture().filtered(list(include), list(exclude))
+
+
+def worktree_prompt(repo, snapshot=None) -> str:
+    client = RecordingClient()
+    snapshot = snapshot or capture(repo)
+    with GitOperations.use_repo(repo):
+        CommitMessageGenerator("m", client=client).generate_uncached(snapshot, [], staged=False)
+    return client.prompts[0]
+
+
+def test_untracked_files_are_in_the_worktree_diff(repo, monkeypatch):
+    monkeypatch.setattr(commit_push.config, "commit_candidates", 1)
+    (repo / "new_module.py").write_text("def fresh():\n    return 'untracked'\n")
+    (repo / "README.md").write_text("# demo\nmore\n")
+
+    # The snapshot is taken once; staging then runs alongside generation
+    snapshot = capture(repo)
+    before = worktree_prompt(repo, snapshot)
+    git(repo, "add", "--all")
+    after = worktree_prompt(repo, snapshot)
+
+    assert "return 'untracked'" in before
+    assert before == after
+
+
+def test_worktree_diff_leaves_the_real_index_alone(repo, monkeypatch):
+    monkeypatch.setattr(commit_push.config, "commit_candidates", 1)
+    (repo / "new_module.py").write_text("VALUE = 1\n")
+
+    worktree_prompt(repo)
+
+    assert git(repo, "status", "--porcelain") == "?? new_module.py"
+
+
+def test_excluded_paths_stay_out_of_the_prompt(repo, monkeypatch):
+    monkeypatch.setattr(commit_push.config, "commit_candidates", 1)
+    (repo / "new_module.py").write_text("VALUE = 1\n")
+    (repo / "secret.env").write_text("TOKEN=hunter2\n")
+    (repo / "README.md").write_text("# secret readme change\n")
+
+    prompt = worktree_prompt(repo, capture(repo, exclude=["secret*", "README.md"]))
+
+    assert "VALUE = 1" in prompt
+    assert "hunter2" not in prompt
+    assert "secret readme change" not in prompt
@@ -0,0 +1,105 @@
+"""Push queue: failed and deferred pushes reach a local bare remote on a later flush."""
+import json
+
+import commit_push
+from commit_push import GitOperations, PushQueue
+from conftest import git, run_tool
+
+
+def remote_head(repo):
+    return git(repo, "--git-dir", str(repo.parent / f"{repo.name}.git"), "rev-parse", "main")
+
+
+def queued(env):
+    with open(env['COMMIT_PUSH_QUEUE'], encoding='utf-8') as queue_file:
+        return json.load(queue_file)
+
+
+def test_failed_push_is_queued_and_flushed(repo, isolated_env):
+    remote = repo.parent / "work.git"
+    offline = remote.rename(repo.parent / "offline.git")
+    (repo / "notes.txt").write_text("written offline\n")
+    before = git(repo, "--git-dir", str(offline), "rev-parse", "main")
+
+    result = run_tool(repo, "--no-ai")
+
+    assert "📮 Queued for retry" in result.stdout
+    [entry] = queued(isolated_env)
+    assert entry['commit'] == git(repo, "rev-parse", "HEAD")
+    assert entry['attempts'] == 1 and entry['last_error']
+
+    offline.rename(remote)
+    assert remote_head(repo) == before
+    flushed = run_tool(repo, "--flush-queue")
+
+    assert flushed.returncode == 0, flushed.stdout
+    assert remote_head(repo) == git(repo, "rev-parse", "HEAD")
+    assert queued(isolated_env) == []
+
+
+def test_deferred_push_waits_for_the_flush(repo, isolated_env):
+    before = remote_head(repo)
+    (repo / "later.txt").write_text("later\n")
+
+    result = run_tool(repo, "--no-ai", "--defer-push")
+
+    assert result.returncode == 0, result.stdout
+    assert remote_head(repo) == before
+    assert len(queued(isolated_env)) == 1
+    run_tool(repo, "--flush-queue")
+    assert remote_head(repo) == git(repo, "rev-parse", "HEAD")
+
+
+def test_newer_commit_replaces_the_queued_entry(repo, tmp_path):
+    queue = PushQueue(tmp_path / "queue.json")
+    queue.add(repo, "main", "a" * 40, error="offline")
+    queue.add(repo, "main", "b" * 40, error="offline")
+
+    [entry] = queue.entries()
+    assert entry['commit'] == "b" * 40
+    assert entry['attempts'] == 2
+
+
+def test_backoff_grows_and_is_capped(monkeypatch):
+    monkeypatch.setattr(commit_push.config, "push_retry_base_seconds", 10.0)
+    monkeypatch.setattr(commit_push.config, "push_retry_max_seconds", 100.0)
+
+    delays = [PushQueue.backoff(attempts) for attempts in range(1, 8)]
+
+    assert 8 <= delays[0] <= 12
+    assert 16 <= delays[1] <= 24
+    assert all(delay <= 120 for delay in delays)
+    assert delays[-1] >= 80
+
+
+def test_branches_of_one_remote_go_out_in_one_push(repo, tmp_path, monkeypatch):
+    git(repo, "branch", "feature")
+    queue = PushQueue(tmp_path / "queue.json")
+    queue.add(repo, "main", git(repo, "rev-parse", "HEAD"), delay=0)
+    queue.add(repo, "feature", git(repo, "rev-parse", "HEAD"), delay=0)
+    pushes = []
+    real_push = GitOperations.push_branches
+
+    def recording_push(remote, branches):
+        pushes.append(sorted(branches))
+        return real_push(remote, branches)
+    monkeypatch.setattr(GitOperations, "push_branches", staticmethod(recording_push))
+
+    assert queue.flush() == (2, 0)
+    assert pushes == [["feature", "main"]]
+    assert git(repo, "ls-remote", "--heads", "origin", "feature")
+
+
+def test_failed_flush_backs_off(repo, tmp_path):
+    git(repo, "remote", "set-url", "origin", str(tmp_path / "missing.git"))
+    queue = PushQueue(tmp_path / "queue.json")
+    queue.add(repo, "main", git(repo, "rev-parse", "HEAD"), delay=0)
+
+    assert queue.flush() == (0, 1)
+    [entry] = queue.entries()
+    assert entry['attempts'] == 1
+    assert queue.seconds_until_due() > 0
+    # Not due yet: an ordinary flush leaves it alone, a forced one retries
+    assert queue.flush() == (0, 1) and queue.entries()[0]['attempts'] == 1
+    assert queue.flush(force=True) == (0, 1) and queue.entries()[0]['attempts'] == 2
+
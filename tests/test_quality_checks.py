@@ -0,0 +1,37 @@
+"""The syntax check must see the files that are about to be committed."""
+from conftest import git, run_tool
+
+
+def test_serial_run_rejects_new_syntax_error(repo):
+    (repo / "broken.py").write_text("def broken(:\n    pass\n")
+    head = git(repo, "rev-parse", "HEAD")
+
+    result = run_tool(repo, "--no-ai")
+
+    assert "Syntax error in broken.py" in result.stdout
+    assert git(repo, "rev-parse", "HEAD") == head
+    # The index is put back the way it was
+    assert git(repo, "diff", "--cached", "--name-only") == ""
+
+
+def test_serial_run_commits_valid_python(repo):
+    (repo / "ok.py").write_text("def ok():\n    return 1\n")
+
+    result = run_tool(repo, "--no-ai")
+
+    assert result.returncode == 0, result.stdout
+    assert git(repo, "ls-tree", "--name-only", "HEAD", "ok.py") == "ok.py"
+    assert git(repo, "rev-parse", "HEAD") == git(repo, "rev-parse", "origin/main")
+
+
+def test_batch_mode_rejects_syntax_error(make_repo):
+    good, bad = make_repo("good"), make_repo("bad")
+    (good / "ok.py").write_text("VALUE = 1\n")
+    (bad / "broken.py").write_text("class (:\n")
+    bad_head = git(bad, "rev-parse", "HEAD")
+
+    result = run_tool(good.parent, "--no-ai", "--repos", str(good.parent / "*"))
+
+    assert result.returncode == 1
+    assert git(bad, "rev-parse", "HEAD") == bad_head
+    assert git(good, "ls-tree", "--name-only", "HEAD", "ok.py") == "ok.py"
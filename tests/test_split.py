@@ -0,0 +1,66 @@
+"""--split: every staged path lands in exactly one commit, and broken code is refused."""
+import argparse
+
+import pytest
+
+import commit_push
+from conftest import git, run_tool
+
+PATH_SETS = [
+    # src/x.py forms the unscoped ('source', '') group, and it is the smallest one
+    ["src/x.py", "x.py", "src/a/a1.py", "src/a/a2.py", "src/b/b.py", "lib/c/c1.py", "lib/c/c2.py", "lib/c/c3.py", "README.md"],
+    ["app/models/user.py", "app/views/home.py", "tests/test_user.py", "docs/guide.md", "package-lock.json",
+     ".github/workflows/ci.yml", "Dockerfile", "setup.cfg", "static/logo.png", "main.py", "util.py"],
+    [f"pkg{n}/module.py" for n in range(12)] + ["README.md", "tests/test_all.py"],
+]
+
+
+@pytest.mark.parametrize("paths", PATH_SETS)
+@pytest.mark.parametrize("max_groups", [1, 2, 3, 6, 50])
+def test_plan_covers_every_path_once(monkeypatch, paths, max_groups):
+    monkeypatch.setattr(commit_push.config, "split_max_groups", max_groups)
+    groups = commit_push.SplitCommitter(argparse.Namespace()).plan(paths, {})
+
+    planned = [path for group in groups for path in group.paths]
+    assert sorted(planned) == sorted(paths)
+    assert len(groups) <= max_groups
+
+
+def test_plan_keeps_rename_source_with_destination(monkeypatch):
+    monkeypatch.setattr(commit_push.config, "split_max_groups", 6)
+    paths = ["docs/old.md", "src/new.py", "src/other.py"]
+    groups = commit_push.SplitCommitter(argparse.Namespace()).plan(paths, {"src/new.py": "docs/old.md"})
+
+    together = [group for group in groups if "src/new.py" in group.paths]
+    assert len(together) == 1 and "docs/old.md" in together[0].paths
+    assert sorted(path for group in groups for path in group.paths) == sorted(paths)
+
+
+def test_split_commits_every_path(repo):
+    (repo / "docs").mkdir()
+    (repo / "docs" / "guide.md").write_text("# Guide\n")
+    (repo / "tests").mkdir()
+    (repo / "tests" / "test_app.py").write_text("def test_app():\n    assert True\n")
+    (repo / "app.py").write_text("def main():\n    return 0\n")
+    head = git(repo, "rev-parse", "HEAD")
+
+    result = run_tool(repo, "--no-ai", "--split")
+
+    assert result.returncode == 0, result.stdout
+    assert git(repo, "status", "--porcelain") == ""
+    assert int(git(repo, "rev-list", "--count", f"{head}..HEAD")) >= 2
+    committed = git(repo, "diff", "--name-only", head, "HEAD").splitlines()
+    assert sorted(committed) == ["app.py", "docs/guide.md", "tests/test_app.py"]
+
+
+def test_split_rejects_syntax_error(repo):
+    (repo / "docs").mkdir()
+    (repo / "docs" / "guide.md").write_text("# Guide\n")
+    (repo / "broken.py").write_text("def broken(:\n")
+    head = git(repo, "rev-parse", "HEAD")
+
+    result = run_tool(repo, "--no-ai", "--split")
+
+    assert "Syntax error in broken.py" in result.stdout
+    assert git(repo, "rev-parse", "HEAD") == head
+    assert git(repo, "diff", "--cached", "--name-only") == ""
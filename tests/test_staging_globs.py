@@ -0,0 +1,32 @@
+"""Staging globs must hold even when the status listing is capped."""
+import json
+
+from conftest import git, run_tool
+
+
+def test_capped_listing_with_globs_is_not_committed(repo):
+    (repo / ".commit-push.json").write_text(json.dumps(
+        {"staging": {"exclude": ["secret*"]}, "max_status_records": 1}))
+    for name in ("a.txt", "b.txt", "secret.env"):
+        (repo / name).write_text(name + "\n")
+    head = git(repo, "rev-parse", "HEAD")
+
+    result = run_tool(repo, "--no-ai")
+
+    assert result.returncode == 1, result.stdout
+    assert "raise max_status_records" in result.stdout
+    assert git(repo, "rev-parse", "HEAD") == head
+    assert git(repo, "diff", "--cached", "--name-only") == ""
+
+
+def test_globs_exclude_paths_from_the_commit(repo):
+    (repo / ".commit-push.json").write_text(json.dumps({"staging": {"exclude": ["secret*"]}}))
+    (repo / "a.txt").write_text("a\n")
+    (repo / "secret.env").write_text("TOKEN=1\n")
+
+    result = run_tool(repo, "--no-ai")
+
+    assert result.returncode == 0, result.stdout
+    committed = git(repo, "ls-tree", "-r", "--name-only", "HEAD").split()
+    assert "a.txt" in committed
+    assert "secret.env" not in committed